@@ -0,0 +1,83 @@
+"""Background loading and saving of usage analytics for the GUI.
+
+analytics.npz grows to hundreds of megabytes over a year of snapshots, so
+it is read and written on a single-thread QThreadPool rather than the GUI
+thread. UsageAnalytics locks its columns while they are serialized; a save
+requested while one is running is folded into a single follow-up save.
+"""
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from perf_stats import stats
+
+
+class _AnalyticsSignals(QObject):
+    loaded = pyqtSignal(bool)
+    failed = pyqtSignal(str)
+    done = pyqtSignal()
+
+
+class _AnalyticsTask(QRunnable):
+    def __init__(self, analytics, kind, signals):
+        super().__init__()
+        self.analytics = analytics
+        self.kind = kind  # 'load' or 'save'
+        self.signals = signals
+
+    def run(self):
+        try:
+            if self.kind == 'load':
+                self.signals.loaded.emit(self.analytics.load())
+            else:
+                with stats.timer('analytics.save'):
+                    self.analytics.save()
+        except Exception as e:
+            stats.count('errors.analytics')
+            self.signals.failed.emit(f"Error {'loading' if self.kind == 'load' else 'saving'} analytics: {str(e)}")
+        finally:
+            self.signals.done.emit()
+
+
+class AnalyticsWorker(QObject):
+    """Loads and saves a UsageAnalytics off the GUI thread, one task at a time."""
+
+    loaded = pyqtSignal(bool)
+    failed = pyqtSignal(str)
+
+    def __init__(self, analytics, parent=None):
+        super().__init__(parent)
+        self.analytics = analytics
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._running = False
+        self._save_pending = False
+        self._signals = _AnalyticsSignals()
+        self._signals.loaded.connect(self.loaded)
+        self._signals.failed.connect(self.failed)
+        self._signals.done.connect(self._on_done)
+
+    @property
+    def busy(self):
+        return self._running
+
+    def load(self):
+        self._start('load')
+
+    def save(self):
+        if self._running:
+            self._save_pending = True
+            return
+        self._start('save')
+
+    def _start(self, kind):
+        self._running = True
+        self.pool.start(_AnalyticsTask(self.analytics, kind, self._signals))
+
+    def _on_done(self):
+        self._running = False
+        if self._save_pending:
+            self._save_pending = False
+            self._start('save')
+
+    def shutdown(self, timeout_ms=10000):
+        """Wait for a running load or save to finish."""
+        self.pool.waitForDone(timeout_ms)
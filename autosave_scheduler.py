@@ -0,0 +1,117 @@
+"""Adaptive timing for auto-saves.
+
+The configured save interval is the starting point, and while windows keep
+changing it is the longest they go unsaved. The interval moves by powers of
+two according to what the last auto-saves found:
+
+- a save that found changes halves it (down to interval / 4, at least
+  MIN_INTERVAL seconds), so a busy desktop is saved more often;
+- a save that found nothing new doubles it (up to MAX_BACKOFF times the
+  configured interval, at most MAX_INTERVAL), so an idle desktop is
+  captured less and less often;
+- the first save that goes against the trend returns to the configured
+  interval. With live window events a change does so straight away; when
+  polling, it is picked up by the next, backed-off, capture.
+
+While system CPU use is above the threshold, a due capture is put off by
+CPU_DEFER_SECONDS, for at most one configured interval in a row.
+
+Every decision is counted in perf_stats (`autosave.*`) and kept in a short
+log exported with the stats, so the savings can be checked against the
+capture and store counters.
+"""
+import time
+from collections import deque
+
+from perf_stats import stats
+
+MIN_INTERVAL = 5
+MAX_INTERVAL = 3600
+MAX_SPEEDUP = 4
+MAX_BACKOFF = 16
+CPU_THRESHOLD = 80.0
+CPU_DEFER_SECONDS = 15
+LOG_SIZE = 50
+
+
+class AutoSaveScheduler:
+    def __init__(self, interval, cpu_threshold=CPU_THRESHOLD, max_backoff=MAX_BACKOFF):
+        self.interval = interval
+        self.cpu_threshold = cpu_threshold
+        self.max_backoff = max_backoff
+        self.level = 0  # the interval is interval * 2 ** level, within the bounds
+        self.deferred_since = None
+        self.log = deque(maxlen=LOG_SIZE)
+
+    def _record(self, action, reason, delay=None):
+        stats.count(f'autosave.{action}')
+        self.log.append({'time': time.strftime('%H:%M:%S'), 'action': action, 'reason': reason,
+                         'interval': self.current_interval(), 'delay': delay})
+
+    def set_interval(self, interval):
+        self.interval = interval
+        self.level = 0
+        self._record('reset', f"interval set to {interval}s")
+
+    def bounds(self):
+        low = min(self.interval, max(MIN_INTERVAL, self.interval / MAX_SPEEDUP))
+        high = max(self.interval, min(self.interval * self.max_backoff, MAX_INTERVAL))
+        return low, high
+
+    def current_interval(self):
+        low, high = self.bounds()
+        return min(max(self.interval * 2.0 ** self.level, low), high)
+
+    def next_delay(self, since_last_save=None, settle=0):
+        """Seconds until the next auto-save is due."""
+        delay = self.current_interval()
+        if since_last_save is not None:
+            delay -= since_last_save
+        delay = max(delay, settle)
+        stats.observe('autosave.delay', delay)
+        return delay
+
+    def on_saved(self, changed):
+        """Adapt to the outcome of an auto-save."""
+        low, high = self.bounds()
+        interval = self.current_interval()
+        # Moving the other way starts again from the configured interval
+        if changed:
+            self.level = 0 if self.level > 0 else self.level - 1
+            action = 'speedup' if interval > low else 'busy'
+        else:
+            self.level = 0 if self.level < 0 else self.level + 1
+            action = 'backoff' if interval < high else 'idle'
+        # Don't wind up past the bounds, so one change or one quiet save takes effect at once
+        while self.level < 0 and self.interval * 2.0 ** (self.level + 1) <= low:
+            self.level += 1
+        while self.level > 0 and self.interval * 2.0 ** (self.level - 1) >= high:
+            self.level -= 1
+        self._record(action, "windows changed" if changed else "no changes")
+
+    def on_change(self):
+        """A live window event: stop backing off, the desktop is in use again."""
+        if self.level > 0:
+            self.level = 0
+            self._record('wake', "window event after idle")
+
+    def defer_for_load(self, cpu_percent):
+        """Seconds to put a due capture off by, or 0 to capture now."""
+        now = time.monotonic()
+        if cpu_percent is None or cpu_percent <= self.cpu_threshold:
+            self.deferred_since = None
+            return 0
+        if self.deferred_since is None:
+            self.deferred_since = now
+        elif now - self.deferred_since >= self.interval:
+            # Busy for a whole interval: capture anyway rather than never
+            self.deferred_since = None
+            self._record('forced', f"CPU {cpu_percent:.0f}% for {self.interval}s")
+            return 0
+        self._record('deferred', f"CPU {cpu_percent:.0f}%", CPU_DEFER_SECONDS)
+        return CPU_DEFER_SECONDS
+
+    def stats(self):
+        low, high = self.bounds()
+        return {'interval': self.current_interval(), 'configured': self.interval,
+                'min': low, 'max': high, 'log': list(self.log)}
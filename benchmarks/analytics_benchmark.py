@@ -0,0 +1,124 @@
+"""Benchmark usage analytics over a long synthetic history.
+
+Builds the observation columns of a year of 30-second snapshots directly
+with NumPy (ingesting a million snapshots through ingest() would time the
+generator, not the analytics), then times the vectorized rollup rebuild,
+the queries behind the analytics view, saving and loading analytics.npz,
+and per-snapshot ingest() on a sample. The Rebuild button's full path,
+rebuild_steps() reading every snapshot back from a store and then
+rebuild_rollups(), is timed on a smaller store (--store-snapshots).
+
+    python benchmarks/analytics_benchmark.py --days 365 --windows 20
+    python benchmarks/analytics_benchmark.py --hours 8     # a working day
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from array import array
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from usage_analytics import UsageAnalytics, DAY, day_number, local_seconds
+from workspace_capture import build_workspace
+from workspace_store import open_store
+
+INTERVAL = 30
+
+
+def synthetic_columns(analytics, days, window_count, app_count, seed, hours=24):
+    """Fill `analytics` with `days` of snapshots every INTERVAL seconds, `hours` a day."""
+    rng = np.random.default_rng(seed)
+    start = local_seconds(datetime.now() - timedelta(days=days))
+    per_day = hours * 3600 // INTERVAL
+    # Shorter days start at 9:00, with the machine off the rest of the time
+    day_starts = (start // DAY + np.arange(days)) * DAY + (9 * 3600 if hours <= 15 else 0)
+    times = (day_starts[:, None] + np.arange(per_day) * INTERVAL).ravel()
+    snapshots = np.repeat(np.arange(len(times), dtype=np.intc), window_count)
+    apps = rng.integers(0, app_count, size=len(snapshots), dtype=np.intc)
+    # A handful of positions per app, so layouts repeat like real ones
+    layouts = (apps * 8 + rng.integers(0, 8, size=len(snapshots))).astype(np.intc)
+
+    analytics.apps = [f"app{i}.exe" for i in range(app_count)]
+    analytics.layouts = [(i // 8, 1, (i % 8 * 100, 0, i % 8 * 100 + 800, 600)) for i in range(app_count * 8)]
+    analytics._app_ids = {name: i for i, name in enumerate(analytics.apps)}
+    analytics._layout_ids = {layout: i for i, layout in enumerate(analytics.layouts)}
+    analytics.times = array('d', times.astype(np.float64).tobytes())
+    analytics.obs_snapshot = array('i', snapshots.tobytes())
+    analytics.obs_app = array('i', apps.tobytes())
+    analytics.obs_layout = array('i', layouts.tobytes())
+    analytics.last_name = 'Workspace_synthetic'
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<36}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--windows', type=int, default=20)
+    parser.add_argument('--apps', type=int, default=40)
+    parser.add_argument('--hours', type=int, default=24, help="hours of snapshots per day")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--store-snapshots', type=int, default=2000,
+                        help="snapshots in the store read back by rebuild_steps()")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        analytics = UsageAnalytics(directory)
+        synthetic_columns(analytics, args.days, args.windows, args.apps, args.seed, args.hours)
+        print(f"{len(analytics)} snapshots, {len(analytics.obs_app)} observations")
+
+        timed("rebuild_rollups", analytics.rebuild_rollups)
+        today = day_number(datetime.now())
+        timed("app_hours (last 7 days)", lambda: analytics.app_hours(today - 6, today))
+        timed("app_hours (all)", analytics.app_hours)
+        timed("top_layouts (last 7 days)",
+              lambda: analytics.top_layouts(datetime.now() - timedelta(days=7)))
+        timed("top_layouts (all)", analytics.top_layouts)
+        timed("save", analytics.save)
+        print(f"{'analytics.npz':<36}{os.path.getsize(analytics.path) / 2 ** 20:>10.1f} MB")
+        loaded = UsageAnalytics(directory)
+        timed("load", loaded.load)
+
+        windows = [{'process_name': f"app{i % args.apps}.exe", 'placement': (0, 1, (-1, -1), (-1, -1),
+                                                                             (i * 10, 0, 800, 600))}
+                   for i in range(args.windows)]
+        when = datetime.now()
+        count = 10000
+
+        def ingest():
+            for i in range(count):
+                loaded.ingest(f"Workspace_{i:06d}", when + timedelta(seconds=INTERVAL * (i + 1)), windows)
+        start = time.perf_counter()
+        ingest()
+        per_snapshot = (time.perf_counter() - start) / count * 1e6
+        print(f"{'ingest (per snapshot)':<36}{per_snapshot:>10.1f} us")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = open_store(directory, 'files')
+        start = datetime.now() - timedelta(seconds=INTERVAL * args.store_snapshots)
+        for i in range(args.store_snapshots):
+            # A window or two changes between snapshots, like real auto-saves
+            snapshot = [dict(window, title=f"Window {j} ({(i + j) // 10})", rect=(0, 0, 800, 600))
+                        for j, window in enumerate(windows)]
+            name, data = build_workspace(snapshot, start + timedelta(seconds=INTERVAL * i))
+            store.save(name, data, incremental=True)
+        analytics = UsageAnalytics(directory)
+
+        def rebuild():
+            for _ in analytics.rebuild_steps(store):
+                pass
+        timed(f"rebuild_steps ({args.store_snapshots} snapshots)", rebuild)
+        store.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Compare snapshot codecs on realistic workspace snapshots.
+
+Snapshots are captured from the simulated desktop, with command lines padded
+to what browsers and IDEs typically carry. Two shapes are measured:
+
+- full: a snapshot with inline window records (legacy files, exports);
+- referenced: a snapshot file as WorkspaceStore writes it (record digests).
+
+Run from the repository root:
+
+    python benchmarks/codec_benchmark.py --windows 200 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snapshot_codec
+from window_backend import SimulatedWindowBackend
+from workspace_capture import capture_windows
+from workspace_store import window_digest
+
+_EXTRA_ARGS = [
+    '--type=renderer', '--enable-features=NetworkService,NetworkServiceInProcess',
+    '--lang=en-US', '--device-scale-factor=1.25', '--num-raster-threads=4',
+    '--field-trial-handle=1736,i,8813391437715297713,17196262393557342391,262144',
+    '--user-data-dir=C:\\Users\\user\\AppData\\Local\\Google\\Chrome\\User Data',
+    '--mojo-platform-channel-handle=4816', '/prefetch:1',
+]
+
+
+def make_snapshot(window_count, seed):
+    backend = SimulatedWindowBackend(window_count=window_count, process_count=max(window_count // 8, 4),
+                                     seed=seed, denied_ratio=0.0)
+    windows = capture_windows(backend)
+    for i, window in enumerate(windows):
+        window['command_line'] = list(window['command_line']) + _EXTRA_ARGS[:i % len(_EXTRA_ARGS) + 1]
+    return {
+        'timestamp': '20250101_120000',
+        'windows': windows,
+        'save_time': '2025-01-01 12:00:00 PM',
+        'window_count': len(windows),
+    }
+
+
+def referenced(snapshot):
+    data = {key: value for key, value in snapshot.items() if key != 'windows'}
+    data['records'] = [window_digest(w) for w in snapshot['windows']]
+    return data
+
+
+def bench(obj, codec, compression, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        data = snapshot_codec.encode(obj, codec, compression)
+    encode_time = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        snapshot_codec.decode(data)
+    decode_time = (time.perf_counter() - start) / repeat
+    return len(data), encode_time, decode_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--windows', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    snapshot = make_snapshot(args.windows, args.seed)
+    codecs, compressions = snapshot_codec.available()
+    print(f"{len(snapshot['windows'])} windows; codecs: {', '.join(codecs)}; "
+          f"compression: {', '.join(str(c) for c in compressions)}")
+    for shape, obj in (('full', snapshot), ('referenced', referenced(snapshot))):
+        print(f"\n{shape} snapshot")
+        print(f"{'codec':<14}{'compression':<13}{'size (KB)':>10}{'encode (ms)':>13}{'decode (ms)':>13}")
+        baseline = None
+        for codec in codecs:
+            for compression in compressions:
+                size, encode_time, decode_time = bench(obj, codec, compression, args.repeat)
+                baseline = baseline or size
+                print(f"{codec:<14}{str(compression):<13}{size / 1024:>10.1f}"
+                      f"{encode_time * 1000:>13.3f}{decode_time * 1000:>13.3f}"
+                      f"   ({size / baseline:.0%} of json)")
+
+
+if __name__ == '__main__':
+    main()
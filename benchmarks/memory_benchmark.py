@@ -0,0 +1,95 @@
+"""Measure memory held by loaded window records, as dicts and as WindowRecords.
+
+Builds a synthetic history the way the record pack holds it (every distinct
+window record once, decoded from JSON), then reports the traced allocation
+size and the resident-set growth for plain dicts versus compact records.
+Each mode runs in a fresh interpreter so the RSS numbers don't overlap.
+
+    python benchmarks/memory_benchmark.py --snapshots 2880 --windows 60
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from window_backend import SimulatedWindowBackend
+from workspace_capture import capture_windows
+
+
+def history_records(snapshots, window_count, seed):
+    """Distinct window records of a history where a few windows move or retitle per snapshot."""
+    rng = random.Random(seed)
+    backend = SimulatedWindowBackend(window_count=window_count, process_count=max(window_count // 6, 4),
+                                     seed=seed, denied_ratio=0.0)
+    hwnds = list(backend.windows)
+    records = []
+    for i in range(snapshots):
+        for hwnd in rng.sample(hwnds, 3):
+            left, top = rng.randrange(0, 1600), rng.randrange(0, 900)
+            backend.move_window(hwnd, (left, top, left + 800, top + 600), 1)
+            if rng.random() < 0.3:
+                backend.set_window_text(hwnd, f"Document {i} - {hwnd}")
+        records.extend(capture_windows(backend)[:3])
+    # Records come back from the pack as freshly decoded JSON
+    return json.dumps(records)
+
+
+def rss():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def measure(mode, payload):
+    from window_record import compact_window
+    decoded = json.loads(payload)
+    tracemalloc.start()
+    before_rss = rss()
+    if mode == 'compact':
+        loaded = [compact_window(json.loads(json.dumps(w))) for w in decoded]
+    else:
+        loaded = [json.loads(json.dumps(w)) for w in decoded]
+    current, _ = tracemalloc.get_traced_memory()
+    after_rss = rss()
+    tracemalloc.stop()
+    rss_growth = (after_rss - before_rss) if before_rss is not None else None
+    return {'mode': mode, 'records': len(loaded), 'traced': current, 'rss': rss_growth}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--snapshots', type=int, default=2880)
+    parser.add_argument('--windows', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mode', choices=('dict', 'compact'))
+    args = parser.parse_args()
+
+    payload = history_records(args.snapshots, args.windows, args.seed)
+    if args.mode:
+        print(json.dumps(measure(args.mode, payload)))
+        return
+
+    results = {}
+    for mode in ('dict', 'compact'):
+        output = subprocess.run([sys.executable, __file__, '--mode', mode, '--snapshots', str(args.snapshots),
+                                 '--windows', str(args.windows), '--seed', str(args.seed)],
+                                capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{results['dict']['records']} window records")
+    print(f"{'mode':<10}{'traced (MB)':>13}{'rss (MB)':>11}")
+    for mode, result in results.items():
+        rss_mb = f"{result['rss'] / 2 ** 20:>11.1f}" if result['rss'] is not None else f"{'n/a':>11}"
+        print(f"{mode:<10}{result['traced'] / 2 ** 20:>13.1f}{rss_mb}")
+    print(f"compact uses {results['compact']['traced'] / results['dict']['traced']:.0%} of the dict size")
+
+
+if __name__ == '__main__':
+    main()
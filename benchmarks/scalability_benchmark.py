@@ -0,0 +1,306 @@
+"""Scalability benchmark over synthetic workspace histories.
+
+Generates histories of N snapshots with W windows each (written through
+WorkspaceStore, so they have the same keyframes, deltas and record pack as
+real auto-saves) and times the GUI paths that slow down as the history
+grows, under offscreen Qt with the simulated backend:
+
+- startup (WorkspaceManager construction, including load_workspaces)
+- load_workspaces, update_workspace_list and opening a snapshot
+- apply_filter for several queries and date filters
+- save_current_workspace: the real path, a capture on the WindowCapturer
+  worker (reading the live WindowTracker) delivered back to the GUI thread
+  and saved there; save_captured_workspace times the same capture and save
+  on the calling thread, without the worker
+- delete_workspace
+
+The default grid is 10 to 100k snapshots of 5 to 500 windows; --quick runs
+only the small configurations. Each configuration runs in its own
+interpreter so peak memory is per configuration, and one that fails (runs
+out of memory, say) is reported without stopping the others. Results can
+be saved as a baseline and later runs compared against it; a slowdown
+beyond --tolerance is reported as a regression and the script exits with
+status 1.
+
+    python benchmarks/scalability_benchmark.py --quick
+    python benchmarks/scalability_benchmark.py --snapshots 10 1000 --windows 5 50
+    python benchmarks/scalability_benchmark.py --save-baseline
+    python benchmarks/scalability_benchmark.py --compare
+
+Generated histories are cached under --workdir; 100k-snapshot histories
+take a while to generate the first time.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+DEFAULT_BASELINE = os.path.join(REPO_DIR, 'benchmarks', 'baselines', 'scalability.json')
+DEFAULT_WORKDIR = os.path.join(REPO_DIR, 'benchmarks', '.histories')
+QUERIES = [('', 'Today'), ('', 'Last 7 Days'), ('doc', 'All'), ('notepad.exe', 'All'),
+           ('program files', 'Last 30 Days'), ('no-such-window', 'All')]
+SAVE_INTERVAL = 30  # seconds between synthetic snapshots
+FULL_GRID = ([10, 1000, 10000, 100000], [5, 50, 500])
+QUICK_GRID = ([10, 1000, 10000], [5, 50])
+NOISE_MS = 5.0
+
+
+def generate_history(root, snapshots, window_count, seed=0):
+    """Write a history into root/saved_workspaces unless it already exists."""
+    from window_backend import SimulatedWindowBackend
+    from workspace_capture import capture_windows, build_workspace
+    from workspace_store import WorkspaceStore
+    from write_queue import DirectWriter
+
+    marker = os.path.join(root, 'history.json')
+    if os.path.exists(marker):
+        return
+    workspace_dir = os.path.join(root, 'saved_workspaces')
+    backend = SimulatedWindowBackend(window_count=window_count, process_count=max(window_count // 5, 3),
+                                     seed=seed, hidden_ratio=0.0, denied_ratio=0.0)
+    windows = capture_windows(backend)
+    # No fsync: a generated history doesn't need to survive a power cut
+    store = WorkspaceStore(workspace_dir, writer=DirectWriter(sync=False))
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(seconds=SAVE_INTERVAL * snapshots)
+    started = time.perf_counter()
+    for i in range(snapshots):
+        # A few windows move or change title between auto-saves
+        windows = list(windows)
+        for position in rng.sample(range(len(windows)), min(3, len(windows))):
+            window = dict(windows[position])
+            left, top = rng.randrange(0, 1600), rng.randrange(0, 900)
+            rect = (left, top, left + 800, top + 600)
+            window['rect'] = rect
+            window['placement'] = (0, window['placement'][1], (-1, -1), (-1, -1), rect)
+            if rng.random() < 0.3:
+                window['title'] = f"Document {i} - {window['process_name']}"
+            windows[position] = window
+        name, data = build_workspace(windows, start + timedelta(seconds=SAVE_INTERVAL * i),
+                                     pinned=(i % 100 == 0))
+        store.save(name, data, incremental=(i % 100 != 0))
+        if snapshots >= 10000 and i % 10000 == 0:
+            print(f"  generated {i}/{snapshots} snapshots", file=sys.stderr)
+    store.close()
+    with open(marker, 'w') as f:
+        json.dump({'snapshots': snapshots, 'windows': window_count, 'seed': seed,
+                   'generation_s': time.perf_counter() - started}, f)
+
+
+def peak_memory_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2 ** 20
+    except (ImportError, AttributeError):
+        return None
+
+
+def _best(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_config(root, window_count, repeat):
+    """Time the GUI paths against one generated history; returns a result dict."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtCore import QModelIndex
+    from PyQt6.QtWidgets import QApplication
+    from window_backend import SimulatedWindowBackend
+    import workspace_manager
+
+    app = QApplication([])
+    # Saves and deletes must not change the cached history
+    scratch = tempfile.mkdtemp(prefix='wsm_bench_')
+    shutil.copytree(os.path.join(root, 'saved_workspaces'), os.path.join(scratch, 'saved_workspaces'))
+    os.chdir(scratch)
+    backend = SimulatedWindowBackend(window_count=window_count, process_count=max(window_count // 5, 3),
+                                     seed=1, hidden_ratio=0.0, denied_ratio=0.0)
+    results = {}
+
+    start = time.perf_counter()
+    manager = workspace_manager.WorkspaceManager(backend)
+    results['startup_ms'] = (time.perf_counter() - start) * 1000
+    manager.timer.stop()
+    manager.change_timer.stop()
+    # Window moves below must not trigger auto-saves of their own
+    manager.auto_save_enabled = False
+    manager.retention_timer.stop()
+    manager.show_notifications = False
+
+    results['load_workspaces_ms'] = _best(manager.load_workspaces, repeat)
+
+    def update():
+        # The view fetches the first batch of rows as soon as it is shown
+        manager.update_workspace_list()
+        manager.workspace_model.fetchMore(QModelIndex())
+    results['update_workspace_list_ms'] = _best(update, repeat)
+    for text, date_filter in QUERIES:
+        def apply(text=text, date_filter=date_filter):
+            manager.search_input.blockSignals(True)
+            manager.filter_combo.blockSignals(True)
+            manager.search_input.setText(text)
+            manager.filter_combo.setCurrentText(date_filter)
+            manager.search_input.blockSignals(False)
+            manager.filter_combo.blockSignals(False)
+            manager.apply_filter()
+        results[f"apply_filter[{text or '*'}|{date_filter}]_ms"] = _best(apply, repeat)
+    manager.search_input.setText('')
+    manager.filter_combo.setCurrentText('All')
+    manager.apply_filter()
+    manager.workspace_model.fetchMore(QModelIndex())
+
+    # Opening a snapshot's window list loads it (and its delta chain) from disk
+    names = sorted(manager.store.names())
+    opened = iter(names[len(names) // 2:] + names[:len(names) // 2])
+    results['open_workspace_ms'] = _best(lambda: manager.store.get(next(opened)), repeat)
+
+    hwnds = list(backend.windows)
+    rng = random.Random(2)
+
+    def move_a_window():
+        hwnd = rng.choice(hwnds)
+        left, top = rng.randrange(0, 1600), rng.randrange(0, 900)
+        backend.move_window(hwnd, (left, top, left + 700, top + 500))
+
+    def save_direct():
+        move_a_window()
+        windows = manager.get_window_info()
+        # Distinct capture times so repeated saves don't overwrite each other
+        captured_at = datetime.now() + timedelta(seconds=len(manager.store))
+        manager.save_captured_workspace(windows, True, captured_at)
+    results['save_captured_workspace_ms'] = _best(save_direct, repeat)
+
+    # Snapshots are named by the second they are captured in
+    best = None
+    for _ in range(repeat):
+        second = int(time.time())
+        while int(time.time()) == second:
+            time.sleep(0.01)
+        move_a_window()
+        start = time.perf_counter()
+        manager.save_current_workspace(skip_unchanged=True)
+        while manager.capturer.busy:
+            app.processEvents()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    results['save_current_workspace_ms'] = best
+
+    def delete():
+        model = manager.workspace_model
+        manager.workspace_tree.setCurrentIndex(model.index(model.rowCount() - 1, 0))
+        manager.delete_workspace()
+    results['delete_workspace_ms'] = _best(delete, repeat)
+
+    manager.quit_application()
+    results['peak_memory_mb'] = peak_memory_mb()
+    del app
+    os.chdir(REPO_DIR)
+    shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    for config, metrics in results.items():
+        reference = baseline.get(config)
+        if not reference:
+            continue
+        for metric, value in metrics.items():
+            old = reference.get(metric)
+            if value is None or not old:
+                continue
+            # Timings of a few milliseconds are mostly noise; only flag real slowdowns
+            if value > old * tolerance and value - old > NOISE_MS:
+                regressions.append(f"{config} {metric}: {old:.1f} -> {value:.1f} ({value / old:.1f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--snapshots', type=int, nargs='+')
+    parser.add_argument('--windows', type=int, nargs='+')
+    parser.add_argument('--quick', action='store_true',
+                        help=f"only {QUICK_GRID[0]} snapshots of {QUICK_GRID[1]} windows by default")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help="slowdown factor reported as a regression")
+    parser.add_argument('--run', nargs=2, type=int, metavar=('SNAPSHOTS', 'WINDOWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        snapshots, window_count = args.run
+        root = os.path.join(args.workdir, f"{snapshots}x{window_count}")
+        print(json.dumps(run_config(root, window_count, args.repeat)))
+        return 0
+
+    grid = QUICK_GRID if args.quick else FULL_GRID
+    results = {}
+    failed = []
+    for snapshots in args.snapshots or grid[0]:
+        for window_count in args.windows or grid[1]:
+            config = f"{snapshots}x{window_count}"
+            root = os.path.join(args.workdir, config)
+            print(f"{config}: generating history", file=sys.stderr)
+            generate_history(root, snapshots, window_count)
+            print(f"{config}: running", file=sys.stderr)
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--run', str(snapshots),
+                                     str(window_count), '--repeat', str(args.repeat), '--workdir', args.workdir],
+                                    capture_output=True, text=True)
+            if output.returncode != 0:
+                # Killed (negative status) when it runs out of memory
+                print(f"{config}: failed with status {output.returncode}\n{output.stderr}", file=sys.stderr)
+                failed.append(config)
+                continue
+            results[config] = json.loads(output.stdout.strip().splitlines()[-1])
+
+    metrics = sorted({metric for result in results.values() for metric in result})
+    print(f"{'metric':<42}" + ''.join(f"{config:>14}" for config in results))
+    for metric in metrics:
+        row = ''.join(f"{results[config].get(metric) or 0:>14.1f}" for config in results)
+        print(f"{metric:<42}{row}")
+
+    status = 1 if failed else 0
+    if args.compare and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        status = 1 if regressions or failed else 0
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                       'platform': sys.platform, 'python': sys.version.split()[0],
+                       'results': results, 'failed': failed}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Background window capture for the GUI.
+
+Captures run on a dedicated single-thread QThreadPool and the snapshot is
+delivered back to the GUI thread through a signal. While a capture is
+running, further requests are coalesced into a single follow-up capture.
+When a live WindowTracker is attached, captures read its incrementally
+updated table instead of enumerating every window. Captures that aren't
+saves (comparing with the current desktop) go through the same worker, so
+the process cache and tracker are only ever used from one thread.
+"""
+import threading
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from perf_stats import stats
+from workspace_capture import capture_windows, CaptureCancelled
+
+
+class _CaptureSignals(QObject):
+    finished = pyqtSignal(object, object, object, object)  # windows, skip_unchanged, captured_at, callbacks
+    failed = pyqtSignal(str)
+    done = pyqtSignal()
+
+
+class _CaptureTask(QRunnable):
+    def __init__(self, backend, excluded_processes, process_cache, cancel_event, signals, skip_unchanged,
+                 tracker=None, callbacks=()):
+        super().__init__()
+        self.backend = backend
+        self.tracker = tracker
+        self.excluded_processes = excluded_processes
+        self.process_cache = process_cache
+        self.cancel_event = cancel_event
+        self.signals = signals
+        self.skip_unchanged = skip_unchanged  # None: not a save
+        self.callbacks = callbacks
+
+    def run(self):
+        try:
+            captured_at = datetime.now()
+            with stats.profiled('capture'):
+                if self.tracker is not None and self.tracker.live:
+                    windows = self.tracker.snapshot(self.excluded_processes, self.cancel_event)
+                else:
+                    windows = capture_windows(self.backend, self.excluded_processes,
+                                              self.process_cache, self.cancel_event)
+            self.signals.finished.emit(windows, self.skip_unchanged, captured_at, self.callbacks)
+        except CaptureCancelled:
+            pass
+        except Exception as e:
+            stats.count('errors.capture')
+            self.signals.failed.emit(str(e))
+        finally:
+            self.signals.done.emit()
+
+
+class WindowCapturer(QObject):
+    """Runs captures off the GUI thread, at most one at a time."""
+
+    captured = pyqtSignal(object, bool, object)  # windows, skip_unchanged, captured_at
+    failed = pyqtSignal(str)
+
+    def __init__(self, backend, process_cache, parent=None, tracker=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.process_cache = process_cache
+        self.tracker = tracker
+        self.excluded_processes = frozenset()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._cancel_event = threading.Event()
+        self._running = False
+        self._pending = None  # skip_unchanged of the coalesced follow-up capture
+        self._pending_callbacks = []
+        self.coalesced = 0
+
+        self._signals = _CaptureSignals()
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self.failed)
+        self._signals.done.connect(self._on_done)
+
+    @property
+    def busy(self):
+        return self._running
+
+    def request(self, skip_unchanged=False, callback=None):
+        """Start a capture, or fold the request into the next one if one is running.
+
+        With a `callback`, the windows are passed to callback(windows) on the
+        GUI thread instead of being emitted as a save.
+        """
+        if self._cancel_event.is_set():
+            return
+        if callback is not None:
+            skip_unchanged, callbacks = None, [callback]
+        else:
+            callbacks = []
+        if self._running:
+            if skip_unchanged is not None:
+                # A manual save (skip_unchanged=False) must not be downgraded by an auto-save
+                self._pending = skip_unchanged if self._pending is None else (self._pending and skip_unchanged)
+            self._pending_callbacks.extend(callbacks)
+            self.coalesced += 1
+            return
+        self._start(skip_unchanged, callbacks)
+
+    def _start(self, skip_unchanged, callbacks=()):
+        self._running = True
+        self.pool.start(_CaptureTask(self.backend, frozenset(self.excluded_processes), self.process_cache,
+                                     self._cancel_event, self._signals, skip_unchanged, self.tracker,
+                                     callbacks))
+
+    def _on_finished(self, windows, skip_unchanged, captured_at, callbacks):
+        if skip_unchanged is not None:
+            self.captured.emit(windows, skip_unchanged, captured_at)
+        for callback in callbacks:
+            callback(windows)
+
+    def _on_done(self):
+        self._running = False
+        if self._cancel_event.is_set() or (self._pending is None and not self._pending_callbacks):
+            return
+        skip_unchanged, self._pending = self._pending, None
+        callbacks, self._pending_callbacks = self._pending_callbacks, []
+        self._start(skip_unchanged, callbacks)
+
+    def shutdown(self, timeout_ms=3000):
+        """Cancel queued and running captures and wait for the worker to stop."""
+        self._cancel_event.set()
+        self._pending = None
+        self._pending_callbacks = []
+        self.pool.clear()
+        self.pool.waitForDone(timeout_ms)
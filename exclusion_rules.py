@@ -0,0 +1,111 @@
+"""Compiled window exclusion rules.
+
+Each rule is a string of the form `[field:]pattern`:
+
+    notepad.exe                     exact process name
+    chrome*                         glob on the process name
+    exe:C:\\Program Files\\Steam\\*   glob on the exe path
+    title:*Private Browsing*        glob on the window title
+    title:re:^Inbox \\(\\d+\\)         regular expression (after `re:`)
+
+Matching is case-insensitive. Exact names go into a set; every glob and
+regex of a field is compiled into a single alternation, so checking a window
+costs one set lookup and at most one regex search per field no matter how
+many rules there are. Title and name rules can be checked before any process
+metadata is read (see capture_window); exe rules need the metadata.
+
+The rules are kept in the `excluded_processes` setting, so plain process
+names saved by older versions keep working.
+"""
+import fnmatch
+import re
+from functools import lru_cache
+
+FIELDS = ('name', 'exe', 'title')
+_GLOB_CHARS = frozenset('*?[')
+
+
+def parse_rule(rule):
+    """Split a rule into (field, kind, pattern); kind is 'exact', 'glob' or 're'."""
+    field, pattern = 'name', rule.strip()
+    head, sep, rest = pattern.partition(':')
+    if sep and head.lower() in FIELDS:
+        field, pattern = head.lower(), rest
+    if pattern.startswith('re:'):
+        return field, 're', pattern[3:]
+    if _GLOB_CHARS & set(pattern):
+        return field, 'glob', pattern
+    return field, 'exact', pattern
+
+
+def rule_error(rule):
+    """Return why a rule is invalid, or None if it compiles."""
+    field, kind, pattern = parse_rule(rule)
+    if not pattern:
+        return "empty pattern"
+    if kind == 're':
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            return str(e)
+    return None
+
+
+class ExclusionRules:
+    def __init__(self, rules=()):
+        self.rules = tuple(rule for rule in rules if rule and rule.strip())
+        exact = {field: set() for field in FIELDS}
+        expressions = {field: [] for field in FIELDS}
+        for rule in self.rules:
+            error = rule_error(rule)
+            if error:
+                print(f"Error in exclusion rule {rule!r}: {error}")
+                continue
+            field, kind, pattern = parse_rule(rule)
+            if kind == 'exact':
+                exact[field].add(pattern.lower())
+            elif kind == 'glob':
+                # translate() anchors the end only; globs must match the whole value
+                expressions[field].append(r'\A' + fnmatch.translate(pattern))
+            else:
+                expressions[field].append(pattern)
+        self._exact = {field: frozenset(values) for field, values in exact.items() if values}
+        self._patterns = {field: re.compile('|'.join(f"(?:{expression})" for expression in values), re.IGNORECASE)
+                          for field, values in expressions.items() if values}
+
+    def __bool__(self):
+        return bool(self._exact or self._patterns)
+
+    def _matches(self, field, value):
+        if not value:
+            return False
+        exact = self._exact.get(field)
+        if exact is not None and value.lower() in exact:
+            return True
+        pattern = self._patterns.get(field)
+        return pattern is not None and pattern.search(value) is not None
+
+    def excludes_title(self, title):
+        return self._matches('title', title)
+
+    def excludes_name(self, process_name):
+        return self._matches('name', process_name)
+
+    def excludes(self, process_name=None, exe=None, title=None):
+        return (self._matches('name', process_name) or self._matches('exe', exe)
+                or self._matches('title', title))
+
+    def excludes_window(self, window):
+        return self.excludes(window.get('process_name'), window.get('exe'), window.get('title'))
+
+
+@lru_cache(maxsize=8)
+def _compile(rules):
+    return ExclusionRules(rules)
+
+
+def compile_rules(excluded):
+    """ExclusionRules for a collection of rule strings, compiled once per distinct set."""
+    if isinstance(excluded, ExclusionRules):
+        return excluded
+    return _compile(tuple(sorted(excluded or ())))
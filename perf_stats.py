@@ -0,0 +1,185 @@
+"""Lightweight timing and counter instrumentation.
+
+Hot paths record into the process-wide `stats` registry:
+
+    with stats.timer('capture'):        # or @stats.timed('capture')
+        ...
+    stats.count('store.bytes_written', size)
+    stats.observe('capture.windows', len(windows))
+
+Timers and observations keep count, total, min, max and last value, so
+recording is a few dict operations and safe to leave on. Sources such as the
+process metadata cache register a callback whose dict is included in
+snapshot(). `profiled(kind)` records a cProfile dump of the next capture or
+restore when profiling has been armed with enable_profiling().
+"""
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class _Series:
+    __slots__ = ('count', 'total', 'min', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.last = value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def as_dict(self, scale=1.0):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'total': self.total * scale,
+            'mean': self.total / self.count * scale,
+            'min': self.min * scale,
+            'max': self.max * scale,
+            'last': self.last * scale,
+        }
+
+
+class PerfStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._values = {}
+        self._counters = {}
+        self._sources = {}
+        self._started = time.time()
+        self.profile_dir = None
+        self._profile_kinds = set()
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            series = self._timings.get(name)
+            if series is None:
+                series = self._timings[name] = _Series()
+            series.add(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """Decorator form of timer()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name, value):
+        with self._lock:
+            series = self._values.get(name)
+            if series is None:
+                series = self._values[name] = _Series()
+            series.add(value)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def register_source(self, name, callback):
+        """Include `callback()` (a dict) under `name` in every snapshot."""
+        self._sources[name] = callback
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._values.clear()
+            self._counters.clear()
+            self._started = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            data = {
+                'since': datetime.fromtimestamp(self._started).isoformat(timespec='seconds'),
+                'timings_ms': {name: s.as_dict(1000.0) for name, s in sorted(self._timings.items())},
+                'values': {name: s.as_dict() for name, s in sorted(self._values.items())},
+                'counters': dict(sorted(self._counters.items())),
+            }
+        sources = {}
+        for name, callback in list(self._sources.items()):
+            try:
+                sources[name] = callback()
+            except Exception as e:
+                sources[name] = {'error': str(e)}
+        data['sources'] = sources
+        return data
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def summary_lines(self):
+        """Short human-readable lines for the stats panel."""
+        data = self.snapshot()
+        lines = []
+        for name, timing in data['timings_ms'].items():
+            if timing['count']:
+                lines.append(f"{name}: {timing['count']}x, mean {timing['mean']:.1f} ms, "
+                             f"max {timing['max']:.1f} ms")
+        for name, value in data['values'].items():
+            if value['count']:
+                lines.append(f"{name}: mean {value['mean']:.1f}, last {value['last']:.0f}")
+        for name, value in data['counters'].items():
+            lines.append(f"{name}: {value}")
+        for name, source in data['sources'].items():
+            if 'hit_rate' in source:
+                lines.append(f"{name} hit rate: {source['hit_rate']:.0%}")
+            if 'interval' in source:
+                lines.append(f"{name} interval: {source['interval']:.0f}s")
+        return lines
+
+    # Profiling
+
+    def enable_profiling(self, directory, kinds=('capture', 'restore')):
+        """Record a cProfile dump for the next operation of each kind."""
+        os.makedirs(directory, exist_ok=True)
+        self.profile_dir = directory
+        with self._lock:
+            self._profile_kinds.update(kinds)
+
+    @contextmanager
+    def profiled(self, kind):
+        with self._lock:
+            armed = kind in self._profile_kinds
+            self._profile_kinds.discard(kind)
+        if not armed:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = os.path.join(self.profile_dir, f"{kind}_{datetime.now():%Y%m%d_%H%M%S}.prof")
+            profiler.dump_stats(path)
+            print(f"Wrote {kind} profile to {path}")
+
+
+stats = PerfStats()
@@ -0,0 +1,215 @@
+"""Process metadata cache and background process catalog shared across captures."""
+import threading
+import time
+from collections import OrderedDict
+
+from window_backend import ProcessNotFound, ProcessAccessDenied
+
+# Marker stored for processes whose metadata could not be read
+_ACCESS_DENIED = object()
+
+
+class ProcessMetadataCache:
+    """LRU cache of backend.get_process_info() results.
+
+    Entries are keyed by (pid, create_time), so a pid reused by a new process
+    never returns the old process's metadata. AccessDenied results are cached
+    as well, so protected processes cost one cheap create_time lookup per
+    capture instead of a full metadata query. Entries not touched during a
+    capture are checked for liveness every `sweep_every` captures and
+    dropped if their process has exited.
+
+    It also remembers the name of every process it has seen (and, if a
+    ProcessCatalog is attached, every pid in the catalog), so exclusion rules
+    can drop a window by process name before any metadata is read. Names are
+    checked against the process's create time too, so a reused pid never
+    inherits the name of the process that had it before.
+    """
+
+    def __init__(self, backend, max_size=512, sweep_every=10):
+        self.backend = backend
+        self.max_size = max_size
+        self.sweep_every = sweep_every
+        self._entries = OrderedDict()
+        self._seen = set()
+        self._capture_keys = {}
+        self._captures = 0
+        self._names = {}  # (pid, create_time) -> process name
+        self.catalog = None
+        self.hits = 0
+        self.misses = 0
+        self.denied_hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, pid):
+        # Within a capture each pid costs at most one create_time lookup
+        key = self._capture_keys.get(pid)
+        if key is None:
+            try:
+                create_time = self.backend.get_process_create_time(pid)
+            except ProcessAccessDenied:
+                create_time = None
+            key = (pid, create_time)
+            self._capture_keys[pid] = key
+            self._seen.add(key)
+        return key
+
+    def cached_name(self, pid):
+        """Name of the process now running as `pid` if already known, else None.
+
+        Costs at most the create_time lookup that get() makes anyway.
+        """
+        try:
+            key = self._key(pid)
+        except ProcessNotFound:
+            return None
+        name = self._names.get(key)
+        if name is None and self.catalog is not None:
+            name = self.catalog.name_for(*key)
+        return name
+
+    def get(self, pid):
+        """Return the metadata dict for `pid`.
+
+        Raises ProcessNotFound or ProcessAccessDenied like the backend does.
+        """
+        key = self._key(pid)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if entry is _ACCESS_DENIED:
+                self.denied_hits += 1
+                raise ProcessAccessDenied(f"access denied (pid={pid}, cached)")
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        try:
+            entry = self.backend.get_process_info(pid)
+        except ProcessAccessDenied:
+            self._store(key, _ACCESS_DENIED)
+            raise
+        self._store(key, entry)
+        self._names[key] = entry['name']
+        return entry
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        if len(self._entries) > self.max_size:
+            self.evict_dead()
+        while len(self._entries) > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._names.pop(evicted, None)
+            self.evictions += 1
+
+    def end_capture(self):
+        """Called after each capture; periodically sweeps out dead processes."""
+        self._captures += 1
+        if self.sweep_every and self._captures % self.sweep_every == 0:
+            self.evict_dead(skip=self._seen)
+        self._seen = set()
+        self._capture_keys = {}
+
+    def evict_dead(self, skip=()):
+        """Drop entries whose process has exited or whose pid was reused."""
+        for key in list(self._entries):
+            if key in skip:
+                continue
+            pid, create_time = key
+            try:
+                alive = self.backend.get_process_create_time(pid) == create_time
+            except ProcessAccessDenied:
+                alive = create_time is None
+            except ProcessNotFound:
+                alive = False
+            if not alive:
+                del self._entries[key]
+                self._names.pop(key, None)
+                self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._names.clear()
+        self._seen = set()
+        self._capture_keys = {}
+
+    def stats(self):
+        lookups = self.hits + self.denied_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'denied_hits': self.denied_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.denied_hits) / lookups if lookups else 0.0,
+        }
+
+
+class ProcessCatalog:
+    """pid -> process name table for every running process, refreshed on a background thread.
+
+    `names` is replaced as a whole on each refresh, so readers on other
+    threads never see a half-built table. Since the table is keyed by pid
+    alone, name_for() only trusts it for processes created before the
+    listing started. `generation` increases with every
+    refresh, which lets a UI tell when to repopulate.
+    """
+
+    def __init__(self, backend, interval=30.0):
+        self.backend = backend
+        self.interval = interval
+        self.names = {}
+        self._listing = (0.0, self.names)  # (time the listing started, names)
+        self.generation = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def process_names(self):
+        return sorted({name for name in self.names.values() if name})
+
+    def name_for(self, pid, create_time):
+        """Listed name of `pid`, or None if the process may have started after the listing."""
+        listed_at, names = self._listing
+        if create_time is None or create_time >= listed_at:
+            return None
+        return names.get(pid)
+
+    def refresh(self):
+        started = time.time()
+        try:
+            names = {pid: name for pid, name in self.backend.iter_processes()}
+        except Exception as e:
+            print(f"Error listing processes: {str(e)}")
+            return
+        self.names = names
+        self._listing = (started, names)
+        self.generation += 1
+
+    def request_refresh(self):
+        """Refresh as soon as possible without waiting for the interval."""
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="process-catalog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
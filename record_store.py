@@ -0,0 +1,111 @@
+"""Content-addressed store for window records shared between snapshots.
+
+Every distinct window record is written once to an append-only pack file
+(`records.jsonl`), one `{"h": digest, "w": record}` line per record.
+Snapshots reference records by digest. Reference counts are rebuilt from the
+snapshots on load (mark) and unreferenced records are dropped by rewriting
+the pack once enough garbage has accumulated (sweep). The pack itself is only
+read the first time a record is needed; reference counts are kept separately
+so they can be persisted and restored without touching the pack.
+Records are held in memory as compact WindowRecords (see window_record).
+"""
+import json
+import os
+from collections import Counter
+
+from perf_stats import stats
+from window_record import compact_window, json_default
+from write_queue import DirectWriter
+
+RECORDS_FILE = 'records.jsonl'
+
+
+class RecordStore:
+    def __init__(self, directory, compact_ratio=0.5, min_garbage=256, writer=None):
+        self.path = os.path.join(directory, RECORDS_FILE)
+        self.writer = writer if writer is not None else DirectWriter()
+        self.size = 0  # bytes in the pack, including queued appends
+        self.compact_ratio = compact_ratio
+        self.min_garbage = min_garbage
+        self.records = {}
+        self.refcounts = Counter()
+        self.loaded = False
+
+    def __contains__(self, digest):
+        self.ensure_loaded()
+        return digest in self.records
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self.records)
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def load(self):
+        self.records = {}
+        self.loaded = True
+        self.writer.flush()
+        if not os.path.exists(self.path):
+            return
+        self.size = os.path.getsize(self.path)
+        with open(self.path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    self.records[entry['h']] = compact_window(entry['w'])
+                except Exception as e:
+                    # A torn final line from a crash loses only that record
+                    print(f"Error loading record {line_number}: {str(e)}")
+
+    def get(self, digest):
+        self.ensure_loaded()
+        return self.records.get(digest)
+
+    def put_many(self, windows, digests):
+        """Store records not yet in the pack; returns the number written."""
+        self.ensure_loaded()
+        lines = []
+        for window, digest in zip(windows, digests):
+            if digest not in self.records:
+                self.records[digest] = compact_window(window)
+                lines.append(json.dumps({'h': digest, 'w': window}, separators=(',', ':'), default=json_default))
+        if lines:
+            data = ('\n'.join(lines) + '\n').encode('utf-8')
+            self.writer.append(self.path, data)
+            self.size += len(data)
+            stats.count('records.bytes_written', len(data))
+        return len(lines)
+
+    def incref(self, digests):
+        self.refcounts.update(digests)
+
+    def decref(self, digests):
+        self.refcounts.subtract(digests)
+
+    def garbage(self):
+        self.ensure_loaded()
+        return [digest for digest in self.records if self.refcounts[digest] <= 0]
+
+    def collect(self, force=False):
+        """Rewrite the pack without unreferenced records; returns bytes reclaimed."""
+        dead = self.garbage()
+        if not dead:
+            return 0
+        if not force and (len(dead) < self.min_garbage
+                          or len(dead) < self.compact_ratio * len(self.records)):
+            return 0
+
+        for digest in dead:
+            del self.records[digest]
+            self.refcounts.pop(digest, None)
+
+        old_size = self.size
+        data = ''.join(json.dumps({'h': digest, 'w': window}, separators=(',', ':'), default=json_default) + '\n'
+                       for digest, window in self.records.items()).encode('utf-8')
+        self.writer.write(self.path, data)
+        self.size = len(data)
+        return old_size - self.size
@@ -0,0 +1,161 @@
+"""Qt-free workspace restore.
+
+RestoreEngine launches every missing application up front, then polls the
+desktop until each saved window has appeared (or a deadline passes),
+applying placements as soon as windows show up. Windows that are already
+where the snapshot puts them are found up front by diffing the live desktop
+against the snapshot (see workspace_diff) and left alone, so restoring a
+mostly-correct desktop only touches what moved. Each poll enumerates the
+desktop once and matches all pending windows in a single assignment step
+(see window_matcher). It never blocks longer than one poll interval at a
+time, reports progress through a callback and stops when its cancel event
+is set.
+"""
+import threading
+import time
+from collections import Counter
+
+from perf_stats import stats
+from process_cache import ProcessMetadataCache
+from window_matcher import LiveWindowIndex, MatchStats, match_windows
+from workspace_capture import capture_window
+from workspace_diff import diff_windows
+
+
+class RestoreResult:
+    def __init__(self):
+        self.restored = []
+        self.unchanged = []  # already in place, left alone
+        self.missing = []
+        self.launched = []
+        self.errors = []
+        self.cancelled = False
+        self.elapsed = 0.0
+        self.match_stats = MatchStats()
+
+    def summary(self):
+        text = f"Restored {len(self.restored)} windows"
+        if self.match_stats.fuzzy:
+            text += f" ({self.match_stats.fuzzy} by similar title)"
+        if self.unchanged:
+            text += f", {len(self.unchanged)} already in place"
+        if self.missing:
+            text += f", {len(self.missing)} not found"
+        if self.cancelled:
+            text += " (cancelled)"
+        return text
+
+
+class RestoreEngine:
+    def __init__(self, backend, windows, timeout=30.0, poll_interval=0.5,
+                 progress=None, cancel_event=None, min_score=0.5, skip_in_place=True):
+        self.backend = backend
+        self.windows = list(windows)
+        self.min_score = min_score
+        self.skip_in_place = skip_in_place
+        self.process_cache = ProcessMetadataCache(backend)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.progress = progress or (lambda done, total, message: None)
+        self.cancel_event = cancel_event or threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def launch_missing(self, result):
+        """Start every application that has no running process, all at once."""
+        running = {name for _, name in self.backend.iter_processes()}
+        launched = set()
+        for window in self.windows:
+            process_name = window.get('process_name')
+            exe = window.get('exe')
+            if not exe or process_name in running or process_name in launched:
+                continue
+            try:
+                self.backend.start_process(exe)
+                launched.add(process_name)
+                result.launched.append(process_name)
+                print(f"Starting process: {process_name}")
+            except Exception as e:
+                stats.count('restore.errors.start_process')
+                print(f"Error starting process {process_name}: {str(e)}")
+                result.errors.append(f"{process_name}: {str(e)}")
+
+    def skip_windows_in_place(self, result):
+        """Diff the live desktop against the snapshot.
+
+        Returns the windows that still need restoring and the handles of the
+        live windows that are already in place (so they aren't matched again).
+        """
+        live = []
+        hwnds = {}
+        for hwnd in self.backend.enum_windows():
+            window = capture_window(self.backend, hwnd, self.process_cache.get)
+            if window is not None:
+                hwnds[id(window)] = hwnd
+                live.append(window)
+        self.process_cache.end_capture()
+
+        in_place = diff_windows(live, self.windows).in_place()
+        result.unchanged = [saved for _, saved in in_place]
+        # Identical records can be shared, so count rather than test membership
+        skip = Counter(id(saved) for saved in result.unchanged)
+        pending = []
+        for window in self.windows:
+            if skip[id(window)]:
+                skip[id(window)] -= 1
+            else:
+                pending.append(window)
+        stats.observe('restore.windows_in_place', len(in_place))
+        return pending, {hwnds[id(live_window)] for live_window, _ in in_place}
+
+    def apply_ready(self, pending, result, used):
+        """Place every pending window that is on screen now; returns those still missing."""
+        match_stats = result.match_stats
+        start = time.perf_counter()
+        index = LiveWindowIndex.from_backend(self.backend, self.process_cache.get)
+        self.process_cache.end_capture()
+        match_stats.index_time += time.perf_counter() - start
+
+        matches = match_windows(pending, index, used, self.min_score, match_stats)
+        matched = set()
+        for position, live, score in matches:
+            window = pending[position]
+            matched.add(position)
+            used.add(live.hwnd)
+            try:
+                self.backend.set_window_placement(live.hwnd, window['placement'])
+                result.restored.append(window)
+                print(f"Restored window: {window['title']}")
+            except Exception as e:
+                stats.count('restore.errors.set_placement')
+                print(f"Error setting window placement: {str(e)}")
+                result.errors.append(f"{window.get('title')}: {str(e)}")
+            self.progress(len(result.restored) + len(result.unchanged), len(self.windows),
+                          window.get('title', ''))
+        return [window for position, window in enumerate(pending) if position not in matched]
+
+    def run(self):
+        start = time.monotonic()
+        result = RestoreResult()
+        pending = self.windows
+        used = set()
+        if self.skip_in_place:
+            pending, used = self.skip_windows_in_place(result)
+        self.progress(len(result.unchanged), len(self.windows), "Launching applications")
+        self.launch_missing(result)
+
+        deadline = start + self.timeout
+        while pending:
+            if self.cancel_event.is_set():
+                result.cancelled = True
+                break
+            pending = self.apply_ready(pending, result, used)
+            if not pending or time.monotonic() >= deadline:
+                break
+            # Waiting on the cancel event lets cancellation cut the delay short
+            self.cancel_event.wait(self.poll_interval)
+
+        result.missing = list(pending)
+        result.elapsed = time.monotonic() - start
+        return result
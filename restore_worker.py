@@ -0,0 +1,82 @@
+"""Background workspace restore for the GUI."""
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from perf_stats import stats
+from restore_engine import RestoreEngine
+
+
+class _RestoreSignals(QObject):
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object, object)  # workspace name, RestoreResult
+    failed = pyqtSignal(object, str)
+
+
+class _RestoreTask(QRunnable):
+    def __init__(self, engine, workspace_name, signals):
+        super().__init__()
+        self.engine = engine
+        self.workspace_name = workspace_name
+        self.signals = signals
+
+    def run(self):
+        try:
+            with stats.profiled('restore'):
+                result = self.engine.run()
+            stats.add_time('restore', result.elapsed)
+            stats.observe('restore.windows_restored', len(result.restored))
+            stats.observe('restore.windows_missing', len(result.missing))
+            self.signals.finished.emit(self.workspace_name, result)
+        except Exception as e:
+            stats.count('errors.restore')
+            self.signals.failed.emit(self.workspace_name, str(e))
+
+
+class WorkspaceRestorer(QObject):
+    """Runs one RestoreEngine at a time off the GUI thread."""
+
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+    def __init__(self, backend, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._cancel_event = None
+        self._signals = _RestoreSignals()
+        self._signals.progress.connect(self.progress)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+
+    @property
+    def busy(self):
+        return self._cancel_event is not None
+
+    def start(self, workspace_name, windows, timeout=30.0, skip_in_place=True):
+        if self.busy:
+            return False
+        self._cancel_event = threading.Event()
+        engine = RestoreEngine(self.backend, windows, timeout=timeout,
+                               progress=self._signals.progress.emit,
+                               cancel_event=self._cancel_event, skip_in_place=skip_in_place)
+        self.pool.start(_RestoreTask(engine, workspace_name, self._signals))
+        return True
+
+    def cancel(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    def _on_finished(self, workspace_name, result):
+        self._cancel_event = None
+        self.finished.emit(workspace_name, result)
+
+    def _on_failed(self, workspace_name, error):
+        self._cancel_event = None
+        self.failed.emit(workspace_name, error)
+
+    def shutdown(self, timeout_ms=3000):
+        self.cancel()
+        self.pool.waitForDone(timeout_ms)
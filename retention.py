@@ -0,0 +1,138 @@
+"""Tiered retention for auto-saved workspaces.
+
+A policy is a list of (max_age, spacing) tiers in seconds, youngest first.
+Snapshots younger than a tier's max_age fall in that tier and are thinned to
+one per `spacing` seconds (0 keeps everything); snapshots older than the last
+tier are kept unless `keep_older` is turned off. Buckets are cut at local
+time boundaries, so daily spacing keeps one snapshot per local calendar day.
+The oldest snapshot of each bucket is the one kept, so a kept snapshot stays
+kept as it ages. Pinned (manually saved) workspaces are never thinned.
+
+Only snapshots marked as auto-saves are candidates: snapshots saved before
+auto-saves were marked carry no flag and are kept like manual saves, unless
+they are deltas, which only auto-saves are stored as.
+"""
+import time
+from datetime import datetime
+
+from search_index import parse_save_time
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+DEFAULT_TIERS = [
+    (HOUR, 0),          # everything from the last hour
+    (DAY, HOUR),        # hourly for a day
+    (30 * DAY, DAY),    # daily for a month
+]
+_EPOCH = datetime(1970, 1, 1)
+
+
+def is_pinned(entry):
+    """True if a manifest entry (or workspace) is never removed by retention."""
+    if 'pinned' in entry:
+        return bool(entry['pinned'])
+    return 'base' not in entry
+
+
+class RetentionPolicy:
+    def __init__(self, tiers=None, keep_older=True):
+        self.tiers = sorted(tiers or DEFAULT_TIERS)
+        self.keep_older = keep_older
+
+    @classmethod
+    def from_settings(cls, settings):
+        # Deleting snapshots past the last tier is opt-in ('delete_older');
+        # a 'keep_older' value saved by earlier versions was never chosen by the user
+        settings = settings or {}
+        return cls([tuple(tier) for tier in settings.get('tiers', DEFAULT_TIERS)],
+                   not settings.get('delete_older', False))
+
+    def to_settings(self):
+        return {'tiers': [list(tier) for tier in self.tiers], 'delete_older': not self.keep_older}
+
+    def expired(self, snapshots, now=None):
+        """Return the names to delete from an iterable of (name, save_time, pinned).
+
+        `save_time` is a naive local datetime (or None when unknown, which is
+        always kept).
+        """
+        now = now if now is not None else time.time()
+        kept_buckets = set()
+        expired = []
+        dated = [(t.timestamp(), (t - _EPOCH).total_seconds(), name)
+                 for name, t, pinned in snapshots if t is not None and not pinned]
+        # Oldest first, so the first snapshot seen in a bucket is its oldest
+        for timestamp, local_seconds, name in sorted(dated):
+            age = now - timestamp
+            for tier_index, (max_age, spacing) in enumerate(self.tiers):
+                if age < max_age:
+                    break
+            else:
+                if not self.keep_older:
+                    expired.append(name)
+                continue
+            if spacing <= 0:
+                continue
+            bucket = (tier_index, int(local_seconds // spacing))
+            if bucket in kept_buckets:
+                expired.append(name)
+            else:
+                kept_buckets.add(bucket)
+        return expired
+
+
+class Compactor:
+    """Deletes expired workspaces a few at a time.
+
+    `delete(name)` must remove one workspace and return the bytes it freed.
+    Each step() works for at most `budget` seconds, so the caller can run
+    it from an idle timer without long pauses.
+    """
+
+    def __init__(self, delete):
+        self.delete = delete
+        self.queue = []
+        self.reclaimed_bytes = 0
+        self.deleted = 0
+
+    @property
+    def pending(self):
+        return len(self.queue)
+
+    def schedule(self, names):
+        queued = set(self.queue)
+        self.queue.extend(name for name in names if name not in queued)
+
+    def step(self, budget=0.02):
+        """Delete queued workspaces until the time budget is spent; returns bytes freed."""
+        deadline = time.perf_counter() + budget
+        freed = 0
+        while self.queue and time.perf_counter() < deadline:
+            name = self.queue.pop(0)
+            try:
+                freed += self.delete(name)
+                self.deleted += 1
+            except Exception as e:
+                print(f"Error compacting workspace {name}: {str(e)}")
+        self.reclaimed_bytes += freed
+        return freed
+
+
+def expired_workspaces(store, policy, save_time=None, now=None):
+    """Names in `store` that `policy` would delete, deltas before their keyframes.
+
+    `save_time(name)` returns a workspace's datetime; by default it is parsed
+    from the manifest entry.
+    """
+    if save_time is None:
+        def save_time(name):
+            try:
+                return parse_save_time(store.info(name))
+            except ValueError:
+                return None
+    snapshots = ((name, save_time(name), is_pinned(store.info(name))) for name in store.names())
+    expired = policy.expired(snapshots, now)
+    # Deleting a delta first means it isn't rewritten when its keyframe goes
+    expired.sort(key=lambda name: 'base' not in store.info(name))
+    return expired
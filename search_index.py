@@ -0,0 +1,153 @@
+"""In-memory search index over the workspace manifest.
+
+Built once from the manifest and kept up to date on save/delete, so the
+filter bar never has to touch snapshot files or re-parse dates:
+
+- save times are parsed once and kept sorted for range queries;
+- every search term (window titles, process names, exe paths and the
+  workspace name itself, lowercased) maps to the workspaces containing it,
+  and a trigram index narrows substring queries down to candidate terms.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from perf_stats import stats
+
+SAVE_TIME_FORMAT = "%Y-%m-%d %I:%M:%S %p"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def parse_save_time(entry):
+    """Parse a workspace's save_time, falling back to its timestamp."""
+    save_time_str = entry.get('save_time')
+    if save_time_str:
+        return datetime.strptime(save_time_str, SAVE_TIME_FORMAT)
+    timestamp = entry.get('timestamp')
+    if timestamp:
+        return datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    return datetime.now()
+
+
+def date_filter_range(filter_option, now=None):
+    """Return (start, end) for a filter combo option, or None for no date filter."""
+    now = now or datetime.now()
+    if filter_option == "Today":
+        start = datetime(now.year, now.month, now.day)
+        return start, start + timedelta(days=1)
+    if filter_option == "Last 7 Days":
+        return now - timedelta(days=8) + timedelta(microseconds=1), None
+    if filter_option == "Last 30 Days":
+        return now - timedelta(days=31) + timedelta(microseconds=1), None
+    return None
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class WorkspaceSearchIndex:
+    def __init__(self):
+        self._times = []              # sorted (datetime, name)
+        self._workspace_time = {}     # name -> datetime
+        self._workspace_terms = {}    # name -> set of terms
+        self._term_workspaces = defaultdict(set)
+        self._trigram_terms = defaultdict(set)
+
+    def __len__(self):
+        return len(self._workspace_terms)
+
+    @stats.timed('search_index.build')
+    def build(self, store):
+        for name in store.names():
+            self.add(name, store.info(name), store.search_terms(name))
+
+    def add(self, name, entry, terms):
+        if name in self._workspace_terms:
+            self.remove(name)
+
+        try:
+            save_time = parse_save_time(entry)
+            self._workspace_time[name] = save_time
+            insort(self._times, (save_time, name))
+        except ValueError as e:
+            # Unparseable dates never match a date filter
+            print(f"Error filtering workspace {name}: {str(e)}")
+
+        terms = set(terms)
+        terms.add(name.lower())
+        self._workspace_terms[name] = terms
+        for term in terms:
+            workspaces = self._term_workspaces[term]
+            if not workspaces:
+                for trigram in _trigrams(term):
+                    self._trigram_terms[trigram].add(term)
+            workspaces.add(name)
+
+    def remove(self, name):
+        terms = self._workspace_terms.pop(name, None)
+        if terms is None:
+            return
+        save_time = self._workspace_time.pop(name, None)
+        if save_time is not None:
+            i = bisect_left(self._times, (save_time, name))
+            if i < len(self._times) and self._times[i] == (save_time, name):
+                del self._times[i]
+        for term in terms:
+            workspaces = self._term_workspaces[term]
+            workspaces.discard(name)
+            if not workspaces:
+                del self._term_workspaces[term]
+                for trigram in _trigrams(term):
+                    trigram_terms = self._trigram_terms[trigram]
+                    trigram_terms.discard(term)
+                    if not trigram_terms:
+                        del self._trigram_terms[trigram]
+
+    def save_time(self, name):
+        return self._workspace_time.get(name)
+
+    def _matching_terms(self, text):
+        if len(text) < 3:
+            candidates = self._term_workspaces.keys()
+        else:
+            postings = sorted((self._trigram_terms.get(t, ()) for t in _trigrams(text)), key=len)
+            if not postings[0]:
+                return []
+            candidates = set(postings[0]).intersection(*postings[1:])
+        return [term for term in candidates if text in term]
+
+    def names_matching(self, text):
+        """Workspaces with a title, process, exe or name containing `text`."""
+        names = set()
+        for term in self._matching_terms(text.lower()):
+            names.update(self._term_workspaces[term])
+        return names
+
+    def names_between(self, start, end=None):
+        """Workspaces saved in [start, end)."""
+        lo = bisect_left(self._times, (start, ''))
+        hi = len(self._times) if end is None else bisect_left(self._times, (end, ''))
+        return {name for _, name in self._times[lo:hi]}
+
+    def search(self, text, time_range=None):
+        """Names matching both the text and the (start, end) range; None means no filter."""
+        names = None
+        if time_range is not None:
+            names = self.names_between(*time_range)
+        if text:
+            matching = self.names_matching(text)
+            names = matching if names is None else names & matching
+        return names
+
+    def matches(self, name, text, time_range=None):
+        """Single-workspace version of search(), used for newly saved workspaces."""
+        if time_range is not None:
+            save_time = self._workspace_time.get(name)
+            start, end = time_range
+            if save_time is None or save_time < start or (end is not None and save_time >= end):
+                return False
+        if text:
+            text = text.lower()
+            return any(text in term for term in self._workspace_terms.get(name, ()))
+        return True
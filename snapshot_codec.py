@@ -0,0 +1,140 @@
+"""Serialization codecs for snapshot and settings files.
+
+JSON is written as plain text so files stay readable and load in older
+versions. Every other combination gets a small header that records how the
+payload was encoded:
+
+    b"WSM" + format version + codec id + compression id + payload
+
+decode() looks at the first bytes and picks the matching decoder, so files
+written with any codec (including the original pretty-printed JSON) load
+regardless of the codec currently configured.
+
+msgpack and zstd are optional: they are imported on first use and
+`available()` only lists what can actually be used here.
+"""
+import json
+import zlib
+
+from perf_stats import stats
+from window_record import json_default
+
+MAGIC = b"WSM"
+FORMAT_VERSION = 1
+
+# Codec and compression ids stored in the header; never renumber these
+CODECS = {'json': 0, 'json-compact': 1, 'msgpack': 2}
+COMPRESSIONS = {None: 0, 'zlib': 1, 'zstd': 2}
+_CODEC_NAMES = {value: key for key, value in CODECS.items()}
+_COMPRESSION_NAMES = {value: key for key, value in COMPRESSIONS.items()}
+
+
+class CodecError(Exception):
+    pass
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise CodecError("The msgpack codec requires the 'msgpack' package")
+    return msgpack
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise CodecError("zstd compression requires the 'zstandard' package")
+    return zstandard
+
+
+def available():
+    """Return (codecs, compressions) usable in this environment."""
+    codecs = ['json', 'json-compact']
+    compressions = [None, 'zlib']
+    try:
+        _msgpack()
+        codecs.append('msgpack')
+    except CodecError:
+        pass
+    try:
+        _zstd()
+        compressions.append('zstd')
+    except CodecError:
+        pass
+    return codecs, compressions
+
+
+def _serialize(obj, codec):
+    if codec == 'json':
+        return json.dumps(obj, indent=4, default=json_default).encode('utf-8')
+    if codec == 'json-compact':
+        return json.dumps(obj, separators=(',', ':'), default=json_default).encode('utf-8')
+    if codec == 'msgpack':
+        return _msgpack().packb(obj, use_bin_type=True, default=json_default)
+    raise CodecError(f"Unknown codec: {codec}")
+
+
+def _deserialize(payload, codec):
+    if codec in ('json', 'json-compact'):
+        return json.loads(payload)
+    if codec == 'msgpack':
+        return _msgpack().unpackb(payload, raw=False)
+    raise CodecError(f"Unknown codec: {codec}")
+
+
+def _compress(payload, compression, level):
+    if compression is None:
+        return payload
+    if compression == 'zlib':
+        return zlib.compress(payload, 6 if level is None else level)
+    if compression == 'zstd':
+        return _zstd().ZstdCompressor(level=3 if level is None else level).compress(payload)
+    raise CodecError(f"Unknown compression: {compression}")
+
+
+def _decompress(payload, compression):
+    if compression is None:
+        return payload
+    if compression == 'zlib':
+        return zlib.decompress(payload)
+    if compression == 'zstd':
+        return _zstd().ZstdDecompressor().decompress(payload)
+    raise CodecError(f"Unknown compression: {compression}")
+
+
+@stats.timed('codec.encode')
+def encode(obj, codec='json-compact', compression=None, level=None):
+    payload = _serialize(obj, codec)
+    if codec in ('json', 'json-compact') and compression is None:
+        return payload
+    if compression not in COMPRESSIONS:
+        raise CodecError(f"Unknown compression: {compression}")
+    header = MAGIC + bytes((FORMAT_VERSION, CODECS[codec], COMPRESSIONS[compression]))
+    return header + _compress(payload, compression, level)
+
+
+def detect(data):
+    """Return (codec, compression) of encoded data."""
+    if not data.startswith(MAGIC):
+        return 'json', None
+    if len(data) < 6 or data[3] != FORMAT_VERSION:
+        raise CodecError("Unsupported snapshot format")
+    try:
+        return _CODEC_NAMES[data[4]], _COMPRESSION_NAMES[data[5]]
+    except KeyError:
+        raise CodecError("Unknown codec in snapshot header")
+
+
+@stats.timed('codec.decode')
+def decode(data):
+    codec, compression = detect(data)
+    if not data.startswith(MAGIC):
+        return json.loads(data)
+    return _deserialize(_decompress(data[6:], compression), codec)
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return decode(f.read())
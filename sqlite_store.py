@@ -0,0 +1,407 @@
+"""SQLite storage engine for saved workspaces.
+
+An alternative to the per-file WorkspaceStore with the same API. Every
+snapshot is a row in one database (`workspaces.db`) indexed by save time,
+and window records are shared between snapshots in a reference-counted
+`records` table, so a save is one small transaction instead of a full JSON
+file.
+
+- Atomic commits: each save or delete is a single transaction, so a crash
+  leaves either the old or the new snapshot, never a torn one.
+- Batched fsync: the database runs in WAL mode with synchronous=NORMAL,
+  so commits only append to the write-ahead log; the log is checkpointed
+  (and fsynced) every `sync_every` commits and on close().
+- Crash recovery: SQLite replays or discards the log on open; after an
+  unclean shutdown the database is also integrity-checked.
+
+Existing per-file directories are migrated on first open (see migrate_from).
+"""
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from perf_stats import stats
+from search_index import parse_save_time
+from window_record import compact_window, json_default
+from workspace_store import KEY_SEPARATOR, window_digest, windows_fingerprint, window_keys, window_search_terms
+
+DATABASE_FILE = 'workspaces.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workspaces (
+    name TEXT PRIMARY KEY,
+    saved_at REAL,
+    meta TEXT NOT NULL,
+    records TEXT NOT NULL,
+    fingerprint TEXT,
+    terms TEXT NOT NULL,
+    window_keys TEXT
+);
+CREATE INDEX IF NOT EXISTS workspaces_saved_at ON workspaces (saved_at);
+CREATE TABLE IF NOT EXISTS records (
+    digest TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    refcount INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS records_garbage ON records (refcount) WHERE refcount <= 0;
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), default=json_default)
+
+
+class SqliteWorkspaceStore:
+    def __init__(self, workspace_dir, sync_every=20, min_garbage=256, cache_size=32):
+        self.workspace_dir = workspace_dir
+        self.sync_every = sync_every
+        self.min_garbage = min_garbage
+        self.cache_size = cache_size
+        self.manifest = {}  # workspace name -> manifest entry
+        self.terms = []
+        self._term_ids = {}
+        self._cache = OrderedDict()  # workspace name -> workspace data
+        self.last_fingerprint = None
+        self.recovered = False
+        self._depth = 0
+        self._unsynced = 0
+
+        if not os.path.exists(self.workspace_dir):
+            os.makedirs(self.workspace_dir)
+        self.path = os.path.join(workspace_dir, DATABASE_FILE)
+        # Autocommit mode: transactions are managed explicitly below
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(workspaces)")}
+        if 'window_keys' not in columns:
+            # Databases created before the timeline; filled in as rows are read
+            self.conn.execute("ALTER TABLE workspaces ADD COLUMN window_keys TEXT")
+        self._recover()
+
+    def __contains__(self, workspace_name):
+        return workspace_name in self.manifest
+
+    def __len__(self):
+        return len(self.manifest)
+
+    # Transactions
+
+    @contextmanager
+    def transaction(self):
+        """Group statements into one atomic commit; nested uses join the outer one."""
+        if self._depth == 0:
+            self.conn.execute("BEGIN IMMEDIATE")
+        self._depth += 1
+        try:
+            yield self.conn
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.execute("ROLLBACK")
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            self.conn.execute("COMMIT")
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self.flush()
+
+    def flush(self):
+        """Checkpoint the write-ahead log, making every commit so far durable."""
+        self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        self._unsynced = 0
+
+    def close(self):
+        self._set_setting('clean_shutdown', True)
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
+
+    def _recover(self):
+        if self._get_setting('clean_shutdown', True):
+            self._set_setting('clean_shutdown', False)
+            return
+        # The log was already replayed by SQLite; make sure the result is sound
+        self.recovered = True
+        problems = [row[0] for row in self.conn.execute("PRAGMA quick_check")]
+        if problems != ['ok']:
+            print(f"Error checking workspace database: {'; '.join(problems)}")
+        self._set_setting('clean_shutdown', False)
+
+    def _get_setting(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_setting(self, key, value):
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, _dumps(value)))
+
+    # Manifest
+
+    def names(self):
+        return list(self.manifest)
+
+    def info(self, workspace_name):
+        return self.manifest.get(workspace_name)
+
+    def search_terms(self, workspace_name):
+        entry = self.manifest.get(workspace_name)
+        if entry is None:
+            return []
+        return [self.terms[i] for i in entry['terms']]
+
+    def window_keys(self, workspace_name):
+        """(process name, title) identities of a workspace's windows, from the manifest."""
+        entry = self.manifest.get(workspace_name)
+        if entry is None:
+            return []
+        if 'window_keys' not in entry:
+            data = self.get(workspace_name)
+            keys = window_keys(data['windows'] if data else [])
+            with self.transaction() as conn:
+                conn.execute("UPDATE workspaces SET window_keys = ? WHERE name = ?", (_dumps(keys), workspace_name))
+            self._set_window_keys(entry, keys)
+        return [tuple(self.terms[i].split(KEY_SEPARATOR, 1)) for i in entry['window_keys']]
+
+    def _set_window_keys(self, entry, keys):
+        entry['window_keys'] = sorted(self._term_id(KEY_SEPARATOR.join(key)) for key in keys)
+
+    def _term_id(self, term):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self._term_ids[term] = term_id
+        return term_id
+
+    def _set_entry(self, workspace_name, meta, fingerprint, terms, size, keys=None):
+        entry = {
+            'timestamp': meta.get('timestamp'),
+            'save_time': meta.get('save_time'),
+            'window_count': meta.get('window_count', 0),
+            'size': size,
+            'fingerprint': fingerprint,
+            'terms': sorted(self._term_id(t) for t in terms),
+        }
+        if 'pinned' in meta:
+            entry['pinned'] = bool(meta['pinned'])
+        if keys is not None:
+            self._set_window_keys(entry, keys)
+        self.manifest[workspace_name] = entry
+
+    @stats.timed('store.load_all')
+    def load_all(self):
+        """Load the manifest from the workspaces table, oldest first."""
+        self.manifest = {}
+        rows = self.conn.execute("SELECT name, meta, fingerprint, terms, length(meta) + length(records), "
+                                 "window_keys FROM workspaces ORDER BY saved_at, name")
+        for name, meta, fingerprint, terms, size, keys in rows:
+            try:
+                self._set_entry(name, json.loads(meta), fingerprint, json.loads(terms), size,
+                                json.loads(keys) if keys else None)
+            except ValueError as e:
+                print(f"Error loading workspace {name}: {str(e)}")
+        if self.manifest:
+            self.last_fingerprint = self.manifest[max(self.manifest)].get('fingerprint')
+        return self.manifest
+
+    # Snapshots
+
+    def get(self, workspace_name):
+        """Return the complete workspace data, loading it if needed."""
+        data = self._cache.get(workspace_name)
+        if data is not None:
+            self._cache.move_to_end(workspace_name)
+            stats.count('store.cache_hits')
+            return data
+        stats.count('store.cache_misses')
+        row = self.conn.execute("SELECT meta, records FROM workspaces WHERE name = ?",
+                                (workspace_name,)).fetchone()
+        if row is None:
+            return None
+        try:
+            data = json.loads(row[0])
+            digests = json.loads(row[1])
+        except ValueError as e:
+            print(f"Error loading workspace {workspace_name}: {str(e)}")
+            return None
+
+        records = self._fetch_records(digests)
+        windows = []
+        for digest in digests:
+            if digest not in records:
+                print(f"Error loading workspace {workspace_name}: missing record {digest}")
+                continue
+            windows.append(records[digest])
+        data['windows'] = windows
+        self._cache_put(workspace_name, data)
+        return data
+
+    def _fetch_records(self, digests):
+        records = {}
+        unique = list(set(digests))
+        for i in range(0, len(unique), 500):
+            chunk = unique[i:i + 500]
+            query = f"SELECT digest, data FROM records WHERE digest IN ({','.join('?' * len(chunk))})"
+            for digest, record in self.conn.execute(query, chunk):
+                records[digest] = compact_window(json.loads(record))
+        return records
+
+    def _cache_put(self, workspace_name, data):
+        self._cache[workspace_name] = data
+        self._cache.move_to_end(workspace_name)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _release(self, conn, workspace_name):
+        row = conn.execute("SELECT records FROM workspaces WHERE name = ?", (workspace_name,)).fetchone()
+        if row is not None:
+            conn.executemany("UPDATE records SET refcount = refcount - 1 WHERE digest = ?",
+                             ((digest,) for digest in json.loads(row[0])))
+
+    @stats.timed('store.save')
+    def save(self, workspace_name, workspace_data, incremental=False):
+        """Persist a workspace in one transaction; returns True if anything was written.
+
+        Incremental saves are skipped when the window set is identical to the
+        previous snapshot.
+        """
+        windows = workspace_data['windows']
+        digests = [window_digest(w) for w in windows]
+        fingerprint = windows_fingerprint(windows, digests)
+        if incremental and fingerprint == self.last_fingerprint:
+            return False
+
+        with self.transaction() as conn:
+            row = self._insert(conn, workspace_name, workspace_data, digests, fingerprint)
+        # Only touch in-memory state once the commit went through
+        self._applied(workspace_name, fingerprint, *row)
+        self._cache_put(workspace_name, dict(row[0], windows=[compact_window(w) for w in windows]))
+        self.last_fingerprint = fingerprint
+        return True
+
+    def _insert(self, conn, workspace_name, workspace_data, digests, fingerprint):
+        """Write one snapshot row; returns (meta, terms, keys, size) for _applied."""
+        windows = workspace_data['windows']
+        meta = {key: value for key, value in workspace_data.items() if key != 'windows'}
+        meta['window_count'] = len(windows)
+        terms = sorted(window_search_terms(windows))
+        keys = window_keys(windows)
+        try:
+            saved_at = parse_save_time(meta).timestamp()
+        except ValueError:
+            saved_at = None
+        meta_json = _dumps(meta)
+        records_json = _dumps(digests)
+
+        self._release(conn, workspace_name)
+        conn.executemany("INSERT OR IGNORE INTO records (digest, data) VALUES (?, ?)",
+                         ((digest, _dumps(window)) for window, digest in zip(windows, digests)))
+        conn.executemany("UPDATE records SET refcount = refcount + 1 WHERE digest = ?",
+                         ((digest,) for digest in digests))
+        conn.execute("INSERT OR REPLACE INTO workspaces "
+                     "(name, saved_at, meta, records, fingerprint, terms, window_keys) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (workspace_name, saved_at, meta_json, records_json, fingerprint, _dumps(terms),
+                      _dumps(keys)))
+        return meta, terms, keys, len(meta_json) + len(records_json)
+
+    def _applied(self, workspace_name, fingerprint, meta, terms, keys, size):
+        stats.count('store.bytes_written', size)
+        self._set_entry(workspace_name, meta, fingerprint, terms, size, keys)
+        self._cache.pop(workspace_name, None)
+
+    @contextmanager
+    def separate_chain(self, chain):
+        """Run incremental saves against `chain` instead of the live snapshots (see WorkspaceStore)."""
+        live = self.last_fingerprint
+        self.last_fingerprint = chain.get('last_fingerprint')
+        try:
+            yield
+        finally:
+            chain['last_fingerprint'] = self.last_fingerprint
+            self.last_fingerprint = live
+
+    def put_records(self, windows, digests):
+        """Store window records ahead of the snapshots that will reference them."""
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO records (digest, data) VALUES (?, ?)",
+                             ((digest, _dumps(window)) for window, digest in zip(windows, digests)))
+
+    def get_records(self, digests):
+        """Stored window records for `digests`, None where a record is missing."""
+        records = self._fetch_records(digests)
+        return [records.get(digest) for digest in digests]
+
+    @stats.timed('store.delete')
+    def delete(self, workspace_name):
+        """Delete a workspace; returns the bytes reclaimed (snapshot row plus records)."""
+        freed = self.manifest[workspace_name].get('size', 0)
+        with self.transaction() as conn:
+            self._release(conn, workspace_name)
+            conn.execute("DELETE FROM workspaces WHERE name = ?", (workspace_name,))
+        del self.manifest[workspace_name]
+        self._cache.pop(workspace_name, None)
+        return freed + self.collect()
+
+    def collect(self, force=False):
+        """Drop unreferenced records; returns bytes reclaimed."""
+        count, size = self.conn.execute("SELECT count(*), total(length(data)) FROM records "
+                                        "WHERE refcount <= 0").fetchone()
+        if not count or (not force and count < self.min_garbage):
+            return 0
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM records WHERE refcount <= 0")
+        return int(size)
+
+    # Migration
+
+    def migrate_from(self, file_store, batch_size=200, progress=None):
+        """Copy every snapshot and the settings of a per-file WorkspaceStore.
+
+        Batches are committed as they go and re-saving a workspace is
+        idempotent, so an interrupted migration simply resumes next time.
+        `progress(migrated, total)` is called after each batch.
+        """
+        if self._get_setting('migrated_from'):
+            return 0
+        file_store.load_all()
+        names = sorted(file_store.names())
+        migrated = 0
+        for start in range(0, len(names), batch_size):
+            rows = []
+            with self.transaction() as conn:
+                for name in names[start:start + batch_size]:
+                    data = file_store.get(name)
+                    if data is None:
+                        continue
+                    digests = [window_digest(w) for w in data['windows']]
+                    fingerprint = windows_fingerprint(data['windows'], digests)
+                    rows.append((name, fingerprint) + self._insert(conn, name, data, digests, fingerprint))
+            for row in rows:
+                self._applied(*row)
+            migrated += len(rows)
+            stats.count('store.migrated', len(rows))
+            if progress is not None:
+                progress(migrated, len(names))
+        settings = file_store.load_settings()
+        if settings is not None:
+            self.save_settings(settings)
+        self._set_setting('migrated_from', file_store.workspace_dir)
+        self.flush()
+        return migrated
+
+    # Settings
+
+    def save_settings(self, settings):
+        self._set_setting('settings', settings)
+
+    def load_settings(self):
+        return self._get_setting('settings')
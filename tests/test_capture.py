@@ -0,0 +1,46 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_cache import ProcessMetadataCache
+from window_backend import SimulatedWindowBackend
+from window_tracker import WindowTracker
+from workspace_capture import CaptureCancelled, capture_windows
+
+
+class CancellingCache(ProcessMetadataCache):
+    """Sets the cancel event after the first process lookup."""
+
+    def __init__(self, backend, cancel_event):
+        super().__init__(backend)
+        self.cancel_event = cancel_event
+
+    def get(self, pid):
+        entry = super().get(pid)
+        self.cancel_event.set()
+        return entry
+
+
+class CancelledCaptureTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = SimulatedWindowBackend(window_count=20, process_count=5, hidden_ratio=0, denied_ratio=0)
+        self.cancel_event = threading.Event()
+        self.cache = CancellingCache(self.backend, self.cancel_event)
+
+    def test_capture_windows_ends_cancelled_capture(self):
+        with self.assertRaises(CaptureCancelled):
+            capture_windows(self.backend, process_cache=self.cache, cancel_event=self.cancel_event)
+        self.assertEqual(self.cache._capture_keys, {})
+
+    def test_tracker_ends_cancelled_capture(self):
+        tracker = WindowTracker(self.backend, self.cache)
+        with self.assertRaises(CaptureCancelled):
+            tracker.snapshot(cancel_event=self.cancel_event)
+        self.assertEqual(self.cache._capture_keys, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
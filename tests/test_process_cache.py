@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_cache import ProcessCatalog, ProcessMetadataCache
+from window_backend import SimulatedWindowBackend
+
+
+class PidReuseTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = SimulatedWindowBackend(window_count=0, process_count=1, denied_ratio=0)
+        self.pid = next(iter(self.backend.processes))
+        self.name = self.backend.processes[self.pid]['name']
+        self.cache = ProcessMetadataCache(self.backend, sweep_every=0)
+        self.cache.catalog = ProcessCatalog(self.backend)
+        self.cache.catalog.refresh()
+
+    def reuse_pid(self):
+        self.backend.processes[self.pid] = dict(self.backend.processes[self.pid], name='reused.exe',
+                                                creation_time=time.time())
+
+    def test_seen_name_is_not_inherited_by_reused_pid(self):
+        self.cache.get(self.pid)
+        self.cache.end_capture()
+        self.assertEqual(self.cache.cached_name(self.pid), self.name)
+        self.cache.end_capture()
+        self.reuse_pid()
+        self.assertIsNone(self.cache.cached_name(self.pid))
+
+    def test_catalog_name_is_not_inherited_by_reused_pid(self):
+        self.assertEqual(self.cache.cached_name(self.pid), self.name)
+        self.cache.end_capture()
+        self.reuse_pid()
+        self.assertIsNone(self.cache.cached_name(self.pid))
+        self.cache.end_capture()
+        self.cache.catalog.refresh()
+        self.assertEqual(self.cache.cached_name(self.pid), 'reused.exe')
+
+
+if __name__ == '__main__':
+    unittest.main()
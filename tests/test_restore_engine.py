@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perf_stats import stats
+from restore_engine import RestoreEngine
+from window_backend import SimulatedWindowBackend
+from workspace_capture import capture_windows
+
+
+class FailingPlacementBackend(SimulatedWindowBackend):
+    """Simulated desktop where placing some windows fails."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failing = set()
+
+    def set_window_placement(self, hwnd, placement):
+        if hwnd in self.failing:
+            raise OSError(f"access denied (hwnd={hwnd})")
+        super().set_window_placement(hwnd, placement)
+
+
+class PlacementErrorTest(unittest.TestCase):
+    def test_placement_failure_does_not_abort_restore(self):
+        backend = FailingPlacementBackend(window_count=6, process_count=3, hidden_ratio=0, denied_ratio=0)
+        windows = capture_windows(backend)
+        hwnds = list(backend.windows)
+        # Move every window so none is already in place
+        for hwnd in hwnds:
+            backend.move_window(hwnd, (5, 5, 105, 105))
+        backend.failing.add(hwnds[0])
+        errors = stats.snapshot()['counters'].get('restore.errors.set_placement', 0)
+
+        result = RestoreEngine(backend, windows, timeout=0, poll_interval=0).run()
+
+        self.assertEqual(len(result.errors), 1)
+        self.assertEqual(len(result.restored), len(windows) - 1)
+        self.assertFalse(result.missing)
+        self.assertEqual(stats.snapshot()['counters'].get('restore.errors.set_placement'), errors + 1)
+
+
+class LaunchTest(unittest.TestCase):
+    def test_launched_application_window_is_restored(self):
+        backend = SimulatedWindowBackend(window_count=1, process_count=1, hidden_ratio=0, denied_ratio=0,
+                                         launch_delay=0.05)
+        windows = capture_windows(backend)
+        backend.kill_process(next(iter(backend.processes)))
+
+        result = RestoreEngine(backend, windows, timeout=5, poll_interval=0.02).run()
+
+        self.assertEqual(result.launched, [windows[0]['process_name']])
+        self.assertEqual(len(result.restored), 1)
+        self.assertLess(result.elapsed, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retention import Compactor, RetentionPolicy, expired_workspaces
+from workspace_capture import build_workspace
+from workspace_store import open_store
+
+WINDOW = {'title': 'Notes', 'process_name': 'notepad.exe', 'rect': [0, 0, 100, 100],
+          'placement': [0, 1, [-1, -1], [-1, -1], [0, 0, 100, 100]]}
+
+
+class LegacySnapshotTest(unittest.TestCase):
+    def test_snapshots_without_pinned_flag_are_kept(self):
+        directory = tempfile.mkdtemp()
+        old = datetime.now() - timedelta(days=40)
+        # Written before auto-saves were marked: no 'pinned' key at all
+        legacy = {'timestamp': old.strftime("%Y%m%d_%H%M%S"), 'windows': [WINDOW],
+                  'save_time': old.strftime("%Y-%m-%d %I:%M:%S %p"), 'window_count': 1}
+        with open(os.path.join(directory, 'Workspace_legacy.json'), 'w') as f:
+            json.dump(legacy, f)
+        store = open_store(directory, 'files')
+        auto_name, auto_data = build_workspace([dict(WINDOW, title='Draft')], old + timedelta(minutes=1))
+        store.save(auto_name, auto_data)
+        store.close()
+
+        store = open_store(directory, 'files')
+        store.load_all()
+        self.assertEqual(expired_workspaces(store, RetentionPolicy(keep_older=False)), [auto_name])
+        store.close()
+
+
+class PolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime(2025, 6, 15, 12, 0)
+
+    def expired(self, policy, times):
+        return policy.expired([(f"w{i}", t, False) for i, t in enumerate(times)], self.now.timestamp())
+
+    def test_recent_snapshots_are_kept_and_older_ones_thinned(self):
+        times = [self.now - timedelta(minutes=m) for m in (1, 5, 30)]
+        times += [self.now - timedelta(hours=3, minutes=m) for m in (10, 20, 30)]
+        # All within the last hour, then one per hour
+        self.assertEqual(sorted(self.expired(RetentionPolicy(), times)), ['w3', 'w4'])
+
+    def test_snapshots_past_the_last_tier_are_kept_by_default(self):
+        times = [self.now - timedelta(days=40), self.now - timedelta(days=60)]
+        self.assertEqual(self.expired(RetentionPolicy(), times), [])
+        self.assertEqual(sorted(self.expired(RetentionPolicy(keep_older=False), times)), ['w0', 'w1'])
+
+    def test_deleting_older_snapshots_is_opt_in_in_settings(self):
+        self.assertTrue(RetentionPolicy.from_settings({'keep_older': False}).keep_older)
+        policy = RetentionPolicy.from_settings({'delete_older': True})
+        self.assertFalse(policy.keep_older)
+        self.assertEqual(RetentionPolicy.from_settings(policy.to_settings()).keep_older, False)
+
+    def test_daily_buckets_follow_local_days(self):
+        if not hasattr(time, 'tzset'):
+            self.skipTest("needs time.tzset")
+        previous = os.environ.get('TZ')
+        os.environ['TZ'] = 'Asia/Kolkata'
+        time.tzset()
+        try:
+            day = self.now - timedelta(days=3)
+            late = day.replace(hour=23, minute=30)
+            early = late + timedelta(hours=1)
+            # Different local days, though the same UTC day at +05:30
+            self.assertEqual(self.expired(RetentionPolicy(), [late, early]), [])
+            same_day = [day.replace(hour=0, minute=30), late]
+            self.assertEqual(self.expired(RetentionPolicy(), same_day), ['w1'])
+        finally:
+            if previous is None:
+                del os.environ['TZ']
+            else:
+                os.environ['TZ'] = previous
+            time.tzset()
+
+    def test_pinned_and_undated_snapshots_are_kept(self):
+        old = self.now - timedelta(days=90)
+        snapshots = [('pinned', old, True), ('undated', None, False), ('auto', old, False)]
+        policy = RetentionPolicy(keep_older=False)
+        self.assertEqual(policy.expired(snapshots, self.now.timestamp()), ['auto'])
+
+
+class CompactorTest(unittest.TestCase):
+    def test_step_deletes_queued_workspaces_and_survives_errors(self):
+        deleted = []
+
+        def delete(name):
+            if name == 'broken':
+                raise OSError("in use")
+            deleted.append(name)
+            return 100
+
+        compactor = Compactor(delete)
+        compactor.schedule(['a', 'broken', 'b'])
+        compactor.schedule(['a', 'c'])
+        self.assertEqual(compactor.pending, 4)
+        freed = 0
+        while compactor.pending:
+            freed += compactor.step(budget=1.0)
+        self.assertEqual(deleted, ['a', 'b', 'c'])
+        self.assertEqual((freed, compactor.reclaimed_bytes, compactor.deleted), (300, 300, 3))
+
+    def test_step_respects_budget(self):
+        compactor = Compactor(lambda name: time.sleep(0.01) or 1)
+        compactor.schedule([str(i) for i in range(50)])
+        compactor.step(budget=0.02)
+        self.assertGreater(compactor.pending, 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
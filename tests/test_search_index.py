@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import WorkspaceSearchIndex, date_filter_range
+
+
+def entry(when):
+    return {'save_time': when.strftime("%Y-%m-%d %I:%M:%S %p")}
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime(2025, 6, 15, 12, 0)
+        self.index = WorkspaceSearchIndex()
+        self.index.add('Monday', entry(self.now - timedelta(days=6)),
+                       ['report.docx - word', 'winword.exe', 'c:\\program files\\office\\winword.exe'])
+        self.index.add('Today', entry(self.now - timedelta(hours=1)), ['inbox - outlook', 'outlook.exe'])
+        self.index.add('Old', entry(self.now - timedelta(days=40)), ['notes', 'notepad.exe'])
+
+    def test_substring_search(self):
+        self.assertEqual(self.index.search('WORD'), {'Monday'})
+        self.assertEqual(self.index.search('program files'), {'Monday'})
+        self.assertEqual(self.index.search('.exe'), {'Monday', 'Today', 'Old'})
+        # Shorter than a trigram: every term is scanned
+        self.assertEqual(self.index.search('ou'), {'Today'})
+        self.assertEqual(self.index.search('no-such-window'), set())
+        # The workspace name is searchable too
+        self.assertEqual(self.index.search('old'), {'Old'})
+
+    def test_date_filters(self):
+        self.assertEqual(self.index.search('', date_filter_range("Today", self.now)), {'Today'})
+        self.assertEqual(self.index.search('', date_filter_range("Last 7 Days", self.now)), {'Monday', 'Today'})
+        self.assertEqual(self.index.search('exe', date_filter_range("Last 30 Days", self.now)),
+                         {'Monday', 'Today'})
+        self.assertIsNone(self.index.search('', date_filter_range("All", self.now)))
+
+    def test_matches_agrees_with_search(self):
+        time_range = date_filter_range("Last 7 Days", self.now)
+        for name in ('Monday', 'Today', 'Old'):
+            for text in ('word', 'exe', 'ou', ''):
+                expected = self.index.search(text, time_range)
+                self.assertEqual(self.index.matches(name, text, time_range), name in expected)
+
+    def test_re_adding_and_removing(self):
+        self.index.add('Today', entry(self.now), ['calc.exe'])
+        self.assertEqual(self.index.search('outlook'), set())
+        self.assertEqual(self.index.search('calc'), {'Today'})
+        self.index.remove('Monday')
+        self.index.remove('Monday')
+        self.assertEqual(self.index.search('word'), set())
+        self.assertEqual(len(self.index), 2)
+        self.assertNotIn('winword.exe', self.index._term_workspaces)
+
+
+if __name__ == '__main__':
+    unittest.main()
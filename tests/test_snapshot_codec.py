@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snapshot_codec
+from snapshot_codec import CodecError
+from window_record import compact_window
+from workspace_capture import build_workspace
+from workspace_store import WorkspaceStore
+
+WINDOW = {'title': 'Notes \u2013 caf\u00e9', 'process_name': 'notepad.exe', 'exe': 'C:\\Windows\\notepad.exe',
+          'pid': 42, 'command_line': ['notepad.exe', 'notes.txt'], 'creation_time': 1718000000.5,
+          'status': 'running', 'window_state': 'normal', 'rect': [0, 0, 100, 100],
+          'placement': [0, 1, [-1, -1], [-1, -1], [0, 0, 100, 100]]}
+
+
+class CodecTest(unittest.TestCase):
+    def test_round_trip_with_every_available_codec(self):
+        _, data = build_workspace([WINDOW, compact_window(WINDOW)], datetime(2025, 6, 2, 9, 0))
+        # Compact records are written like the dicts they came from
+        expected = json.loads(json.dumps(dict(data, windows=[WINDOW, WINDOW])))
+        codecs, compressions = snapshot_codec.available()
+        for codec in codecs:
+            for compression in compressions:
+                encoded = snapshot_codec.encode(data, codec, compression)
+                if codec.startswith('json') and compression is None:
+                    # Plain JSON has no header
+                    self.assertEqual(snapshot_codec.detect(encoded), ('json', None))
+                else:
+                    self.assertEqual(snapshot_codec.detect(encoded), (codec, compression))
+                self.assertEqual(snapshot_codec.decode(encoded), expected, (codec, compression))
+
+    def test_plain_json_stays_readable(self):
+        encoded = snapshot_codec.encode({'a': 1}, 'json-compact')
+        self.assertEqual(json.loads(encoded), {'a': 1})
+        # Files from before codecs existed are pretty-printed JSON
+        self.assertEqual(snapshot_codec.decode(json.dumps({'a': 1}, indent=4).encode()), {'a': 1})
+
+    def test_bad_input(self):
+        with self.assertRaises(CodecError):
+            snapshot_codec.encode({}, 'yaml')
+        with self.assertRaises(CodecError):
+            snapshot_codec.encode({}, 'json', 'lz4')
+        with self.assertRaises(CodecError):
+            snapshot_codec.decode(snapshot_codec.MAGIC + bytes((99, 0, 0)))
+
+    def test_store_reads_files_written_with_another_codec(self):
+        directory = tempfile.mkdtemp()
+        store = WorkspaceStore(directory, codec='json-compact', compression='zlib')
+        name, data = build_workspace([WINDOW], datetime(2025, 6, 2, 9, 0))
+        store.save(name, data)
+        store.close()
+
+        store = WorkspaceStore(directory, codec='json')
+        store.load_all()
+        self.assertEqual(store.get(name)['windows'][0]['title'], WINDOW['title'])
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
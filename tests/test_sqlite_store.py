@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perf_stats import stats
+from sqlite_store import SqliteWorkspaceStore
+from workspace_capture import build_workspace
+from workspace_store import MANIFEST_FILE, WorkspaceStore, open_store
+
+WINDOW = {'title': 'Notes', 'process_name': 'notepad.exe', 'rect': [0, 0, 100, 100],
+          'placement': [0, 1, [-1, -1], [-1, -1], [0, 0, 100, 100]]}
+
+
+def legacy_directory(count):
+    directory = tempfile.mkdtemp()
+    store = WorkspaceStore(directory)
+    start = datetime(2025, 6, 1, 9, 0)
+    for i in range(count):
+        name, data = build_workspace([dict(WINDOW, title=f"Notes {i}")], start + timedelta(minutes=i))
+        store.save(name, data)
+    store.save_settings({'auto_save_interval': 5})
+    store.close()
+    os.remove(os.path.join(directory, MANIFEST_FILE))
+    return directory
+
+
+class FailingStore(WorkspaceStore):
+    """Legacy store whose reads fail after `limit` snapshots."""
+
+    def __init__(self, *args, limit=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limit = limit
+
+    def get(self, workspace_name):
+        if self.limit == 0:
+            raise OSError("read error")
+        self.limit -= 1
+        return super().get(workspace_name)
+
+
+class MigrationTest(unittest.TestCase):
+    def test_migration_copies_snapshots_and_reports_progress(self):
+        directory = legacy_directory(5)
+        store = SqliteWorkspaceStore(directory)
+        progress = []
+        migrated = stats.snapshot()['counters'].get('store.migrated', 0)
+
+        self.assertEqual(store.migrate_from(WorkspaceStore(directory, read_only=True), batch_size=2,
+                                            progress=lambda done, total: progress.append((done, total))), 5)
+
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(stats.snapshot()['counters'].get('store.migrated'), migrated + 5)
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.load_settings(), {'auto_save_interval': 5})
+        name = sorted(store.names())[0]
+        self.assertEqual(store.get(name)['windows'][0]['title'], 'Notes 0')
+        # Already migrated: nothing happens the second time
+        self.assertEqual(store.migrate_from(WorkspaceStore(directory, read_only=True)), 0)
+        store.close()
+
+    def test_migration_leaves_the_legacy_directory_untouched(self):
+        directory = legacy_directory(3)
+        before = sorted(os.listdir(directory))
+        open_store(directory, 'sqlite').close()
+        after = sorted(name for name in os.listdir(directory) if not name.startswith('workspaces.db'))
+        self.assertEqual(after, before)
+        self.assertNotIn(MANIFEST_FILE, after)
+
+    def test_failed_batch_leaves_memory_matching_the_database(self):
+        directory = legacy_directory(5)
+        store = SqliteWorkspaceStore(directory)
+        with self.assertRaises(OSError):
+            store.migrate_from(FailingStore(directory, read_only=True, limit=3), batch_size=2)
+        # The first batch was committed, the second rolled back
+        self.assertEqual(len(store), 2)
+        store.close()
+
+        store = SqliteWorkspaceStore(directory)
+        self.assertEqual(len(store.load_all()), 2)
+        self.assertEqual(store.migrate_from(WorkspaceStore(directory, read_only=True)), 5)
+        self.assertEqual(len(store), 5)
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timeline_index import TimelineIndex
+from workspace_capture import build_workspace
+from workspace_store import WorkspaceStore
+
+WINDOW = {'title': 'Notes', 'process_name': 'notepad.exe', 'rect': [0, 0, 100, 100],
+          'placement': [0, 1, [-1, -1], [-1, -1], [0, 0, 100, 100]]}
+
+
+def state(index):
+    # Key ids depend on insertion order, so compare keys
+    return (index._times, {name: sorted(index._key_list[k] for k in keys) for name, keys in index._keys.items()},
+            sorted((index._key_list[k], s[1]) for k, starts in index._key_starts.items() for s in starts),
+            sorted((index._key_list[k], e[1]) for k, ends in index._key_ends.items() for e in ends))
+
+
+class TimelineTest(unittest.TestCase):
+    def setUp(self):
+        self.store = WorkspaceStore(tempfile.mkdtemp())
+        self.start = datetime(2025, 6, 2, 9, 0)
+        self.names = []
+
+    def tearDown(self):
+        self.store.close()
+
+    def save(self, minutes, *titles):
+        name, data = build_workspace([dict(WINDOW, title=title) for title in titles],
+                                     self.start + timedelta(minutes=minutes))
+        self.store.save(name, data)
+        self.names.append(name)
+        return name
+
+    def at(self, minutes):
+        return self.start + timedelta(minutes=minutes)
+
+    def test_queries(self):
+        self.save(0, 'A', 'B')
+        self.save(10, 'A', 'C')
+        self.save(20, 'A', 'B')
+        timeline = TimelineIndex(self.store)
+
+        self.assertIsNone(timeline.snapshot_at(self.at(-1)))
+        self.assertEqual(timeline.snapshot_at(self.at(15)), self.names[1])
+        self.assertEqual(sorted(timeline.open_at(self.at(15))), [('notepad.exe', 'A'), ('notepad.exe', 'C')])
+        self.assertEqual({title for _, title in timeline.open_between(self.at(5), self.at(25))}, {'A', 'B', 'C'})
+        self.assertEqual({title for _, title in timeline.open_between(self.at(10), self.at(15))}, {'A', 'C'})
+        self.assertEqual(timeline.lifetimes(('notepad.exe', 'B')),
+                         [(self.at(0), self.at(0)), (self.at(20), self.at(20))])
+        self.assertEqual(timeline.lifetimes(('notepad.exe', 'A')), [(self.at(0), self.at(20))])
+        runs = timeline.lifetimes_between(self.at(12), self.at(30))
+        self.assertEqual(runs[('notepad.exe', 'B')], [(self.at(20), self.at(20))])
+        self.assertEqual(runs[('notepad.exe', 'C')], [(self.at(10), self.at(10))])
+
+    def test_updates_match_a_rebuild(self):
+        rng = random.Random(3)
+        minutes = rng.sample(range(200), 60)
+        timeline = TimelineIndex(self.store)
+        timeline.build()
+        for step in range(60):
+            if self.names and rng.random() < 0.3:
+                name = self.names.pop(rng.randrange(len(self.names)))
+                self.store.delete(name)
+                timeline.remove(name)
+            else:
+                # Saved out of order now and then, like imported snapshots
+                name = self.save(minutes[step], *rng.sample('ABCDE', rng.randint(0, 4)))
+                timeline.add(name)
+            rebuilt = TimelineIndex(self.store)
+            rebuilt.build()
+            self.assertEqual(state(timeline), state(rebuilt), f"step {step}")
+
+    def test_updates_before_the_first_query_are_ignored(self):
+        timeline = TimelineIndex(self.store)
+        timeline.add(self.save(0, 'A'))
+        self.assertFalse(timeline.built)
+        self.assertEqual(timeline.open_at(self.at(1)), [('notepad.exe', 'A')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from usage_analytics import MAX_GAP, UsageAnalytics, day_number
+from workspace_capture import build_workspace
+from workspace_store import open_store
+
+WINDOW = {'title': 'Notes', 'process_name': 'notepad.exe', 'rect': [0, 0, 100, 100],
+          'placement': [0, 1, [-1, -1], [-1, -1], [0, 0, 100, 100]]}
+
+
+def hours_by_app(analytics):
+    days, apps, hours = analytics.app_hours()
+    return {app: round(float(hours[:, i].sum()), 3) for i, app in enumerate(apps)}
+
+
+class UsageAnalyticsTest(unittest.TestCase):
+    def setUp(self):
+        self.analytics = UsageAnalytics(tempfile.mkdtemp())
+        self.start = datetime(2025, 6, 2, 9, 0)
+
+    def at(self, minutes):
+        return self.start + timedelta(minutes=minutes)
+
+    def test_snapshot_time_goes_to_its_apps_once(self):
+        self.analytics.ingest('a', self.at(0), [WINDOW, dict(WINDOW, title='Other')])
+        self.analytics.ingest('b', self.at(30), [dict(WINDOW, process_name='code.exe')])
+        self.analytics.ingest('c', self.at(45), [])
+        self.assertEqual(hours_by_app(self.analytics), {'notepad.exe': 0.5, 'code.exe': 0.25})
+        self.assertFalse(self.analytics.ingest('old', self.at(10), [WINDOW]))
+
+    def test_gaps_are_capped(self):
+        self.analytics.ingest('a', self.at(0), [WINDOW])
+        self.analytics.ingest('b', self.at(300), [WINDOW])
+        self.assertEqual(hours_by_app(self.analytics), {'notepad.exe': MAX_GAP / 3600})
+
+    def test_heartbeats_extend_an_unchanged_snapshot(self):
+        self.analytics.ingest('a', self.at(0), [WINDOW])
+        # Unchanged auto-saves every 50 minutes: nothing stored, still on screen
+        for minutes in (50, 100, 150):
+            self.assertTrue(self.analytics.heartbeat(self.at(minutes)))
+        self.assertFalse(self.analytics.heartbeat(self.at(120)))
+        self.analytics.ingest('b', self.at(160), [dict(WINDOW, process_name='code.exe')])
+        self.assertAlmostEqual(hours_by_app(self.analytics)['notepad.exe'], 160 / 60, places=3)
+
+    def test_time_past_midnight_goes_to_the_next_day(self):
+        late = datetime(2025, 6, 2, 23, 30)
+        self.analytics.ingest('a', late, [WINDOW])
+        self.analytics.heartbeat(late + timedelta(minutes=50))
+        days, apps, hours = self.analytics.app_hours()
+        self.assertEqual(days.tolist(), [day_number(late), day_number(late) + 1])
+        self.assertEqual(hours[:, 0].tolist(), [0.5, 20 / 60])
+
+    def test_rebuild_rollups_matches_incremental_rollup(self):
+        when = datetime(2025, 6, 1, 20, 0)
+        for i in range(200):
+            when += timedelta(minutes=(7, 45, 90, 240)[i % 4])
+            if i % 3 == 2:
+                self.analytics.heartbeat(when)
+            else:
+                self.analytics.ingest(f"w{i:03d}", when,
+                                      [dict(WINDOW, process_name=f"app{(i + j) % 5}.exe") for j in range(i % 4)])
+        days, matrix = self.analytics.days.tolist(), self.analytics.app_seconds.copy()
+        self.assertGreater(len(days), 5)
+
+        self.analytics.rebuild_rollups()
+
+        self.assertEqual(self.analytics.days.tolist(), days)
+        np.testing.assert_allclose(self.analytics.app_seconds, matrix)
+
+    def test_rebuild_from_store_keeps_heartbeats(self):
+        store = open_store(tempfile.mkdtemp(), 'files')
+        for minutes, title in ((0, 'One'), (30, 'Two')):
+            name, data = build_workspace([dict(WINDOW, title=title)], self.at(minutes))
+            store.save(name, data)
+            self.analytics.ingest(name, self.at(minutes), data['windows'])
+        self.analytics.heartbeat(self.at(80))
+        expected = hours_by_app(self.analytics)
+
+        for _ in self.analytics.rebuild_steps(store):
+            pass
+
+        self.assertEqual(len(self.analytics), 2)
+        self.assertEqual(hours_by_app(self.analytics), expected)
+        self.assertEqual(self.analytics.top_layouts()[0][3], 80 / 60)
+        store.close()
+
+    def test_save_and_load(self):
+        self.analytics.ingest('a', self.at(0), [WINDOW])
+        self.analytics.heartbeat(self.at(40))
+        self.analytics.save()
+        self.assertFalse(self.analytics.dirty)
+
+        loaded = UsageAnalytics(os.path.dirname(self.analytics.path))
+        self.assertTrue(loaded.load())
+        self.assertEqual(list(loaded.beats), list(self.analytics.beats))
+        self.assertEqual(hours_by_app(loaded), hours_by_app(self.analytics))
+        # Carries on from the last heartbeat
+        loaded.ingest('b', self.at(50), [])
+        self.assertAlmostEqual(hours_by_app(loaded)['notepad.exe'], 50 / 60, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
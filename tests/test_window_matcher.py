@@ -0,0 +1,40 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_cache import ProcessMetadataCache
+from window_backend import SimulatedWindowBackend
+from window_matcher import LiveWindowIndex, match_windows
+
+SAVED = {'title': 'Quarterly Report', 'process_name': 'WINWORD.EXE',
+         'exe': 'C:\\Office\\WINWORD.EXE'}
+
+
+def live_index(backend):
+    return LiveWindowIndex.from_backend(backend, ProcessMetadataCache(backend).get)
+
+
+class DeniedProcessTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = SimulatedWindowBackend(window_count=0, process_count=1, denied_ratio=0,
+                                              launch_delay=None)
+
+    def test_same_title_in_other_process_is_not_matched(self):
+        excel = self.backend.start_process('C:\\Office\\EXCEL.EXE')
+        self.backend.add_window(excel, title=SAVED['title'])
+        self.assertEqual(match_windows([SAVED], live_index(self.backend)), [])
+
+    def test_denied_window_is_indexed_and_matched_by_title(self):
+        word = self.backend.start_process(SAVED['exe'])
+        self.backend.processes[word]['denied'] = True
+        hwnd = self.backend.add_window(word, title=SAVED['title'])
+        excel = self.backend.start_process('C:\\Office\\EXCEL.EXE')
+        self.backend.add_window(excel, title=SAVED['title'])
+        matches = match_windows([SAVED], live_index(self.backend))
+        self.assertEqual([live.hwnd for _, live, _ in matches], [hwnd])
+
+
+if __name__ == '__main__':
+    unittest.main()
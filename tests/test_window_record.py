@@ -0,0 +1,38 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import window_record
+from window_record import WindowRecord, compact_window
+
+
+def capture_dict(command_line):
+    return {'title': 'Notes - Notepad', 'process_name': 'notepad.exe', 'exe': 'C:\\notepad.exe',
+            'placement': (0, 1, (-1, -1), (-1, -1), (10, 20, 510, 420)), 'rect': (10, 20, 510, 420),
+            'pid': 1234, 'command_line': command_line, 'creation_time': 1700000000.0,
+            'status': 'running', 'window_state': 'Normal'}
+
+
+class WindowRecordTest(unittest.TestCase):
+    def test_round_trip(self):
+        window = capture_dict(['C:\\notepad.exe', 'notes.txt'])
+        record = compact_window(window)
+        self.assertIsInstance(record, WindowRecord)
+        expected = dict(window, command_line=tuple(window['command_line']))
+        self.assertEqual(record.to_dict(), expected)
+
+    def test_equal_command_lines_are_shared(self):
+        first = compact_window(capture_dict(['C:\\notepad.exe', 'a.txt']))
+        second = compact_window(capture_dict(['C:\\notepad.exe', 'a.txt']))
+        self.assertIs(first.command_line, second.command_line)
+
+    def test_command_line_table_is_bounded(self):
+        for i in range(window_record.COMMAND_LINE_CACHE_SIZE + 100):
+            compact_window(capture_dict(['C:\\notepad.exe', f'C:\\Temp\\doc{i}.txt']))
+        self.assertEqual(len(window_record._command_lines), window_record.COMMAND_LINE_CACHE_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_cache import ProcessCatalog, ProcessMetadataCache
+from window_backend import SimulatedWindowBackend
+from window_tracker import WindowTracker
+
+
+class RecordingBackend(SimulatedWindowBackend):
+    """Simulated desktop that records which pids and windows were looked up."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.info_pids = []
+        self.placed_hwnds = []
+
+    def get_process_info(self, pid):
+        self.info_pids.append(pid)
+        return super().get_process_info(pid)
+
+    def get_window_placement(self, hwnd):
+        self.placed_hwnds.append(hwnd)
+        return super().get_window_placement(hwnd)
+
+
+class TrackerExclusionTest(unittest.TestCase):
+    def test_excluded_windows_are_dropped_before_metadata_lookups(self):
+        backend = RecordingBackend(window_count=30, process_count=5, hidden_ratio=0, denied_ratio=0)
+        cache = ProcessMetadataCache(backend)
+        cache.catalog = ProcessCatalog(backend)
+        cache.catalog.refresh()
+        tracker = WindowTracker(backend, cache)
+        tracker.start()
+        name = next(iter(backend.processes.values()))['name']
+        excluded_pids = {pid for pid, process in backend.processes.items() if process['name'] == name}
+        excluded_hwnds = {hwnd for hwnd, window in backend.windows.items() if window['pid'] in excluded_pids}
+
+        windows = tracker.snapshot([name])
+
+        self.assertTrue(excluded_hwnds)
+        self.assertFalse(any(window['process_name'] == name for window in windows))
+        self.assertFalse(excluded_pids & set(backend.info_pids))
+        self.assertFalse(excluded_hwnds & set(backend.placed_hwnds))
+        # Dropping the rule brings the windows back without waiting for a resync
+        self.assertEqual(len(tracker.snapshot([])), len(backend.windows))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workspace_archive import export_archive, import_archive
+from workspace_capture import build_workspace
+from workspace_store import open_store
+
+WINDOW = {'title': 'Notes', 'process_name': 'notepad.exe', 'rect': [0, 0, 100, 100],
+          'placement': [0, 1, [-1, -1], [-1, -1], [0, 0, 100, 100]]}
+
+
+def windows(*titles):
+    return [dict(WINDOW, title=title) for title in titles]
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.source = open_store(tempfile.mkdtemp(), 'files')
+        self.path = os.path.join(tempfile.mkdtemp(), 'backup.wsa.gz')
+        start = datetime(2025, 6, 1, 9, 0)
+        self.names = []
+        for i in range(4):
+            name, data = build_workspace(windows('Inbox', 'Notes', f"Draft {i}"), start + timedelta(minutes=i))
+            self.source.save(name, data, incremental=True)
+            self.names.append(name)
+
+    def tearDown(self):
+        self.source.close()
+
+    def test_round_trip(self):
+        self.assertEqual(export_archive(self.source, self.path, settings={'auto_save_interval': 5}), 4)
+        for engine in ('files', 'sqlite'):
+            target = open_store(tempfile.mkdtemp(), engine)
+            result = import_archive(target, self.path)
+            self.assertTrue(result.complete)
+            self.assertEqual(sorted(result.imported), self.names)
+            self.assertEqual(result.settings, {'auto_save_interval': 5})
+            for name in self.names:
+                self.assertEqual(target.get(name)['windows'], self.source.get(name)['windows'])
+            target.close()
+
+    def test_existing_workspaces_are_never_overwritten(self):
+        export_archive(self.source, self.path)
+        target = open_store(tempfile.mkdtemp(), 'files')
+        first, second = self.names[:2]
+        target.save(first, self.source.get(first))
+        target.save(second, dict(self.source.get(second), windows=windows('Other')))
+
+        result = import_archive(target, self.path)
+
+        self.assertEqual((result.duplicates, result.conflicts), (1, [second]))
+        self.assertEqual(target.get(second)['windows'][0]['title'], 'Other')
+        target.close()
+
+    def test_truncated_and_corrupt_archives(self):
+        export_archive(self.source, self.path)
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            lines = f.readlines()
+        # Tamper with the last workspace and drop the end entry
+        lines[-2] = lines[-2].replace('"window_count":', '"window_count":9', 1)
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            f.writelines(lines[:-1])
+        target = open_store(tempfile.mkdtemp(), 'files')
+
+        result = import_archive(target, self.path)
+
+        self.assertFalse(result.complete)
+        self.assertEqual((len(result.imported), len(result.corrupt)), (3, 1))
+        target.close()
+
+        with open(self.path, 'wb') as f:
+            f.write(b'not an archive')
+        self.assertIsNotNone(import_archive(open_store(tempfile.mkdtemp(), 'files'), self.path).error)
+
+    def test_import_leaves_the_live_keyframe_alone(self):
+        export_archive(self.source, self.path)
+        for engine in ('files', 'sqlite'):
+            target = open_store(tempfile.mkdtemp(), engine)
+            live_windows = windows('Live', 'Notes', 'Inbox')
+            live_name, live_data = build_workspace(live_windows, datetime(2025, 7, 1, 9, 0))
+            target.save(live_name, live_data, incremental=True)
+
+            import_archive(target, self.path)
+
+            # Unchanged desktop: still skipped against the live snapshot
+            name, data = build_workspace(live_windows, datetime(2025, 7, 1, 9, 5))
+            self.assertFalse(target.save(name, data, incremental=True))
+            if engine == 'files':
+                # A small change is still a delta against the live keyframe
+                name, data = build_workspace(live_windows + windows('New'), datetime(2025, 7, 1, 9, 10))
+                target.save(name, data, incremental=True)
+                self.assertEqual(target.info(name).get('base'), live_name)
+            # The archive's last snapshot is not taken as the previous one
+            name, data = build_workspace(self.source.get(self.names[-1])['windows'], datetime(2025, 7, 1, 9, 15))
+            self.assertTrue(target.save(name, data, incremental=True))
+            target.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from record_store import RECORDS_FILE
+from workspace_capture import build_workspace
+from workspace_store import MANIFEST_FILE, WorkspaceStore, window_digest
+
+WINDOW = {'title': 'Notes', 'process_name': 'notepad.exe', 'rect': [0, 0, 100, 100],
+          'placement': [0, 1, [-1, -1], [-1, -1], [0, 0, 100, 100]]}
+
+
+def windows(*titles):
+    return [dict(WINDOW, title=title) for title in titles]
+
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = WorkspaceStore(self.directory)
+        self.when = datetime(2025, 6, 2, 9, 0)
+
+    def tearDown(self):
+        self.store.close()
+
+    def save(self, window_list, incremental=True):
+        self.when += timedelta(minutes=1)
+        name, data = build_workspace(window_list, self.when)
+        saved = self.store.save(name, data, incremental=incremental)
+        return name if saved else None
+
+    def reopen(self):
+        self.store.close()
+        self.store = WorkspaceStore(self.directory)
+        self.store.load_all()
+        return self.store
+
+
+class DeltaTest(StoreTestCase):
+    def test_identical_auto_saves_are_skipped(self):
+        self.assertIsNotNone(self.save(windows('A', 'B')))
+        self.assertIsNone(self.save(windows('B', 'A')))
+        # Manual saves are always written
+        self.assertIsNotNone(self.save(windows('A', 'B'), incremental=False))
+        self.assertEqual(len(self.store), 2)
+
+    def test_small_changes_are_stored_as_deltas(self):
+        keyframe = self.save(windows('A', 'B', 'C', 'D'))
+        delta = self.save(windows('A', 'B', 'C', 'E'))
+        full = self.save(windows('F', 'G', 'H', 'I'))
+        self.assertNotIn('base', self.store.info(keyframe))
+        self.assertEqual(self.store.info(delta)['base'], keyframe)
+        self.assertNotIn('base', self.store.info(full))
+
+        store = self.reopen()
+        self.assertEqual([w['title'] for w in store.get(delta)['windows']], ['A', 'B', 'C', 'E'])
+        self.assertEqual(store.get(delta)['window_count'], 4)
+        self.assertEqual([w['title'] for w in store.get(full)['windows']], ['F', 'G', 'H', 'I'])
+
+    def test_duplicate_windows_survive_a_delta(self):
+        keyframe = self.save(windows('A', 'A', 'B', 'C'))
+        delta = self.save(windows('A', 'B', 'C', 'D'))
+        self.assertEqual(self.store.info(delta)['base'], keyframe)
+        self.assertEqual(sorted(w['title'] for w in self.reopen().get(delta)['windows']), ['A', 'B', 'C', 'D'])
+
+    def test_keyframe_interval(self):
+        self.store.keyframe_interval = 2
+        names = [self.save(windows('A', 'B', 'C', str(i))) for i in range(5)]
+        bases = [self.store.info(name).get('base') for name in names]
+        self.assertEqual(bases, [None, names[0], names[0], None, names[3]])
+
+    def test_deleting_a_keyframe_rewrites_its_deltas(self):
+        keyframe = self.save(windows('A', 'B', 'C'))
+        delta = self.save(windows('A', 'B', 'D'))
+        self.store.delete(keyframe)
+        self.assertNotIn('base', self.store.info(delta))
+        self.assertEqual([w['title'] for w in self.reopen().get(delta)['windows']], ['A', 'B', 'D'])
+        # The next auto-save doesn't build on the deleted keyframe
+        self.assertNotIn('base', self.store.info(self.save(windows('A', 'B', 'E'))))
+
+
+
+class RecordSharingTest(StoreTestCase):
+    def pack_lines(self):
+        self.store.flush()
+        with open(os.path.join(self.directory, RECORDS_FILE)) as f:
+            return len(f.read().splitlines())
+
+    def test_records_are_written_once(self):
+        self.save(windows('A', 'B'), incremental=False)
+        self.save(windows('A', 'B', 'C'), incremental=False)
+        self.assertEqual(self.pack_lines(), 3)
+        refcounts = self.store.records.refcounts
+        self.assertEqual(refcounts[window_digest(windows('A')[0])], 2)
+        self.assertEqual(refcounts[window_digest(windows('C')[0])], 1)
+
+    def test_deleting_releases_records_and_collect_sweeps_them(self):
+        first = self.save(windows('A', 'B'), incremental=False)
+        self.save(windows('B', 'C'), incremental=False)
+        self.store.records.min_garbage = 1
+        self.store.records.compact_ratio = 0
+        self.assertGreater(self.store.delete(first), 0)
+        self.assertEqual(self.pack_lines(), 2)
+        self.assertNotIn(window_digest(windows('A')[0]), self.store.records)
+
+    def test_reference_counts_survive_a_restart(self):
+        self.save(windows('A', 'B'), incremental=False)
+        self.save(windows('B', 'C'), incremental=False)
+        counts = +self.store.records.refcounts
+        self.assertEqual(+self.reopen().records.refcounts, counts)
+
+    def test_snapshots_removed_outside_the_app_are_recounted(self):
+        first = self.save(windows('A', 'B'), incremental=False)
+        self.save(windows('B', 'C'), incremental=False)
+        self.store.close()
+        os.remove(os.path.join(self.directory, f"{first}.json"))
+        store = self.reopen()
+        # Counts are unknown until a forced collection recounts them
+        self.assertEqual(store.collect(), 0)
+        store.collect(force=True)
+        self.assertEqual(len(store.records), 2)
+        self.assertEqual(store.records.refcounts[window_digest(windows('B')[0])], 1)
+
+
+
+class ManifestTest(StoreTestCase):
+    def manifest_lines(self):
+        self.store.flush()
+        with open(os.path.join(self.directory, MANIFEST_FILE)) as f:
+            return f.read().splitlines()
+
+    def test_journal_is_compacted(self):
+        name = self.save(windows('A'), incremental=False)
+        for i in range(150):
+            self.store.save(name, build_workspace(windows(f"Title {i}"), self.when)[1])
+        # Compacted once the journal outgrows the manifest
+        self.assertLess(len(self.manifest_lines()), 110)
+        store = self.reopen()
+        self.assertEqual(store.names(), [name])
+        self.assertEqual(sorted(store.search_terms(name)), ['notepad.exe', 'title 149'])
+        self.assertEqual(store.window_keys(name), [('notepad.exe', 'Title 149')])
+
+    def test_startup_reads_the_manifest_not_the_snapshots(self):
+        name = self.save(windows('A', 'B'), incremental=False)
+        self.store.close()
+        store = WorkspaceStore(self.directory)
+        store._index_file = None  # Would fail if any snapshot were parsed
+        store.load_all()
+        self.assertEqual(store.info(name)['window_count'], 2)
+        store.close()
+
+    def test_changes_outside_the_app_are_reconciled(self):
+        kept = self.save(windows('A'), incremental=False)
+        removed = self.save(windows('B'), incremental=False)
+        self.store.close()
+        os.remove(os.path.join(self.directory, f"{removed}.json"))
+        with open(os.path.join(self.directory, MANIFEST_FILE), 'a') as f:
+            f.write('{"op": "put", "name": "torn')  # a crash mid-append
+        # Written by hand, with the windows inline
+        self.when += timedelta(minutes=1)
+        added, data = build_workspace(windows('C'), self.when)
+        with open(os.path.join(self.directory, f"{added}.json"), 'w') as f:
+            json.dump(data, f)
+
+        store = WorkspaceStore(self.directory)
+        store.load_all()
+        self.assertEqual(sorted(store.names()), sorted([kept, added]))
+        self.assertEqual(store.get(added)['windows'][0]['title'], 'C')
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from write_queue import WriteBehindQueue
+
+
+class RecordingQueue(WriteBehindQueue):
+    """Write-behind queue that records operations and holds the first one until released."""
+
+    def __init__(self):
+        self.performed = []
+        self.release = threading.Event()
+        super().__init__(sync=False)
+
+    def _perform(self, op, path, data=None, mtime_ns=None):
+        self.release.wait(5)
+        self.performed.append((op, os.path.basename(path), data))
+        super()._perform(op, path, data, mtime_ns)
+
+
+class SupersedeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = RecordingQueue()
+        self.manifest = os.path.join(self.directory, 'manifest.jsonl')
+        # Keeps the worker busy so the following operations stay queued
+        self.queue.write(os.path.join(self.directory, 'busy'), b'')
+
+    def run_queue(self):
+        self.queue.release.set()
+        self.queue.close()
+        return [(op, data) for op, name, data in self.queue.performed if name == 'manifest.jsonl']
+
+    def test_rewrite_supersedes_pending_rewrite(self):
+        self.queue.write(self.manifest, b'old\n')
+        self.queue.write(self.manifest, b'new\n')
+        self.assertEqual(self.run_queue(), [('write', b'new\n')])
+
+    def test_rewrite_with_appends_behind_it_is_kept(self):
+        self.queue.write(self.manifest, b'compacted\n')
+        self.queue.append(self.manifest, b'entry\n')
+        self.queue.write(self.manifest, b'compacted again\n')
+        self.assertEqual(self.run_queue(), [('write', b'compacted\n'), ('append', b'entry\n'),
+                                            ('write', b'compacted again\n')])
+        with open(self.manifest, 'rb') as f:
+            self.assertEqual(f.read(), b'compacted again\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
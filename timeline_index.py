@@ -0,0 +1,220 @@
+"""Timeline of which windows were open when, built from the manifest.
+
+Windows are identified by (process name, title), as recorded in each
+manifest entry, so the timeline never reads snapshot files. It keeps:
+
+- snapshot times, sorted, so the state at time T is one bisect away;
+- for every window key, its lifetimes: runs of consecutive snapshots
+  containing it, stored as the run's first and last snapshot;
+- every run start in one sorted list, so the windows open during a range
+  are the state at its start plus the runs starting inside it.
+
+Saving or deleting a snapshot only changes runs at that snapshot and its two
+neighbours, so add() and remove() cost O(windows) plus the sorted-list
+inserts. The index is built on first use; until then add() and remove() do
+nothing.
+"""
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+from perf_stats import stats
+from search_index import parse_save_time
+
+# Sorts after any workspace name at the same time
+_AFTER = '\uffff'
+
+
+class TimelineIndex:
+    def __init__(self, store):
+        self.store = store
+        self.built = False
+        self.clear()
+
+    def clear(self):
+        """Forget everything; the next query rebuilds from the store."""
+        self.built = False
+        self._times = []        # sorted (datetime, name)
+        self._time = {}         # name -> datetime
+        self._keys = {}         # name -> array of key ids
+        self._key_ids = {}      # (process name, title) -> key id
+        self._key_list = []
+        self._starts = []       # sorted (datetime, name, key id) of every run start
+        self._key_starts = {}   # key id -> sorted (datetime, name) of its run starts
+        self._key_ends = {}     # key id -> sorted (datetime, name) of its run ends
+
+    def __len__(self):
+        return len(self._times)
+
+    def _key_id(self, key):
+        key = tuple(key)
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = len(self._key_list)
+            self._key_list.append(key)
+            self._key_ids[key] = key_id
+        return key_id
+
+    def _load(self, name):
+        """Return (datetime, key id array) for a snapshot, or None if it has no usable time."""
+        try:
+            save_time = parse_save_time(self.store.info(name))
+        except ValueError as e:
+            print(f"Error indexing workspace {name}: {str(e)}")
+            return None
+        return save_time, array('I', sorted(self._key_id(key) for key in self.store.window_keys(name)))
+
+    @stats.timed('timeline.build')
+    def build(self):
+        self.clear()
+        loaded = []
+        for name in self.store.names():
+            item = self._load(name)
+            if item is not None:
+                loaded.append((item[0], name, item[1]))
+        loaded.sort(key=lambda item: item[:2])
+
+        previous, previous_position = set(), None
+        for save_time, name, keys in loaded:
+            position = (save_time, name)
+            self._times.append(position)
+            self._time[name] = save_time
+            self._keys[name] = keys
+            current = set(keys)
+            for key_id in current - previous:
+                self._starts.append((save_time, name, key_id))
+                self._key_starts.setdefault(key_id, []).append(position)
+            for key_id in previous - current:
+                self._key_ends.setdefault(key_id, []).append(previous_position)
+            previous, previous_position = current, position
+        for key_id in previous:
+            self._key_ends.setdefault(key_id, []).append(previous_position)
+        # Appended in time order, except for keys starting in the same snapshot
+        self._starts.sort()
+        self.built = True
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+
+    # Updates
+
+    def _neighbour_keys(self, i):
+        if 0 <= i < len(self._times):
+            return set(self._keys[self._times[i][1]])
+        return set()
+
+    def _mark(self, kind, position, key_id, add):
+        runs = (self._key_starts if kind == 'start' else self._key_ends).setdefault(key_id, [])
+        if add:
+            insort(runs, position)
+            if kind == 'start':
+                insort(self._starts, position + (key_id,))
+            return
+        i = bisect_left(runs, position)
+        if i < len(runs) and runs[i] == position:
+            del runs[i]
+        if not runs:
+            del (self._key_starts if kind == 'start' else self._key_ends)[key_id]
+        if kind == 'start':
+            entry = position + (key_id,)
+            i = bisect_left(self._starts, entry)
+            if i < len(self._starts) and self._starts[i] == entry:
+                del self._starts[i]
+
+    def _update(self, i, add):
+        """Adjust runs for the snapshot at index i being added (or removed)."""
+        position = self._times[i]
+        current = set(self._keys[position[1]])
+        before = self._neighbour_keys(i - 1)
+        after = self._neighbour_keys(i + 1)
+        before_position = self._times[i - 1] if i > 0 else None
+        after_position = self._times[i + 1] if i + 1 < len(self._times) else None
+        # Runs starting or ending at the snapshot itself
+        for key_id in current - before:
+            self._mark('start', position, key_id, add)
+        for key_id in current - after:
+            self._mark('end', position, key_id, add)
+        # Runs of the next snapshot that it splits off (or no longer splits off)
+        for key_id in (after & current) - before:
+            self._mark('start', after_position, key_id, not add)
+        for key_id in (after & before) - current:
+            self._mark('start', after_position, key_id, add)
+        # Same for the previous snapshot's run ends
+        for key_id in (before & current) - after:
+            self._mark('end', before_position, key_id, not add)
+        for key_id in (before & after) - current:
+            self._mark('end', before_position, key_id, add)
+
+    def add(self, name):
+        if not self.built:
+            return
+        if name in self._time:
+            self.remove(name)
+        item = self._load(name)
+        if item is None:
+            return
+        save_time, keys = item
+        position = (save_time, name)
+        i = bisect_left(self._times, position)
+        self._times.insert(i, position)
+        self._time[name] = save_time
+        self._keys[name] = keys
+        self._update(i, True)
+
+    def remove(self, name):
+        save_time = self._time.get(name)
+        if not self.built or save_time is None:
+            return
+        i = bisect_left(self._times, (save_time, name))
+        self._update(i, False)
+        del self._times[i]
+        del self._time[name]
+        del self._keys[name]
+
+    # Queries
+
+    def snapshot_at(self, when):
+        """Name of the last snapshot saved at or before `when`, or None."""
+        self.ensure_built()
+        i = bisect_right(self._times, (when, _AFTER))
+        return self._times[i - 1][1] if i else None
+
+    def open_at(self, when):
+        """(process name, title) keys of the windows open at `when`."""
+        name = self.snapshot_at(when)
+        if name is None:
+            return []
+        return [self._key_list[key_id] for key_id in self._keys[name]]
+
+    def open_between(self, start, end):
+        """Keys of every window open at some point in [start, end)."""
+        keys = set(self.open_at(start))
+        lo = bisect_left(self._starts, (start, _AFTER))
+        hi = bisect_left(self._starts, (end, ''))
+        keys.update(self._key_list[key_id] for _, _, key_id in self._starts[lo:hi])
+        return keys
+
+    def lifetimes(self, key):
+        """(first seen, last seen) of each run of snapshots containing the window."""
+        self.ensure_built()
+        key_id = self._key_ids.get(tuple(key))
+        if key_id is None:
+            return []
+        starts = self._key_starts.get(key_id, [])
+        ends = self._key_ends.get(key_id, [])
+        return [(start[0], end[0]) for start, end in zip(starts, ends)]
+
+    def lifetimes_between(self, start, end):
+        """{key: [(first seen, last seen), ...]} for windows open during [start, end).
+
+        Only the runs that overlap the range are returned, unclipped.
+        """
+        state = self.snapshot_at(start)
+        # A run ending at the snapshot in effect at `start` is still open then
+        since = self._time[state] if state is not None else start
+        result = {}
+        for key in self.open_between(start, end):
+            runs = [run for run in self.lifetimes(key) if run[0] < end and run[1] >= since]
+            if runs:
+                result[key] = runs
+        return result
@@ -0,0 +1,392 @@
+"""Usage analytics over the snapshot history.
+
+Every saved snapshot is turned into columnar observations, one row per
+window: the snapshot it belongs to, its application and its layout (the
+application, show state and normal rect). The columns are array buffers
+that grow in place and are viewed as NumPy arrays for queries, so
+aggregates are computed with bincount/unique rather than Python loops.
+
+A snapshot stands for the time until the next one. Unchanged auto-saves
+aren't stored, so they are recorded as heartbeats: the newest snapshot was
+still on screen then. Each gap between consecutive snapshots and heartbeats
+is capped at MAX_GAP (the app was closed or the machine asleep) and, as
+soon as it is known, added once per application to the daily rollup: a
+days x applications matrix of seconds. Days are local calendar days; a gap
+that runs past midnight is split between the two.
+
+Observations record what was on screen, so they are kept when snapshots are
+thinned or deleted. Everything is saved to `analytics.npz` in the workspace
+directory; snapshots saved since (after a crash, say) are read back by
+catch_up_steps(), oldest first. Snapshots older than the newest one already
+indexed, such as imported ones, are only picked up by rebuild_steps(), which
+re-reads the columns and recomputes the rollup with rebuild_rollups(). Heartbeats
+are not in the store, so a rebuild keeps them.
+
+A lock guards the columns, so save() and load() can run on a worker thread
+while the GUI keeps ingesting.
+"""
+import io
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from perf_stats import stats
+from search_index import parse_save_time
+from write_queue import atomic_write
+
+ANALYTICS_FILE = 'analytics.npz'
+MAX_GAP = 3600
+DAY = 86400
+# Cells of the (snapshot, app) presence grid marked at a time by rebuild_rollups
+PRESENCE_CELLS = 1 << 22
+_EPOCH = datetime(1970, 1, 1)
+
+
+def local_seconds(when):
+    """Seconds since 1970 of a naive local time, so days split at local midnight."""
+    return (when - _EPOCH).total_seconds()
+
+
+def day_number(when):
+    return int(local_seconds(when) // DAY)
+
+
+def day_date(day):
+    return (_EPOCH + timedelta(days=int(day))).date()
+
+
+def window_layout(window):
+    """(show command, normal rect) of a window."""
+    placement = window.get('placement')
+    if placement and len(placement) >= 5:
+        return int(placement[1]), tuple(int(v) for v in placement[4])
+    rect = window.get('rect') or (0, 0, 0, 0)
+    return 1, tuple(int(v) for v in rect)
+
+
+class UsageAnalytics:
+    def __init__(self, directory):
+        self.path = os.path.join(directory, ANALYTICS_FILE)
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self, keep_beats=False):
+        self.apps = []              # process names, by app id
+        self._app_ids = {}
+        self.layouts = []           # (app id, show command, rect), by layout id
+        self._layout_ids = {}
+        self.times = array('d')     # snapshot times in local seconds, ascending
+        self.obs_snapshot = array('i')
+        self.obs_app = array('i')
+        self.obs_layout = array('i')
+        if not keep_beats:
+            self.beats = array('d')  # heartbeat times in local seconds, ascending
+        self.last_name = None       # newest snapshot indexed
+        self._last_start = 0        # its first observation
+        self.days = array('i')      # day numbers of the rollup rows, ascending
+        self.app_seconds = np.zeros((0, 0))
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.times)
+
+    # Columns are viewed, not copied; the views must not outlive a call, or
+    # the arrays can't grow
+
+    def _column(self, column):
+        return np.frombuffer(column, dtype=np.float64 if column.typecode == 'd' else np.intc)
+
+    def _app_id(self, name):
+        app_id = self._app_ids.get(name)
+        if app_id is None:
+            app_id = self._app_ids[name] = len(self.apps)
+            self.apps.append(name)
+        return app_id
+
+    def _layout_id(self, app_id, window):
+        key = (app_id,) + window_layout(window)
+        layout_id = self._layout_ids.get(key)
+        if layout_id is None:
+            layout_id = self._layout_ids[key] = len(self.layouts)
+            self.layouts.append(key)
+        return layout_id
+
+    # Ingestion
+
+    def is_new(self, name, when):
+        """True if a snapshot is newer than every snapshot indexed so far."""
+        if not self.times:
+            return True
+        return (local_seconds(when), name) > (self.times[-1], self.last_name or '')
+
+    def ingest(self, name, when, windows, rollup=True):
+        """Add a snapshot; returns False if it is older than the newest one indexed.
+
+        With `rollup` False only the columns are updated (see rebuild_steps).
+        """
+        if not self.is_new(name, when):
+            return False
+        seconds = local_seconds(when)
+        with self.lock:
+            if self.times and rollup:
+                self._credit(self._last_seen(), seconds)
+            index = len(self.times)
+            self.times.append(seconds)
+            self._last_start = len(self.obs_app)
+            for window in windows:
+                app_id = self._app_id(window.get('process_name') or '')
+                self.obs_snapshot.append(index)
+                self.obs_app.append(app_id)
+                self.obs_layout.append(self._layout_id(app_id, window))
+            self.last_name = name
+            self.dirty = True
+        return True
+
+    def heartbeat(self, when):
+        """Record that the newest snapshot was still on screen at `when`."""
+        seconds = local_seconds(when)
+        if not self.times or seconds <= self._last_seen():
+            return False
+        with self.lock:
+            self._credit(self._last_seen(), seconds)
+            self.beats.append(seconds)
+            self.dirty = True
+        return True
+
+    def _last_seen(self):
+        return max(self.times[-1], self.beats[-1]) if self.beats else self.times[-1]
+
+    def _credit(self, start, end):
+        """Add the gap from `start` to `end` to the newest snapshot's apps in the rollup."""
+        apps = np.unique(self._column(self.obs_app)[self._last_start:])
+        end = min(end, start + MAX_GAP)
+        if not apps.size or end <= start:
+            return
+        if self.app_seconds.shape[1] < len(self.apps):
+            self.app_seconds = np.pad(self.app_seconds, ((0, 0), (0, len(self.apps) - self.app_seconds.shape[1])))
+        while start < end:
+            day = int(start // DAY)
+            split = min(end, (day + 1) * DAY)
+            row = self._day_row(day)
+            self.app_seconds[row, apps] += split - start
+            start = split
+
+    def _day_row(self, day):
+        row = bisect_left(self.days, day)
+        if row == len(self.days) or self.days[row] != day:
+            self.days.insert(row, day)
+            self.app_seconds = np.insert(self.app_seconds, row, 0.0, axis=0)
+        return row
+
+    def catch_up_steps(self, store, rollup=True):
+        """Ingest the store's snapshots newer than the newest one indexed; yields after each.
+
+        The rollup is updated as they go, unless `rollup` is False or
+        heartbeats were recorded past them (a rebuild keeps those): then it
+        is recomputed by rebuild_rollups() at the end, or when stopped early.
+        """
+        pending = []
+        for name in store.names():
+            try:
+                pending.append((local_seconds(parse_save_time(store.info(name))), name))
+            except ValueError:
+                continue
+        pending.sort()
+        if self.times:
+            pending = pending[bisect_right(pending, (self.times[-1], self.last_name or '')):]
+        if pending and self.beats and self.beats[-1] > pending[0][0]:
+            rollup = False
+        try:
+            for _, name in pending:
+                data = store.get(name)
+                if data is not None:
+                    self.ingest(name, parse_save_time(data), data.get('windows', []), rollup)
+                yield
+        finally:
+            if not rollup:
+                with self.lock:
+                    self.rebuild_rollups()
+
+    def rebuild_steps(self, store):
+        """Re-read every snapshot in the store, then recompute the rollup; yields after each."""
+        with self.lock:
+            self.clear(keep_beats=True)
+            self.dirty = True
+        return self.catch_up_steps(store, rollup=False)
+
+    def _intervals(self):
+        """(snapshot, start, seconds) of each gap between consecutive snapshots and heartbeats."""
+        times = self._column(self.times)
+        beats = self._column(self.beats)
+        points = np.concatenate([times, beats])
+        owners = np.concatenate([np.arange(len(times)), np.searchsorted(times, beats, side='right') - 1])
+        # Stable, so a heartbeat at a snapshot's time comes after it
+        order = np.argsort(points, kind='stable')
+        points, owners = points[order], owners[order]
+        seconds = np.minimum(np.diff(points), MAX_GAP)
+        # Heartbeats from before the first snapshot (kept through a rebuild) belong to none
+        known = owners[:-1] >= 0
+        return owners[:-1][known], points[:-1][known], seconds[known]
+
+    @stats.timed('analytics.rollup')
+    def rebuild_rollups(self):
+        """Recompute the daily rollup from the columns with vectorized passes."""
+        snapshot_count = len(self.times)
+        app_count = max(len(self.apps), 1)
+        owners, starts, seconds = self._intervals()
+        # Gaps are capped below a day, so each crosses at most one midnight
+        first_days = starts // DAY
+        split = np.minimum(starts + seconds, (first_days + 1) * DAY)
+        # Intervals are in time order, so interleaving their two pieces keeps
+        # the pieces ordered by snapshot, then day
+        owners = np.repeat(owners, 2)
+        piece_days = np.column_stack([first_days, first_days + 1]).ravel().astype(np.intc)
+        weights = np.column_stack([split - starts, starts + seconds - split]).ravel()
+        snapshots = self._column(self.obs_snapshot)
+        apps = self._column(self.obs_app)
+        observed = np.bincount(snapshots, minlength=snapshot_count) > 0
+        keep = (weights > 0) & observed[owners]
+        if not keep.any():
+            self.days = array('i')
+            self.app_seconds = np.zeros((0, len(self.apps)))
+            return
+        # One piece per (snapshot, day)
+        owners, piece_days, weights = owners[keep], piece_days[keep], weights[keep]
+        firsts = np.flatnonzero(np.r_[True, (np.diff(owners) != 0) | (np.diff(piece_days) != 0)])
+        owners, piece_days, weights = owners[firsts], piece_days[firsts], np.add.reduceat(weights, firsts)
+        days = np.unique(piece_days)
+        day_index = np.searchsorted(days, piece_days)
+        piece_start = np.searchsorted(owners, np.arange(snapshot_count))
+        piece_count = np.bincount(owners, minlength=snapshot_count)
+        matrix = np.zeros(len(days) * app_count)
+        # Each app counts once per snapshot: mark (snapshot, app) cells present,
+        # a block of snapshots at a time, instead of sorting every observation
+        block = max(1, PRESENCE_CELLS // app_count)
+        blocks = np.arange(0, snapshot_count, block)
+        bounds = np.searchsorted(snapshots, np.append(blocks, snapshot_count).astype(np.intc))
+        for first, lo, hi in zip(blocks, bounds[:-1], bounds[1:]):
+            presence = np.zeros(block * app_count, dtype=bool)
+            presence[(snapshots[lo:hi] - first) * app_count + apps[lo:hi]] = True
+            cells = np.flatnonzero(presence)
+            pair_snapshots = first + cells // app_count
+            repeats = piece_count[pair_snapshots]
+            if repeats.max(initial=0) <= 1:
+                # Usual case: no snapshot in the block spans midnight
+                pairs = np.flatnonzero(repeats)
+                pieces = piece_start[pair_snapshots[pairs]]
+            else:
+                # Repeat each (snapshot, app) pair once per piece of its snapshot
+                pairs = np.repeat(np.arange(len(cells)), repeats)
+                pieces = piece_start[pair_snapshots][pairs] + np.arange(len(pairs)) - np.repeat(
+                    np.cumsum(repeats) - repeats, repeats)
+            matrix += np.bincount(day_index[pieces] * app_count + cells[pairs] % app_count,
+                                  weights=weights[pieces], minlength=len(matrix))
+        self.days = array('i', days.tobytes())
+        self.app_seconds = matrix.reshape(len(days), app_count)[:, :len(self.apps)]
+
+    # Queries
+
+    @stats.timed('analytics.app_hours')
+    def app_hours(self, first_day=None, last_day=None):
+        """Hours per application per day for day numbers in [first_day, last_day].
+
+        Returns (days, app names, matrix of hours); apps are ordered by total
+        hours, most used first, and unused ones are left out.
+        """
+        days = self._column(self.days).copy()
+        lo = 0 if first_day is None else int(np.searchsorted(days, first_day))
+        hi = len(days) if last_day is None else int(np.searchsorted(days, last_day, side='right'))
+        hours = self.app_seconds[lo:hi] / 3600.0
+        totals = hours.sum(axis=0)
+        order = np.argsort(-totals, kind='stable')
+        order = order[totals[order] > 0]
+        return days[lo:hi], [self.apps[i] for i in order], hours[:, order]
+
+    @stats.timed('analytics.top_layouts')
+    def top_layouts(self, start=None, end=None, limit=10):
+        """Most used window layouts between two datetimes, as (app, show command, rect, hours)."""
+        times = self._column(self.times)
+        if len(times) < 2 and not self.beats:
+            return []
+        owners, _, seconds = self._intervals()
+        durations = np.bincount(owners, weights=seconds, minlength=len(times))
+        snapshots = self._column(self.obs_snapshot)
+        layouts = self._column(self.obs_layout)
+        if start is not None or end is not None:
+            in_range = np.ones(len(times), dtype=bool)
+            if start is not None:
+                in_range &= times >= local_seconds(start)
+            if end is not None:
+                in_range &= times < local_seconds(end)
+            keep = in_range[snapshots]
+            snapshots, layouts = snapshots[keep], layouts[keep]
+        seconds = np.bincount(layouts, weights=durations[snapshots], minlength=len(self.layouts))
+        top = np.argsort(-seconds, kind='stable')[:limit]
+        result = []
+        for i in top:
+            if seconds[i] > 0:
+                app_id, show_cmd, rect = self.layouts[i]
+                result.append((self.apps[app_id], show_cmd, rect, float(seconds[i] / 3600.0)))
+        return result
+
+    def summary(self):
+        return {'snapshots': len(self.times), 'observations': len(self.obs_app),
+                'apps': len(self.apps), 'layouts': len(self.layouts),
+                'hours': float(self.app_seconds.sum() / 3600.0) if self.app_seconds.size else 0.0}
+
+    # Persistence
+
+    def save(self):
+        """Write analytics.npz; the columns are only locked while they are serialized."""
+        with self.lock:
+            layouts = np.array([(app_id, show) + rect for app_id, show, rect in self.layouts],
+                               dtype=np.int32).reshape(-1, 6)
+            buffer = io.BytesIO()
+            np.savez(buffer, times=self._column(self.times), obs_snapshot=self._column(self.obs_snapshot),
+                     obs_app=self._column(self.obs_app), obs_layout=self._column(self.obs_layout),
+                     beats=self._column(self.beats), apps=np.array(self.apps, dtype=str), layouts=layouts,
+                     days=self._column(self.days), app_seconds=self.app_seconds,
+                     last_name=np.array(self.last_name or ''))
+            self.dirty = False
+        try:
+            atomic_write(self.path, buffer.getvalue())
+        except Exception:
+            self.dirty = True
+            raise
+
+    @stats.timed('analytics.load')
+    def load(self):
+        """Load the saved columns; returns False (and starts empty) if there are none."""
+        with self.lock:
+            return self._load()
+
+    def _load(self):
+        self.clear()
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path) as data:
+                self.times = array('d', data['times'].astype(np.float64).tobytes())
+                if 'beats' in data.files:
+                    # Files from before heartbeats were recorded have none
+                    self.beats = array('d', data['beats'].astype(np.float64).tobytes())
+                for column in ('obs_snapshot', 'obs_app', 'obs_layout', 'days'):
+                    setattr(self, column, array('i', data[column].astype(np.intc).tobytes()))
+                self.apps = [str(name) for name in data['apps']]
+                self.layouts = [(int(row[0]), int(row[1]), tuple(int(v) for v in row[2:]))
+                                for row in data['layouts']]
+                self.app_seconds = data['app_seconds']
+                self.last_name = str(data['last_name']) or None
+        except Exception as e:
+            print(f"Error loading analytics: {str(e)}")
+            self.clear()
+            return False
+        self._app_ids = {name: i for i, name in enumerate(self.apps)}
+        self._layout_ids = {layout: i for i, layout in enumerate(self.layouts)}
+        if self.times:
+            self._last_start = int(np.searchsorted(self._column(self.obs_snapshot), np.intc(len(self.times) - 1)))
+        return True
@@ -0,0 +1,526 @@
+"""Window backends used by the workspace manager to talk to the desktop.
+
+The manager never calls win32gui/win32process/psutil directly; it goes
+through a WindowBackend so capture and restore can run against the real
+Windows desktop or against a deterministic in-memory simulation.
+"""
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+# ShowWindow constants (mirrors win32con so the simulated backend does not need pywin32)
+SW_SHOWNORMAL = 1
+SW_SHOWMINIMIZED = 2
+SW_SHOWMAXIMIZED = 3
+
+# Window event kinds reported through WindowBackend.watch_events
+EVENT_CREATE = 'create'
+EVENT_DESTROY = 'destroy'
+EVENT_MOVE = 'move'
+EVENT_NAME = 'name'
+EVENT_SHOW = 'show'
+EVENT_HIDE = 'hide'
+
+
+class ProcessNotFound(Exception):
+    """The process owning a window has exited."""
+
+
+class ProcessAccessDenied(Exception):
+    """The process exists but its metadata cannot be read."""
+
+
+class WindowBackend:
+    """Interface for window enumeration, placement and process lookups."""
+
+    name = "base"
+
+    def enum_windows(self):
+        """Return the handles of all top-level windows."""
+        raise NotImplementedError
+
+    def is_window_visible(self, hwnd):
+        raise NotImplementedError
+
+    def get_window_text(self, hwnd):
+        raise NotImplementedError
+
+    def get_window_pid(self, hwnd):
+        raise NotImplementedError
+
+    def get_window_placement(self, hwnd):
+        raise NotImplementedError
+
+    def get_window_rect(self, hwnd):
+        raise NotImplementedError
+
+    def set_window_placement(self, hwnd, placement):
+        raise NotImplementedError
+
+    def get_process_create_time(self, pid):
+        """Return the creation time of `pid`; cheaper than get_process_info."""
+        raise NotImplementedError
+
+    def get_process_info(self, pid):
+        """Return a dict with name, exe, command_line, creation_time and status.
+
+        Raises ProcessNotFound or ProcessAccessDenied.
+        """
+        raise NotImplementedError
+
+    def iter_processes(self):
+        """Yield (pid, name) for every running process."""
+        raise NotImplementedError
+
+    def start_process(self, exe):
+        raise NotImplementedError
+
+    def cpu_percent(self):
+        """System-wide CPU use in percent since the previous call, or None if unknown."""
+        return None
+
+    def watch_events(self, callback):
+        """Call `callback(kind, hwnd)` for window events as they happen.
+
+        Returns a function that stops watching, or None if this backend
+        cannot report events (callers then fall back to polling). The
+        callback may run on another thread.
+        """
+        return None
+
+
+# WinEvent constants (winuser.h)
+_EVENT_SYSTEM_MINIMIZESTART = 0x0016
+_EVENT_SYSTEM_MINIMIZEEND = 0x0017
+_EVENT_OBJECT_CREATE = 0x8000
+_EVENT_OBJECT_DESTROY = 0x8001
+_EVENT_OBJECT_SHOW = 0x8002
+_EVENT_OBJECT_HIDE = 0x8003
+_EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+_EVENT_OBJECT_NAMECHANGE = 0x800C
+_WIN_EVENTS = {
+    _EVENT_SYSTEM_MINIMIZESTART: EVENT_MOVE,
+    _EVENT_SYSTEM_MINIMIZEEND: EVENT_MOVE,
+    _EVENT_OBJECT_CREATE: EVENT_CREATE,
+    _EVENT_OBJECT_DESTROY: EVENT_DESTROY,
+    _EVENT_OBJECT_SHOW: EVENT_SHOW,
+    _EVENT_OBJECT_HIDE: EVENT_HIDE,
+    _EVENT_OBJECT_LOCATIONCHANGE: EVENT_MOVE,
+    _EVENT_OBJECT_NAMECHANGE: EVENT_NAME,
+}
+_OBJID_WINDOW = 0
+_GA_ROOT = 2
+_WINEVENT_OUTOFCONTEXT = 0x0000
+_WINEVENT_SKIPOWNPROCESS = 0x0002
+_WM_QUIT = 0x0012
+
+
+class Win32WindowBackend(WindowBackend):
+    """Backend for the live Windows desktop (pywin32 + psutil)."""
+
+    name = "win32"
+
+    def __init__(self):
+        # Imported here so the rest of the app can load on machines without pywin32
+        import win32gui
+        import win32process
+        import psutil
+        self._win32gui = win32gui
+        self._win32process = win32process
+        self._psutil = psutil
+
+    def enum_windows(self):
+        handles = []
+
+        def enum_windows_callback(hwnd, _):
+            handles.append(hwnd)
+            return True
+
+        self._win32gui.EnumWindows(enum_windows_callback, None)
+        return handles
+
+    def is_window_visible(self, hwnd):
+        return bool(self._win32gui.IsWindowVisible(hwnd))
+
+    def get_window_text(self, hwnd):
+        return self._win32gui.GetWindowText(hwnd)
+
+    def get_window_pid(self, hwnd):
+        _, pid = self._win32process.GetWindowThreadProcessId(hwnd)
+        return pid
+
+    def get_window_placement(self, hwnd):
+        return self._win32gui.GetWindowPlacement(hwnd)
+
+    def get_window_rect(self, hwnd):
+        return self._win32gui.GetWindowRect(hwnd)
+
+    def set_window_placement(self, hwnd, placement):
+        # Placements loaded from JSON come back as nested lists
+        placement = tuple(tuple(p) if isinstance(p, list) else p for p in placement)
+        self._win32gui.SetWindowPlacement(hwnd, placement)
+
+    def get_process_create_time(self, pid):
+        psutil = self._psutil
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.NoSuchProcess as e:
+            raise ProcessNotFound(str(e)) from e
+        except psutil.AccessDenied as e:
+            raise ProcessAccessDenied(str(e)) from e
+
+    def get_process_info(self, pid):
+        psutil = self._psutil
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                return {
+                    'name': process.name(),
+                    'exe': process.exe(),
+                    'command_line': process.cmdline(),
+                    'creation_time': process.create_time(),
+                    'status': process.status(),
+                }
+        except psutil.NoSuchProcess as e:
+            raise ProcessNotFound(str(e)) from e
+        except psutil.AccessDenied as e:
+            raise ProcessAccessDenied(str(e)) from e
+
+    def iter_processes(self):
+        psutil = self._psutil
+        for proc in psutil.process_iter(['name']):
+            try:
+                yield proc.pid, proc.info['name']
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+    def start_process(self, exe):
+        os.startfile(exe)
+
+    def cpu_percent(self):
+        # Non-blocking: averaged over the time since the previous call
+        return self._psutil.cpu_percent(interval=None)
+
+    def watch_events(self, callback):
+        """Install out-of-context WinEvent hooks on a dedicated message-loop thread."""
+        import ctypes
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                          wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.SetWinEventHook.argtypes = [wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WinEventProc,
+                                           wintypes.DWORD, wintypes.DWORD, wintypes.DWORD]
+        user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+        user32.GetAncestor.restype = wintypes.HWND
+        user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+
+        def on_event(hook, event, hwnd, id_object, id_child, event_thread, event_time):
+            if id_object != _OBJID_WINDOW or id_child != 0 or not hwnd:
+                return
+            kind = _WIN_EVENTS.get(event)
+            # Only top-level windows; destroyed handles can't be checked and are filtered later
+            if kind is None or (kind != EVENT_DESTROY and user32.GetAncestor(hwnd, _GA_ROOT) != hwnd):
+                return
+            try:
+                callback(kind, hwnd)
+            except Exception as e:
+                print(f"Error handling window event: {str(e)}")
+
+        proc = WinEventProc(on_event)  # referenced by run() for as long as the hooks exist
+        started = threading.Event()
+        state = {}
+
+        def run():
+            state['thread_id'] = kernel32.GetCurrentThreadId()
+            flags = _WINEVENT_OUTOFCONTEXT | _WINEVENT_SKIPOWNPROCESS
+            hooks = [user32.SetWinEventHook(low, high, None, proc, 0, 0, flags)
+                     for low, high in ((_EVENT_SYSTEM_MINIMIZESTART, _EVENT_SYSTEM_MINIMIZEEND),
+                                       (_EVENT_OBJECT_CREATE, _EVENT_OBJECT_NAMECHANGE))]
+            state['ok'] = all(hooks)
+            started.set()
+            msg = wintypes.MSG()
+            while state['ok'] and user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+            for hook in hooks:
+                if hook:
+                    user32.UnhookWinEvent(hook)
+
+        thread = threading.Thread(target=run, name="WinEventHook", daemon=True)
+        thread.start()
+        started.wait()
+        if not state['ok']:
+            thread.join(1)
+            return None
+
+        def stop():
+            user32.PostThreadMessageW(state['thread_id'], _WM_QUIT, 0, 0)
+            thread.join(1)
+
+        return stop
+
+
+_APP_CATALOG = [
+    ("chrome.exe", r"C:\Program Files\Google\Chrome\Application\chrome.exe", "Google Chrome"),
+    ("Code.exe", r"C:\Users\user\AppData\Local\Programs\Microsoft VS Code\Code.exe", "Visual Studio Code"),
+    ("explorer.exe", r"C:\Windows\explorer.exe", "File Explorer"),
+    ("WINWORD.EXE", r"C:\Program Files\Microsoft Office\root\Office16\WINWORD.EXE", "Word"),
+    ("EXCEL.EXE", r"C:\Program Files\Microsoft Office\root\Office16\EXCEL.EXE", "Excel"),
+    ("slack.exe", r"C:\Users\user\AppData\Local\slack\slack.exe", "Slack"),
+    ("notepad.exe", r"C:\Windows\System32\notepad.exe", "Notepad"),
+    ("WindowsTerminal.exe", r"C:\Program Files\WindowsApps\Microsoft.WindowsTerminal\WindowsTerminal.exe", "Terminal"),
+    ("firefox.exe", r"C:\Program Files\Mozilla Firefox\firefox.exe", "Mozilla Firefox"),
+    ("Spotify.exe", r"C:\Users\user\AppData\Roaming\Spotify\Spotify.exe", "Spotify"),
+]
+
+
+class SimulatedWindowBackend(WindowBackend):
+    """Deterministic in-memory desktop for profiling capture on any platform.
+
+    Generates `window_count` top-level windows owned by `process_count`
+    processes from a fixed seed. Every backend call sleeps (or spins, for
+    sub-millisecond values) for `latency` seconds, and `calls` counts how
+    many times each method was hit.
+
+    The mutators (add_window, move_window, set_window_text, set_window_visible,
+    close_window, kill_process, set_window_placement) report the matching
+    window events to watch_events subscribers, so tests can script a
+    desktop session. start_process opens a window for the new process
+    `launch_delay` seconds later, from a timer thread, like a real
+    application does; None starts processes without windows.
+
+    Capture, restore, the process catalog and event subscribers use the
+    backend from different threads, so the desktop state is guarded by a lock.
+    Events are delivered after it is released.
+    """
+
+    name = "simulated"
+
+    def __init__(self, window_count=50, process_count=10, latency=0.0, seed=0,
+                 hidden_ratio=0.1, denied_ratio=0.05, launch_delay=0.2):
+        self.latency = latency
+        self.launch_delay = launch_delay
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._next_pid = 1000
+        self._next_hwnd = 0x10010
+        self.processes = {}
+        self.windows = {}
+        self._listeners = []
+        self.cpu_load = 0.0  # reported by cpu_percent(); set it to script load
+
+        rng = self._rng
+        base_time = 1700000000.0
+        for _ in range(max(1, process_count)):
+            name, exe, _ = rng.choice(_APP_CATALOG)
+            pid = self._next_pid
+            self._next_pid += 4
+            self.processes[pid] = {
+                'name': name,
+                'exe': exe,
+                'command_line': [exe] + [f"--flag-{rng.randrange(100)}" for _ in range(rng.randrange(4))],
+                'creation_time': base_time + rng.randrange(86400),
+                'status': 'running',
+                'denied': rng.random() < denied_ratio,
+            }
+
+        pids = list(self.processes)
+        for i in range(window_count):
+            self.add_window(rng.choice(pids), visible=rng.random() >= hidden_ratio, index=i)
+
+    def watch_events(self, callback):
+        with self._lock:
+            self._listeners.append(callback)
+
+        def stop():
+            with self._lock:
+                if callback in self._listeners:
+                    self._listeners.remove(callback)
+        return stop
+
+    def _emit(self, kind, hwnd):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback(kind, hwnd)
+
+    def _simulate_call(self, method):
+        with self._lock:
+            self.calls[method] += 1
+        if self.latency <= 0:
+            return
+        if self.latency >= 0.001:
+            time.sleep(self.latency)
+        else:
+            deadline = time.perf_counter() + self.latency
+            while time.perf_counter() < deadline:
+                pass
+
+    def add_window(self, pid, title=None, visible=True, index=None):
+        """Create a window owned by `pid` and return its handle."""
+        with self._lock:
+            rng = self._rng
+            hwnd = self._next_hwnd
+            self._next_hwnd += 2
+            app_title = next((t for n, _, t in _APP_CATALOG if n == self.processes[pid]['name']), "App")
+            if title is None:
+                title = f"Document {index if index is not None else hwnd} - {app_title}"
+            left, top = rng.randrange(0, 1600), rng.randrange(0, 900)
+            width, height = rng.randrange(400, 1600), rng.randrange(300, 1000)
+            show_cmd = SW_SHOWMAXIMIZED if rng.random() < 0.3 else SW_SHOWNORMAL
+            self.windows[hwnd] = {
+                'pid': pid,
+                'title': title,
+                'visible': visible,
+                'placement': (0, show_cmd, (-1, -1), (-1, -1), (left, top, left + width, top + height)),
+                'rect': (left, top, left + width, top + height),
+            }
+        self._emit(EVENT_CREATE, hwnd)
+        return hwnd
+
+    def _window(self, hwnd):
+        try:
+            return self.windows[hwnd]
+        except KeyError:
+            raise OSError(f"Invalid window handle: {hwnd}") from None
+
+    def _window_field(self, hwnd, field):
+        with self._lock:
+            return self._window(hwnd)[field]
+
+    def enum_windows(self):
+        self._simulate_call('enum_windows')
+        with self._lock:
+            return list(self.windows)
+
+    def is_window_visible(self, hwnd):
+        self._simulate_call('is_window_visible')
+        return self._window_field(hwnd, 'visible')
+
+    def get_window_text(self, hwnd):
+        self._simulate_call('get_window_text')
+        return self._window_field(hwnd, 'title')
+
+    def get_window_pid(self, hwnd):
+        self._simulate_call('get_window_pid')
+        return self._window_field(hwnd, 'pid')
+
+    def get_window_placement(self, hwnd):
+        self._simulate_call('get_window_placement')
+        return self._window_field(hwnd, 'placement')
+
+    def get_window_rect(self, hwnd):
+        self._simulate_call('get_window_rect')
+        return self._window_field(hwnd, 'rect')
+
+    def set_window_placement(self, hwnd, placement):
+        self._simulate_call('set_window_placement')
+        placement = tuple(tuple(p) if isinstance(p, list) else p for p in placement)
+        with self._lock:
+            window = self._window(hwnd)
+            window['placement'] = placement
+            window['rect'] = placement[4]
+        self._emit(EVENT_MOVE, hwnd)
+
+    def _process(self, pid):
+        process = self.processes.get(pid)
+        if process is None:
+            raise ProcessNotFound(f"process no longer exists (pid={pid})")
+        return process
+
+    def get_process_create_time(self, pid):
+        self._simulate_call('get_process_create_time')
+        with self._lock:
+            return self._process(pid)['creation_time']
+
+    def get_process_info(self, pid):
+        self._simulate_call('get_process_info')
+        with self._lock:
+            process = self._process(pid)
+            if process['denied']:
+                raise ProcessAccessDenied(f"access denied (pid={pid})")
+            return {key: process[key] for key in ('name', 'exe', 'command_line', 'creation_time', 'status')}
+
+    def iter_processes(self):
+        self._simulate_call('iter_processes')
+        with self._lock:
+            processes = [(pid, process['name']) for pid, process in self.processes.items()]
+        yield from processes
+
+    def move_window(self, hwnd, rect, show_cmd=SW_SHOWNORMAL):
+        with self._lock:
+            window = self._window(hwnd)
+            window['placement'] = (0, show_cmd, (-1, -1), (-1, -1), tuple(rect))
+            window['rect'] = tuple(rect)
+        self._emit(EVENT_MOVE, hwnd)
+
+    def set_window_text(self, hwnd, title):
+        with self._lock:
+            self._window(hwnd)['title'] = title
+        self._emit(EVENT_NAME, hwnd)
+
+    def set_window_visible(self, hwnd, visible):
+        with self._lock:
+            self._window(hwnd)['visible'] = visible
+        self._emit(EVENT_SHOW if visible else EVENT_HIDE, hwnd)
+
+    def close_window(self, hwnd):
+        with self._lock:
+            closed = self.windows.pop(hwnd, None) is not None
+        if closed:
+            self._emit(EVENT_DESTROY, hwnd)
+
+    def kill_process(self, pid):
+        """Remove a process and all of its windows."""
+        with self._lock:
+            self.processes.pop(pid, None)
+            hwnds = [h for h, w in self.windows.items() if w['pid'] == pid]
+            for hwnd in hwnds:
+                del self.windows[hwnd]
+        for hwnd in hwnds:
+            self._emit(EVENT_DESTROY, hwnd)
+
+    def start_process(self, exe):
+        self._simulate_call('start_process')
+        name = exe.replace('\\', '/').rsplit('/', 1)[-1]
+        with self._lock:
+            pid = self._next_pid
+            self._next_pid += 4
+            self.processes[pid] = {
+                'name': name,
+                'exe': exe,
+                'command_line': [exe],
+                'creation_time': time.time(),
+                'status': 'running',
+                'denied': False,
+            }
+        if self.launch_delay is not None:
+            timer = threading.Timer(self.launch_delay, self._open_launched_window, (pid,))
+            timer.daemon = True
+            timer.start()
+        return pid
+
+    def _open_launched_window(self, pid):
+        try:
+            self.add_window(pid)
+        except KeyError:
+            # Killed before its window came up
+            pass
+
+    def cpu_percent(self):
+        self._simulate_call('cpu_percent')
+        return self.cpu_load
+
+
+def create_backend(name="win32", **kwargs):
+    """Build a backend by name ("win32" or "simulated")."""
+    if name == "win32":
+        return Win32WindowBackend()
+    if name == "simulated":
+        return SimulatedWindowBackend(**kwargs)
+    raise ValueError(f"Unknown window backend: {name}")
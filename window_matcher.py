@@ -0,0 +1,157 @@
+"""Match saved windows to live windows in one assignment step.
+
+The live desktop is enumerated once per pass into a LiveWindowIndex keyed by
+process name, exe path and title tokens. Every saved window is scored only
+against the live windows that share its process (or exe), and the best
+pairs are assigned greedily so each live window is used at most once. Titles
+only need to be similar, not identical, so a browser whose active tab
+changed still matches.
+"""
+import re
+import time
+
+from window_backend import ProcessAccessDenied
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def title_tokens(title):
+    return frozenset(t for t in _TOKEN_RE.findall((title or '').lower()) if len(t) > 1)
+
+
+class LiveWindow:
+    __slots__ = ('hwnd', 'title', 'process_name', 'exe', 'tokens')
+
+    def __init__(self, hwnd, title, process_name, exe):
+        self.hwnd = hwnd
+        self.title = title
+        self.process_name = (process_name or '').lower()
+        self.exe = (exe or '').lower()
+        self.tokens = title_tokens(title)
+
+
+class LiveWindowIndex:
+    def __init__(self, live_windows):
+        self.windows = live_windows
+        self.by_process = {}
+        self.by_exe = {}
+        self.by_title = {}
+        for live in live_windows:
+            self.by_process.setdefault(live.process_name, []).append(live)
+            if live.exe:
+                self.by_exe.setdefault(live.exe, []).append(live)
+            self.by_title.setdefault(live.title, []).append(live)
+
+    @classmethod
+    def from_backend(cls, backend, process_lookup):
+        """Enumerate visible, titled windows once; `process_lookup(pid)` returns process info.
+
+        Windows whose process can't be read are indexed without process info.
+        """
+        live_windows = []
+        for hwnd in backend.enum_windows():
+            try:
+                if not backend.is_window_visible(hwnd):
+                    continue
+                title = backend.get_window_text(hwnd)
+                if not title:
+                    continue
+                pid = backend.get_window_pid(hwnd)
+            except Exception:
+                continue
+            try:
+                process = process_lookup(pid)
+            except ProcessAccessDenied:
+                process = {}
+            except Exception:
+                continue
+            live_windows.append(LiveWindow(hwnd, title, process.get('name'), process.get('exe')))
+        return cls(live_windows)
+
+    def candidates(self, saved):
+        exe = (saved.get('exe') or '').lower()
+        process_name = (saved.get('process_name') or '').lower()
+        found = {id(live): live for live in self.by_exe.get(exe, ())}
+        # Windows whose process is unknown aren't grouped under an empty name
+        for live in self.by_process.get(process_name, ()) if process_name else ():
+            found.setdefault(id(live), live)
+        if not found:
+            # Process metadata unavailable (e.g. access denied): fall back to exact
+            # titles, but only of windows whose process is unknown too
+            for live in self.by_title.get(saved.get('title'), ()):
+                if not live.process_name and not live.exe:
+                    found.setdefault(id(live), live)
+        return found.values()
+
+
+def score_match(saved, saved_tokens, live):
+    """Similarity in [0, 1]: title similarity plus exe/process agreement."""
+    if saved.get('title') == live.title:
+        title_score = 1.0
+    elif saved_tokens and live.tokens:
+        title_score = len(saved_tokens & live.tokens) / len(saved_tokens | live.tokens)
+    else:
+        title_score = 0.0
+    exe_score = 1.0 if live.exe and live.exe == (saved.get('exe') or '').lower() else 0.0
+    process_score = 1.0 if live.process_name == (saved.get('process_name') or '').lower() else 0.0
+    return 0.6 * title_score + 0.25 * exe_score + 0.15 * process_score
+
+
+class MatchStats:
+    def __init__(self):
+        self.passes = 0
+        self.exact = 0
+        self.fuzzy = 0
+        self.scores = []
+        self.index_time = 0.0
+        self.match_time = 0.0
+
+    def record(self, score):
+        self.scores.append(score)
+        if score >= 1.0:
+            self.exact += 1
+        else:
+            self.fuzzy += 1
+
+    def as_dict(self):
+        return {
+            'passes': self.passes,
+            'exact': self.exact,
+            'fuzzy': self.fuzzy,
+            'mean_score': sum(self.scores) / len(self.scores) if self.scores else 0.0,
+            'index_ms': self.index_time * 1000,
+            'match_ms': self.match_time * 1000,
+        }
+
+
+def match_windows(saved_windows, index, used=(), min_score=0.5, stats=None):
+    """Assign saved windows to live windows; returns [(saved_position, LiveWindow, score)]."""
+    start = time.perf_counter()
+    pairs = []
+    for position, saved in enumerate(saved_windows):
+        saved_tokens = title_tokens(saved.get('title'))
+        for live in index.candidates(saved):
+            if live.hwnd in used:
+                continue
+            score = score_match(saved, saved_tokens, live)
+            if score >= min_score:
+                pairs.append((score, position, live))
+
+    # Best pairs first; each saved and each live window is assigned once
+    pairs.sort(key=lambda pair: (-pair[0], pair[1]))
+    assigned_saved = set()
+    assigned_live = set(used)
+    matches = []
+    for score, position, live in pairs:
+        if position in assigned_saved or live.hwnd in assigned_live:
+            continue
+        assigned_saved.add(position)
+        assigned_live.add(live.hwnd)
+        matches.append((position, live, score))
+        if stats is not None:
+            stats.record(score)
+
+    if stats is not None:
+        stats.passes += 1
+        stats.match_time += time.perf_counter() - start
+    return matches
@@ -0,0 +1,150 @@
+"""Compact in-memory window records.
+
+Loaded snapshots used to keep every window as a dict that repeated the same
+keys, exe paths, process names and command lines across thousands of
+records. WindowRecord stores the same data in `__slots__`:
+
+- strings are interned, so every record of the same process shares one exe
+  path and process name;
+- command lines are tuples shared between all records with the same
+  arguments, through a bounded table of the most recently seen ones (a
+  per-document or temp-file argument must not stay in memory forever);
+- placement and rect are packed into a single 56-byte bytes object.
+
+A WindowRecord is a read-only Mapping with the same keys as the capture
+dict, so `window['title']` and `window.get('exe')` keep working. Records
+that do not have the standard shape stay plain dicts.
+"""
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from window_backend import SW_SHOWMAXIMIZED
+
+KEYS = ('title', 'process_name', 'exe', 'placement', 'rect', 'pid',
+        'command_line', 'creation_time', 'status', 'window_state')
+_KEY_SET = frozenset(KEYS)
+
+# flags, show_cmd, min position (2), max position (2), normal rect (4), window rect (4)
+_GEOMETRY = struct.Struct('<14i')
+_SHOW_CMD = struct.Struct('<i')
+
+# Most recently seen command lines; records keep their own tuples alive
+COMMAND_LINE_CACHE_SIZE = 4096
+_command_lines = OrderedDict()
+_command_lines_lock = threading.Lock()
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _shared_command_line(command_line):
+    if command_line is None:
+        return None
+    key = tuple(_intern(arg) for arg in command_line)
+    with _command_lines_lock:
+        shared = _command_lines.get(key)
+        if shared is not None:
+            _command_lines.move_to_end(key)
+            return shared
+        _command_lines[key] = key
+        if len(_command_lines) > COMMAND_LINE_CACHE_SIZE:
+            _command_lines.popitem(last=False)
+    return key
+
+
+def _pack_geometry(placement, rect):
+    flags, show_cmd, min_position, max_position, normal_rect = placement
+    return _GEOMETRY.pack(flags, show_cmd, *min_position, *max_position, *normal_rect, *rect)
+
+
+class WindowRecord(Mapping):
+    __slots__ = ('title', 'process_name', 'exe', 'pid', 'command_line',
+                 'creation_time', 'status', '_geometry')
+
+    def __init__(self, window):
+        self.title = _intern(window['title'])
+        self.process_name = _intern(window['process_name'])
+        self.exe = _intern(window['exe'])
+        self.pid = window['pid']
+        self.command_line = _shared_command_line(window['command_line'])
+        self.creation_time = window['creation_time']
+        self.status = _intern(window['status'])
+        self._geometry = _pack_geometry(window['placement'], window['rect'])
+
+    @property
+    def placement(self):
+        values = _GEOMETRY.unpack(self._geometry)
+        return (values[0], values[1], values[2:4], values[4:6], values[6:10])
+
+    @property
+    def rect(self):
+        return _GEOMETRY.unpack(self._geometry)[10:14]
+
+    @property
+    def window_state(self):
+        show_cmd = _SHOW_CMD.unpack_from(self._geometry, 4)[0]
+        return 'Maximized' if show_cmd == SW_SHOWMAXIMIZED else 'Normal'
+
+    def __getitem__(self, key):
+        if key not in _KEY_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(KEYS)
+
+    def __len__(self):
+        return len(KEYS)
+
+    def __repr__(self):
+        return f"WindowRecord({self.to_dict()!r})"
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in KEYS}
+
+
+def _is_int_tuple(value, length):
+    return (isinstance(value, (list, tuple)) and len(value) == length
+            and all(type(item) is int for item in value))
+
+
+def _has_standard_shape(window):
+    if not isinstance(window, dict) or window.keys() != _KEY_SET:
+        return False
+    placement = window['placement']
+    if not (isinstance(placement, (list, tuple)) and len(placement) == 5
+            and type(placement[0]) is int and type(placement[1]) is int
+            and _is_int_tuple(placement[2], 2) and _is_int_tuple(placement[3], 2)
+            and _is_int_tuple(placement[4], 4) and _is_int_tuple(window['rect'], 4)):
+        return False
+    command_line = window['command_line']
+    if command_line is not None and not (isinstance(command_line, (list, tuple))
+                                         and all(type(arg) is str for arg in command_line)):
+        return False
+    # window_state is derived from the placement; only compact when they agree
+    expected = 'Maximized' if placement[1] == SW_SHOWMAXIMIZED else 'Normal'
+    return window['window_state'] == expected
+
+
+def compact_window(window):
+    """Return a WindowRecord for a capture-shaped window dict, else the window unchanged."""
+    if type(window) is WindowRecord:
+        return window
+    try:
+        if _has_standard_shape(window):
+            return WindowRecord(window)
+    except (struct.error, TypeError):
+        # Coordinates outside the 32-bit range
+        pass
+    return window
+
+
+def json_default(obj):
+    """`default=` hook so json.dumps can serialize WindowRecords."""
+    if type(obj) is WindowRecord:
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
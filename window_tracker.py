@@ -0,0 +1,115 @@
+"""Event-driven live window table.
+
+WindowTracker subscribes to the backend's window events (a WinEvent hook on
+Windows, scripted mutations on the simulated desktop). Events only mark the
+window as dirty; the next snapshot() re-reads just the dirty windows and
+updates the table, so capture cost follows the number of changes rather than
+the number of windows. Repeated events for one window (e.g. while it is
+being dragged) collapse into a single re-read.
+
+The first snapshot enumerates everything, and the table is rebuilt from a
+full enumeration every `resync_interval` seconds in case an event was missed.
+Exclusion rules are applied while reading windows, as in capture_windows, so
+excluded windows never cost process or placement lookups; the table only
+holds windows the current rules let through, and new rules force a full
+enumeration.
+"""
+import threading
+import time
+
+from exclusion_rules import compile_rules
+from perf_stats import stats
+from workspace_capture import CaptureCancelled, capture_window
+
+
+class WindowTracker:
+    def __init__(self, backend, process_cache=None, resync_interval=600.0, on_change=None):
+        self.backend = backend
+        self.process_cache = process_cache
+        self.resync_interval = resync_interval
+        self.on_change = on_change
+        self.table = {}  # hwnd -> window dict, touched only by snapshot()
+        self.events = 0
+        self.refreshed = 0
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = None
+        self._last_full = None
+        self._rules = None  # rules the table was built with
+
+    @property
+    def live(self):
+        return self._stop is not None
+
+    def start(self):
+        """Subscribe to window events; returns False if the backend can't report them."""
+        if self._stop is None:
+            self._stop = self.backend.watch_events(self.handle_event)
+        return self.live
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop()
+            self._stop = None
+
+    def handle_event(self, kind, hwnd):
+        """Backend callback; may run on the event thread."""
+        with self._lock:
+            self.events += 1
+            notify = not self._dirty
+            self._dirty.add(hwnd)
+        # Notify once per batch of changes, not once per event
+        if notify and self.on_change is not None:
+            self.on_change()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._dirty)
+
+    @stats.timed('capture.incremental')
+    def snapshot(self, excluded_processes=(), cancel_event=None):
+        """Bring the table up to date and return its windows, like capture_windows."""
+        process_cache = self.process_cache
+        get_process_info = process_cache.get if process_cache is not None else self.backend.get_process_info
+        get_process_name = process_cache.cached_name if process_cache is not None else None
+        rules = compile_rules(excluded_processes)
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+
+        now = time.monotonic()
+        full = (self._last_full is None or now - self._last_full >= self.resync_interval
+                or rules.rules != self._rules)
+        if full:
+            hwnds = self.backend.enum_windows()
+            table = {}
+        else:
+            hwnds = list(dirty)
+            table = self.table
+
+        try:
+            for position, hwnd in enumerate(hwnds):
+                if cancel_event is not None and cancel_event.is_set():
+                    if not full:
+                        # Leave the unprocessed windows for the next snapshot
+                        with self._lock:
+                            self._dirty.update(hwnds[position:])
+                    raise CaptureCancelled()
+                window = capture_window(self.backend, hwnd, get_process_info, rules, get_process_name)
+                if window is None:
+                    table.pop(hwnd, None)
+                else:
+                    table[hwnd] = window
+        finally:
+            if process_cache is not None:
+                process_cache.end_capture()
+        self.refreshed += len(hwnds)
+        stats.observe('capture.refreshed', len(hwnds))
+
+        if full:
+            self.table = table
+            self._last_full = now
+            self._rules = rules.rules
+        windows = list(self.table.values())
+        stats.observe('capture.windows', len(windows))
+        return windows
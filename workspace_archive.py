@@ -0,0 +1,217 @@
+"""Streaming export and import of workspace archives.
+
+An archive is a gzip-compressed JSON-lines file:
+
+    {"type": "header", "version": 1, "created": ..., "workspaces": N}
+    {"type": "record", "digest": ..., "window": {...}}
+    {"type": "workspace", "name": ..., "data": {..., "records": [...]}, "checksum": ...}
+    {"type": "settings", "data": {...}, "checksum": ...}
+    {"type": "end", "workspaces": N, "records": M}
+
+Each distinct window record is written once, just before the first
+workspace that references it, and workspaces refer to records by digest
+like the file store does. Both directions go workspace by workspace through
+generators, so only one snapshot (plus the table of record digests already
+seen) is in memory at a time: import hands each verified record to the
+store as soon as the workspace that first uses it arrives. The GUI runs
+them a slice at a time from a timer, the CLI runs them to completion.
+Imported snapshots form their own keyframe chain (see
+WorkspaceStore.separate_chain), so the next auto-save is unaffected.
+
+Integrity: a record is only accepted if its window hashes to its digest,
+workspace and settings entries carry a checksum of their data, and the end
+entry tells a complete archive from a truncated one. Import skips
+workspaces that already exist with the same windows, and reports (but never
+overwrites) existing workspaces of the same name with different windows.
+"""
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+
+from retention import is_pinned
+from window_record import json_default
+from workspace_store import window_digest, windows_fingerprint
+
+ARCHIVE_VERSION = 1
+
+
+class ArchiveError(Exception):
+    """Raised when a file is not a readable workspace archive."""
+
+
+def _canonical(obj):
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), default=json_default)
+
+
+def entry_checksum(data):
+    return hashlib.blake2b(_canonical(data).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def export_steps(store, path, names=None, settings=None):
+    """Write `names` (default: every workspace) and `settings` to `path`.
+
+    Yields (done, total) after each workspace. The archive is written to a
+    temporary file and renamed into place once complete.
+    """
+    names = sorted(store.names() if names is None else names)
+    temp_path = path + '.tmp'
+    written = set()
+    exported = 0
+    try:
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            def put(entry):
+                f.write(json.dumps(entry, separators=(',', ':'), default=json_default) + '\n')
+
+            put({'type': 'header', 'version': ARCHIVE_VERSION,
+                 'created': datetime.now().isoformat(timespec='seconds'), 'workspaces': len(names)})
+            for done, name in enumerate(names, 1):
+                workspace_data = store.get(name) if name in store else None
+                if workspace_data is not None:
+                    digests = []
+                    for window in workspace_data.get('windows', []):
+                        digest = window_digest(window)
+                        if digest not in written:
+                            written.add(digest)
+                            put({'type': 'record', 'digest': digest, 'window': window})
+                        digests.append(digest)
+                    data = {key: value for key, value in workspace_data.items() if key != 'windows'}
+                    data['records'] = digests
+                    put({'type': 'workspace', 'name': name, 'data': data, 'checksum': entry_checksum(data)})
+                    exported += 1
+                yield done, len(names)
+            if settings is not None:
+                put({'type': 'settings', 'data': settings, 'checksum': entry_checksum(settings)})
+            put({'type': 'end', 'workspaces': exported, 'records': len(written)})
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def read_archive(path):
+    """Yield the entries of an archive; raises ArchiveError if it can't be read."""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as e:
+                    raise ArchiveError(f"line {line_number}: {str(e)}")
+                if line_number == 1 and entry.get('type') != 'header':
+                    raise ArchiveError("not a workspace archive")
+                yield entry
+    except (OSError, EOFError, zlib.error) as e:
+        # Not gzip, or the compressed stream ends early
+        raise ArchiveError(str(e))
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = []
+        self.duplicates = 0
+        self.conflicts = []
+        self.corrupt = []
+        self.settings = None
+        self.complete = False
+        self.error = None
+
+    def summary(self):
+        text = f"Imported {len(self.imported)} workspaces"
+        if self.duplicates:
+            text += f", {self.duplicates} already present"
+        if self.conflicts:
+            text += f", {len(self.conflicts)} skipped (name taken)"
+        if self.corrupt:
+            text += f", {len(self.corrupt)} corrupt"
+        if self.error:
+            text += f" (stopped: {self.error})"
+        elif not self.complete:
+            text += " (archive truncated)"
+        return text
+
+
+def import_steps(store, path, result=None):
+    """Import an archive into `store`; yields (name, status) for each workspace.
+
+    status is 'imported', 'duplicate', 'conflict' or 'corrupt'. Counts and the
+    archive's settings (not applied) end up in `result`, an ImportResult.
+    """
+    result = result if result is not None else ImportResult()
+    pending = {}  # verified records not yet handed to the store
+    chain = {}
+    try:
+        for entry in read_archive(path):
+            kind = entry.get('type')
+            if kind == 'header':
+                if entry.get('version', 0) > ARCHIVE_VERSION:
+                    raise ArchiveError(f"archive version {entry.get('version')} is newer than this app")
+            elif kind == 'record':
+                window = entry.get('window')
+                digest = entry.get('digest')
+                if isinstance(window, dict) and window_digest(window) == digest:
+                    pending[digest] = window
+            elif kind == 'workspace':
+                if pending:
+                    store.put_records(list(pending.values()), list(pending))
+                    pending.clear()
+                name = entry.get('name')
+                with store.separate_chain(chain):
+                    status = _import_workspace(store, name, entry)
+                if status == 'imported':
+                    result.imported.append(name)
+                elif status == 'duplicate':
+                    result.duplicates += 1
+                elif status == 'conflict':
+                    result.conflicts.append(name)
+                else:
+                    result.corrupt.append(name)
+                yield name, status
+            elif kind == 'settings':
+                if entry_checksum(entry.get('data')) == entry.get('checksum'):
+                    result.settings = entry['data']
+            elif kind == 'end':
+                result.complete = True
+    except ArchiveError as e:
+        result.error = str(e)
+        print(f"Error importing {path}: {str(e)}")
+
+
+def _import_workspace(store, name, entry):
+    data = entry.get('data')
+    if not name or not isinstance(data, dict) or entry_checksum(data) != entry.get('checksum'):
+        return 'corrupt'
+    windows = store.get_records(data.get('records', []))
+    if any(window is None for window in windows):
+        return 'corrupt'
+    if name in store:
+        existing = store.info(name) or {}
+        return 'duplicate' if existing.get('fingerprint') == windows_fingerprint(windows) else 'conflict'
+    workspace_data = {key: value for key, value in data.items() if key != 'records'}
+    workspace_data['windows'] = windows
+    # Auto-saves can be stored as deltas; pinned saves are always kept whole
+    store.save(name, workspace_data, incremental=not is_pinned(data))
+    if name not in store:
+        # Skipped as identical to the snapshot saved just before it
+        store.save(name, workspace_data)
+    return 'imported'
+
+
+def export_archive(store, path, names=None, settings=None):
+    """Export in one go; returns the number of workspaces processed."""
+    done = 0
+    for done, _ in export_steps(store, path, names, settings):
+        pass
+    return done
+
+
+def import_archive(store, path):
+    """Import in one go; returns an ImportResult."""
+    result = ImportResult()
+    for _ in import_steps(store, path, result):
+        pass
+    return result
@@ -0,0 +1,110 @@
+"""Qt-free window capture shared by the GUI and tooling."""
+from datetime import datetime
+
+from exclusion_rules import compile_rules
+from perf_stats import stats
+from window_backend import SW_SHOWMAXIMIZED
+
+OWN_WINDOW_TITLE = "Workspace Manager"
+
+
+class CaptureCancelled(Exception):
+    """Raised when a capture is abandoned through its cancel event."""
+
+
+def capture_window(backend, hwnd, get_process_info, excluded_processes=(), get_process_name=None):
+    """Return the window dict for one handle, or None if it isn't captured.
+
+    `excluded_processes` is an ExclusionRules or a collection of rules. Title
+    rules, and name rules for pids `get_process_name(pid)` already knows, are
+    applied before the process metadata is read.
+    """
+    rules = compile_rules(excluded_processes)
+    try:
+        if not backend.is_window_visible(hwnd):
+            return None
+        window_text = backend.get_window_text(hwnd)
+    except Exception:
+        # Window was destroyed while we were enumerating
+        return None
+    if not window_text or window_text == OWN_WINDOW_TITLE:
+        return None
+    if rules and rules.excludes_title(window_text):
+        stats.count('capture.excluded_early')
+        return None
+    try:
+        pid = backend.get_window_pid(hwnd)
+        if rules and get_process_name is not None and rules.excludes_name(get_process_name(pid)):
+            stats.count('capture.excluded_early')
+            return None
+        process = get_process_info(pid)
+
+        # Skip excluded processes
+        if rules and rules.excludes(process['name'], process['exe']):
+            stats.count('capture.excluded')
+            return None
+
+        placement = backend.get_window_placement(hwnd)
+        rect = backend.get_window_rect(hwnd)
+
+        return {
+            'title': window_text,
+            'process_name': process['name'],
+            'exe': process['exe'],
+            'placement': placement,
+            'rect': rect,
+            'pid': pid,
+            'command_line': process['command_line'],
+            'creation_time': process['creation_time'],
+            'status': process['status'],
+            'window_state': 'Maximized' if placement[1] == SW_SHOWMAXIMIZED else 'Normal'
+        }
+    except Exception as e:
+        stats.count(f"capture.errors.{type(e).__name__}")
+        print(f"Error processing window {window_text}: {str(e)}")
+        return None
+
+
+@stats.timed('capture.full')
+def capture_windows(backend, excluded_processes=(), process_cache=None, cancel_event=None):
+    """Return the list of window dicts for every visible, titled window.
+
+    When a ProcessMetadataCache is given, process metadata is served from it
+    instead of querying the backend for every window. Setting `cancel_event`
+    (a threading.Event) aborts the capture with CaptureCancelled.
+    """
+    get_process_info = process_cache.get if process_cache is not None else backend.get_process_info
+    get_process_name = process_cache.cached_name if process_cache is not None else None
+    rules = compile_rules(excluded_processes)
+    windows = []
+    try:
+        for hwnd in backend.enum_windows():
+            if cancel_event is not None and cancel_event.is_set():
+                raise CaptureCancelled()
+            window = capture_window(backend, hwnd, get_process_info, rules, get_process_name)
+            if window is not None:
+                windows.append(window)
+    finally:
+        # Also after a cancelled capture, so its pid keys don't leak into the next one
+        if process_cache is not None:
+            process_cache.end_capture()
+    stats.observe('capture.windows', len(windows))
+    return windows
+
+
+def build_workspace(windows, captured_at=None, pinned=False):
+    """Return (workspace name, workspace data) for a captured window list.
+
+    Manual saves are pinned so the retention policy never thins them; auto-saves
+    are marked unpinned explicitly, as snapshots without the flag are kept.
+    """
+    captured_at = captured_at or datetime.now()
+    timestamp = captured_at.strftime("%Y%m%d_%H%M%S")
+    workspace_data = {
+        'timestamp': timestamp,
+        'windows': windows,
+        'save_time': captured_at.strftime("%Y-%m-%d %I:%M:%S %p"),
+        'window_count': len(windows),
+        'pinned': pinned
+    }
+    return f"Workspace_{timestamp}", workspace_data
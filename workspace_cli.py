@@ -0,0 +1,306 @@
+"""Headless command-line interface for saving and restoring workspaces.
+
+Shares capture, storage, retention and restore with the GUI but never
+imports PyQt6; every command imports only the modules it needs.
+
+    python workspace_cli.py save
+    python workspace_cli.py list --search chrome --limit 10
+    python workspace_cli.py show Workspace_20250101_120000
+    python workspace_cli.py diff Workspace_20250101_120000 Workspace_20250102_120000
+    python workspace_cli.py restore Workspace_20250101_120000
+    python workspace_cli.py delete Workspace_20250101_120000
+    python workspace_cli.py prune --dry-run
+    python workspace_cli.py timeline "2025-01-01 12:00" ["2025-01-01 18:00"]
+    python workspace_cli.py export backup.wsa.gz
+    python workspace_cli.py import backup.wsa.gz --settings
+"""
+import argparse
+import os
+import sys
+
+DEFAULT_WORKSPACE_DIR = "saved_workspaces"
+
+
+def _open_store(args):
+    from workspace_store import open_store
+    store = open_store(args.dir, args.storage)
+    store.load_all()
+    return store
+
+
+def _create_backend(args):
+    from window_backend import create_backend
+    return create_backend(args.backend)
+
+
+def _settings(store):
+    try:
+        return store.load_settings() or {}
+    except Exception as e:
+        print(f"Error loading settings: {str(e)}", file=sys.stderr)
+        return {}
+
+
+def _format_size(size):
+    return f"{size / 1024:.1f} KB" if size < 1024 * 1024 else f"{size / 1024 / 1024:.1f} MB"
+
+
+def cmd_save(args, store):
+    from workspace_capture import capture_windows, build_workspace
+    backend = _create_backend(args)
+    excluded = set(_settings(store).get('excluded_processes', []))
+    windows = capture_windows(backend, excluded)
+    workspace_name, workspace_data = build_workspace(windows, pinned=not args.auto)
+    if not store.save(workspace_name, workspace_data, incremental=args.auto):
+        print("No windows changed since the last snapshot; nothing saved")
+        return 0
+    print(f"Saved {len(windows)} windows to {workspace_name}")
+    return 0
+
+
+def cmd_list(args, store):
+    names = sorted(store.names(), reverse=True)
+    if args.search:
+        from search_index import WorkspaceSearchIndex
+        index = WorkspaceSearchIndex()
+        index.build(store)
+        matches = index.search(args.search)
+        names = [name for name in names if name in matches]
+    if args.limit:
+        names = names[:args.limit]
+    from retention import is_pinned
+    for name in names:
+        entry = store.info(name)
+        pin = " (pinned)" if is_pinned(entry) else ""
+        print(f"{name}  {entry.get('save_time') or '':<22}  {entry.get('window_count', 0):>4} windows{pin}")
+    return 0
+
+
+def cmd_show(args, store):
+    workspace_data = store.get(args.name) if args.name in store else None
+    if workspace_data is None:
+        print(f"Unknown workspace: {args.name}", file=sys.stderr)
+        return 1
+    if args.json:
+        import json
+        from window_record import json_default
+        print(json.dumps(workspace_data, indent=2, default=json_default))
+        return 0
+    print(f"{args.name}  saved {workspace_data.get('save_time')}")
+    for window in workspace_data.get('windows', []):
+        print(f"  {window.get('title', 'Unknown Window')} ({window.get('process_name', 'Unknown Process')}) "
+              f"[{window.get('window_state', 'Normal')}]")
+    return 0
+
+
+def cmd_restore(args, store):
+    import threading
+    from restore_engine import RestoreEngine
+    workspace_data = store.get(args.name) if args.name in store else None
+    if workspace_data is None:
+        print(f"Unknown workspace: {args.name}", file=sys.stderr)
+        return 1
+
+    def progress(done, total, message):
+        print(f"Restoring {done}/{total}: {message}")
+
+    engine = RestoreEngine(_create_backend(args), workspace_data['windows'],
+                           timeout=args.timeout, progress=progress, skip_in_place=not args.all)
+    outcome = {}
+    worker = threading.Thread(target=lambda: outcome.setdefault('result', engine.run()))
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.2)
+    except KeyboardInterrupt:
+        # Ctrl+C cancels the restore instead of killing it mid-placement
+        engine.cancel()
+        worker.join()
+    result = outcome.get('result')
+    if result is None:
+        return 1
+    print(f"{result.summary()} in {result.elapsed:.1f}s")
+    return 0 if not result.missing and not result.cancelled else 1
+
+
+def cmd_diff(args, store):
+    from workspace_diff import diff_windows
+    for name in filter(None, (args.old, args.new)):
+        if name not in store:
+            print(f"Unknown workspace: {name}", file=sys.stderr)
+            return 1
+    if args.new:
+        before = store.get(args.old)['windows']
+        after = store.get(args.new)['windows']
+    else:
+        # Without a second workspace, compare the current desktop to the snapshot
+        from workspace_capture import capture_windows
+        excluded = set(_settings(store).get('excluded_processes', []))
+        before = capture_windows(_create_backend(args), excluded)
+        after = store.get(args.old)['windows']
+    for line in diff_windows(before, after).lines():
+        print(line)
+    return 0
+
+
+def cmd_delete(args, store):
+    status = 0
+    freed = 0
+    for name in args.names:
+        if name not in store:
+            print(f"Unknown workspace: {name}", file=sys.stderr)
+            status = 1
+            continue
+        freed += store.delete(name)
+        print(f"Deleted {name}")
+    if freed:
+        print(f"Reclaimed {_format_size(freed)}")
+    return status
+
+
+def cmd_prune(args, store):
+    from retention import RetentionPolicy, expired_workspaces
+    settings = _settings(store)
+    policy = RetentionPolicy.from_settings(settings.get('retention'))
+    expired = expired_workspaces(store, policy)
+    if args.dry_run:
+        for name in expired:
+            print(f"Would delete {name}")
+        print(f"{len(expired)} of {len(store)} workspaces would be deleted")
+        return 0
+    freed = 0
+    for name in expired:
+        freed += store.delete(name)
+    freed += store.collect(force=True)
+    print(f"Deleted {len(expired)} workspaces, reclaimed {_format_size(freed)}")
+    return 0
+
+
+def cmd_timeline(args, store):
+    from datetime import datetime
+    from timeline_index import TimelineIndex
+    try:
+        start = datetime.fromisoformat(args.start)
+        end = datetime.fromisoformat(args.end) if args.end else None
+    except ValueError as e:
+        print(f"Invalid time: {str(e)}", file=sys.stderr)
+        return 1
+    timeline = TimelineIndex(store)
+    if end is None:
+        snapshot = timeline.snapshot_at(start)
+        if snapshot is None:
+            print("No snapshot before this time")
+            return 0
+        keys = timeline.open_at(start)
+        print(f"{len(keys)} windows open (as of {snapshot})")
+        for process, title in sorted(keys):
+            print(f"  {title} ({process})")
+        return 0
+    lifetimes = timeline.lifetimes_between(start, end)
+    print(f"{len(lifetimes)} windows open between {start} and {end}")
+    for (process, title), runs in sorted(lifetimes.items(), key=lambda item: item[1][0][0]):
+        spans = ", ".join(f"{first:%Y-%m-%d %H:%M:%S} - {last:%Y-%m-%d %H:%M:%S}" for first, last in runs)
+        print(f"  {title} ({process}): {spans}")
+    return 0
+
+
+def cmd_export(args, store):
+    from workspace_archive import export_archive
+    for name in args.names:
+        if name not in store:
+            print(f"Unknown workspace: {name}", file=sys.stderr)
+            return 1
+    count = export_archive(store, args.path, args.names or None, _settings(store))
+    print(f"Exported {count} workspaces to {args.path} ({_format_size(os.path.getsize(args.path))})")
+    return 0
+
+
+def cmd_import(args, store):
+    from workspace_archive import import_archive
+    if not os.path.exists(args.path):
+        print(f"No such archive: {args.path}", file=sys.stderr)
+        return 1
+    result = import_archive(store, args.path)
+    if args.settings and result.settings is not None:
+        store.save_settings(result.settings)
+        print("Imported settings")
+    for name in result.conflicts:
+        print(f"Skipped {name}: a different workspace with that name exists", file=sys.stderr)
+    for name in result.corrupt:
+        print(f"Skipped {name}: checksum mismatch", file=sys.stderr)
+    print(result.summary())
+    return 0 if result.complete and not result.error and not result.corrupt else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="workspace_cli", description="Headless Workspace Manager")
+    parser.add_argument('--dir', default=DEFAULT_WORKSPACE_DIR, help="workspace directory")
+    parser.add_argument('--storage', default=os.environ.get('WORKSPACE_MANAGER_STORAGE', 'files'),
+                        choices=('files', 'sqlite'))
+    parser.add_argument('--backend', default=os.environ.get('WORKSPACE_MANAGER_BACKEND', 'win32'),
+                        choices=('win32', 'simulated'))
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    save = commands.add_parser('save', help="capture the current windows")
+    save.add_argument('--auto', action='store_true',
+                      help="save like an auto-save: skip if unchanged and don't pin")
+    save.set_defaults(handler=cmd_save)
+
+    list_ = commands.add_parser('list', help="list saved workspaces, newest first")
+    list_.add_argument('--search', help="only workspaces with a matching title, process or path")
+    list_.add_argument('--limit', type=int)
+    list_.set_defaults(handler=cmd_list)
+
+    show = commands.add_parser('show', help="show the windows of a workspace")
+    show.add_argument('name')
+    show.add_argument('--json', action='store_true')
+    show.set_defaults(handler=cmd_show)
+
+    restore = commands.add_parser('restore', help="restore a workspace")
+    restore.add_argument('name')
+    restore.add_argument('--timeout', type=float, default=30.0)
+    restore.add_argument('--all', action='store_true',
+                         help="place every window, even those already in place")
+    restore.set_defaults(handler=cmd_restore)
+
+    diff = commands.add_parser('diff', help="compare two workspaces, or one with the current desktop")
+    diff.add_argument('old')
+    diff.add_argument('new', nargs='?')
+    diff.set_defaults(handler=cmd_diff)
+
+    delete = commands.add_parser('delete', help="delete workspaces")
+    delete.add_argument('names', nargs='+')
+    delete.set_defaults(handler=cmd_delete)
+
+    prune = commands.add_parser('prune', help="apply the retention policy now")
+    prune.add_argument('--dry-run', action='store_true')
+    prune.set_defaults(handler=cmd_prune)
+
+    timeline = commands.add_parser('timeline', help="show the windows open at a time, or during a range")
+    timeline.add_argument('start', help="ISO date and time, e.g. '2025-01-01 12:00'")
+    timeline.add_argument('end', nargs='?')
+    timeline.set_defaults(handler=cmd_timeline)
+
+    export = commands.add_parser('export', help="write workspaces and settings to an archive")
+    export.add_argument('path')
+    export.add_argument('names', nargs='*', help="workspaces to export (default: all)")
+    export.set_defaults(handler=cmd_export)
+
+    import_ = commands.add_parser('import', help="add the workspaces of an archive")
+    import_.add_argument('path')
+    import_.add_argument('--settings', action='store_true', help="also replace the settings")
+    import_.set_defaults(handler=cmd_import)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    store = _open_store(args)
+    try:
+        return args.handler(args, store)
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Compare two window lists (snapshots or the live desktop) in linear time.
+
+Windows are paired by hashing their identity in three passes, each pass only
+looking at windows the previous ones left unpaired:
+
+1. same process instance (exe, pid, process start time) and same title
+2. same process instance, any title - the window was retitled
+3. same exe and title in a different process instance - the application
+   was restarted since the first snapshot
+
+Within a pass, windows with equal keys are paired in order. Whatever is
+left is reported as added or removed. Paired windows whose show state or
+normal rect differ are reported as moved.
+"""
+from collections import deque
+
+from perf_stats import stats
+
+
+def _process(window):
+    return (window.get('exe') or window.get('process_name') or '').lower()
+
+
+def window_identity(window):
+    """Key for the process instance that owns a window."""
+    return (_process(window), window.get('pid'), window.get('creation_time'))
+
+
+def window_geometry(window):
+    """What a restore sets: the show command and the normal rect."""
+    placement = window.get('placement')
+    if not placement or len(placement) < 5:
+        return None
+    return (placement[1], tuple(placement[4]))
+
+
+_PASSES = (
+    lambda window: (window_identity(window), window.get('title')),
+    window_identity,
+    lambda window: (_process(window), window.get('title')),
+)
+
+
+def _pair(before, after, key):
+    """Pair windows with equal keys; returns (pairs, unpaired before, unpaired after)."""
+    buckets = {}
+    for window in before:
+        buckets.setdefault(key(window), deque()).append(window)
+    pairs = []
+    unpaired_after = []
+    for window in after:
+        bucket = buckets.get(key(window))
+        if bucket:
+            pairs.append((bucket.popleft(), window))
+        else:
+            unpaired_after.append(window)
+    unpaired_before = [window for bucket in buckets.values() for window in bucket]
+    return pairs, unpaired_before, unpaired_after
+
+
+class WindowDiff:
+    """Changes from one window list to another.
+
+    added and removed are windows; matched, moved, retitled and unchanged
+    are (before, after) pairs. A pair can be both moved and retitled.
+    """
+
+    def __init__(self, added, removed, matched):
+        self.added = added
+        self.removed = removed
+        self.matched = matched
+        self.moved = []
+        self.retitled = []
+        self.unchanged = []
+        for before, after in matched:
+            moved = window_geometry(before) != window_geometry(after)
+            retitled = before.get('title') != after.get('title')
+            if moved:
+                self.moved.append((before, after))
+            if retitled:
+                self.retitled.append((before, after))
+            if not moved and not retitled:
+                self.unchanged.append((before, after))
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.moved or self.retitled)
+
+    def in_place(self):
+        """Pairs whose geometry already matches, retitled or not."""
+        return [(before, after) for before, after in self.matched
+                if window_geometry(before) == window_geometry(after)]
+
+    def summary(self):
+        if not self:
+            return "No differences"
+        parts = []
+        for label, items in (("added", self.added), ("removed", self.removed),
+                             ("moved", self.moved), ("retitled", self.retitled)):
+            if items:
+                parts.append(f"{len(items)} {label}")
+        return ", ".join(parts) + f", {len(self.unchanged)} unchanged"
+
+    def lines(self):
+        """Human-readable report, one change per line."""
+        def label(window):
+            return f"{window.get('title', 'Unknown Window')} ({window.get('process_name', 'Unknown Process')})"
+
+        lines = [self.summary()]
+        lines.extend(f"+ {label(window)}" for window in self.added)
+        lines.extend(f"- {label(window)}" for window in self.removed)
+        for before, after in self.moved:
+            old, new = window_geometry(before), window_geometry(after)
+            lines.append(f"~ {label(after)}: {old[1] if old else '?'} -> {new[1] if new else '?'}")
+        for before, after in self.retitled:
+            lines.append(f"* {before.get('title')!r} -> {after.get('title')!r} ({after.get('process_name')})")
+        return lines
+
+
+@stats.timed('diff')
+def diff_windows(before, after):
+    """Diff two window lists; both may be snapshots or captures of the live desktop."""
+    matched = []
+    before, after = list(before), list(after)
+    for key in _PASSES:
+        if not before or not after:
+            break
+        pairs, before, after = _pair(before, after, key)
+        matched.extend(pairs)
+    return WindowDiff(after, before, matched)
+
+
+def diff_workspaces(store, old_name, new_name):
+    """Diff two saved workspaces; returns None if either is missing."""
+    old = store.get(old_name) if old_name in store else None
+    new = store.get(new_name) if new_name in store else None
+    if old is None or new is None:
+        return None
+    return diff_windows(old.get('windows', []), new.get('windows', []))
@@ -1,37 +1,87 @@
-from datetime import datetime
+import argparse
 import os
-import json
 import sys
-import win32gui
-import win32process
-import win32con
-import psutil
+import time
+from datetime import datetime
+from window_backend import create_backend
+from process_cache import ProcessMetadataCache, ProcessCatalog
+from exclusion_rules import rule_error
+from workspace_capture import capture_windows, build_workspace
+from workspace_diff import diff_windows, diff_workspaces
+from workspace_archive import export_steps, import_steps, ImportResult
+from workspace_store import open_store
+from workspace_model import WorkspaceTreeModel
+from capture_worker import WindowCapturer
+from window_tracker import WindowTracker
+from restore_worker import WorkspaceRestorer
+from search_index import WorkspaceSearchIndex, date_filter_range, parse_save_time
+from timeline_index import TimelineIndex
+from usage_analytics import UsageAnalytics, day_date, day_number
+from analytics_worker import AnalyticsWorker
+from retention import RetentionPolicy, Compactor, expired_workspaces, DAY
+from autosave_scheduler import AutoSaveScheduler
+from perf_stats import stats
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                            QHBoxLayout, QTreeWidget, QTreeWidgetItem, QPushButton, QLabel, 
+                            QHBoxLayout, QTreeView, QPushButton, QLabel, 
                             QSpinBox, QSystemTrayIcon, QMenu, QStyle, 
                             QScrollArea, QStyleFactory,
-                            QDialog, QCheckBox, QComboBox, QLineEdit, QGroupBox, QListWidget)
-from PyQt6.QtCore import QTimer, Qt, pyqtSlot
+                            QDialog, QCheckBox, QComboBox, QLineEdit, QGroupBox, QListWidget,
+                            QPlainTextEdit, QFileDialog, QDateTimeEdit)
+from PyQt6.QtCore import QTimer, Qt, QDateTime, pyqtSignal, pyqtSlot
 from PyQt6.QtGui import QIcon, QPalette, QColor, QFont
 
+# Seconds to let a burst of window changes settle before auto-saving
+CHANGE_SETTLE_SECONDS = 2
+
 class WorkspaceManager(QMainWindow):
-    def __init__(self):
+    windows_changed = pyqtSignal()
+
+    def __init__(self, backend=None, storage="files"):
         super().__init__()
         self.setWindowTitle("Workspace Manager")
         self.setGeometry(100, 100, 1000, 700)
         
         # Initialize variables
-        self.workspaces = {}
         self.save_interval = 30  # seconds
         self.workspace_dir = "saved_workspaces"
         self.current_workspace = None
         self.excluded_processes = set()
+        self.search_index = WorkspaceSearchIndex()
+        self.active_filter = None  # (text, date range) while a filter is applied
+        self.filter_matches = set()
         self.show_notifications = True  # New notification control
         self.auto_save_enabled = True   # New auto-save control
+        self.retention_enabled = True
+        self.retention_policy = RetentionPolicy()
+        self.backend = backend or create_backend()
+        self.process_cache = ProcessMetadataCache(self.backend)
+        # Kept fresh in the background for the process dialog and early exclusion
+        self.process_catalog = ProcessCatalog(self.backend)
+        self.process_cache.catalog = self.process_catalog
+        self.process_catalog.start()
+        stats.register_source('process_cache', self.process_cache.stats)
+        # Emitted from the backend's event thread; delivered on the GUI thread
+        self.tracker = WindowTracker(self.backend, self.process_cache, on_change=self.windows_changed.emit)
+        self.capturer = WindowCapturer(self.backend, self.process_cache, self, tracker=self.tracker)
+        self.capturer.captured.connect(self.save_captured_workspace)
+        self.capturer.failed.connect(lambda error: print(f"Error capturing windows: {error}"))
+        self.restorer = WorkspaceRestorer(self.backend, self)
+        self.restorer.progress.connect(self.restore_progress)
+        self.restorer.finished.connect(self.restore_finished)
+        self.restorer.failed.connect(self.restore_failed)
         
-        # Create workspace directory if it doesn't exist
-        if not os.path.exists(self.workspace_dir):
-            os.makedirs(self.workspace_dir)
+        # Snapshot, delete and settings writes happen on a background thread
+        self.store = open_store(self.workspace_dir, storage, write_behind=True)
+        # Built from the manifest the first time the timeline is opened
+        self.timeline = TimelineIndex(self.store)
+        # Kept in their own file, loaded and saved on a worker thread;
+        # snapshots saved since it was written are read back in the background
+        self.analytics = UsageAnalytics(self.workspace_dir)
+        self.analytics_ready = False
+        self.analytics_worker = AnalyticsWorker(self.analytics, self)
+        self.analytics_worker.loaded.connect(self.analytics_loaded)
+        self.analytics_worker.failed.connect(print)
+        self.analytics_worker.load()
         
         # Load settings
         self.load_settings()
@@ -45,11 +95,48 @@ class WorkspaceManager(QMainWindow):
         # Setup UI
         self.init_ui()
         
-        # Setup auto-save timer
+        # Setup auto-save: with live window events, save once changes settle
+        # (at most once per interval); otherwise poll. The scheduler adapts the
+        # interval to how often saves find changes and defers them under load
+        self.autosave = AutoSaveScheduler(self.save_interval)
+        stats.register_source('autosave', self.autosave.stats)
         self.timer = QTimer()
         self.timer.timeout.connect(self.auto_save_workspace)
+        self.change_timer = QTimer(self)
+        self.change_timer.setSingleShot(True)
+        self.change_timer.timeout.connect(self.auto_save_workspace)
+        self.last_auto_save = None
+        self.windows_changed.connect(self.on_windows_changed)
+        self.tracker.start()
         if self.auto_save_enabled:
-            self.timer.start(self.save_interval * 1000)
+            self.start_auto_save()
+        
+        # Setup retention: check the policy every few minutes, then delete
+        # expired auto-saves in short slices while the app is otherwise idle
+        self.compactor = Compactor(self.remove_workspace)
+        self.retention_timer = QTimer(self)
+        self.retention_timer.timeout.connect(self.enforce_retention)
+        self.retention_timer.start(10 * 60 * 1000)
+        self.compaction_timer = QTimer(self)
+        self.compaction_timer.setInterval(100)
+        self.compaction_timer.timeout.connect(self.compact_step)
+        QTimer.singleShot(30 * 1000, self.enforce_retention)
+        
+        # Archive export and import run a few workspaces per timer tick
+        self.archive_job = None
+        self.archive_timer = QTimer(self)
+        self.archive_timer.timeout.connect(self.archive_step)
+        
+        # Analytics catch up on unread snapshots in short slices, then follow
+        # saves as they happen; written out every half hour and on exit
+        self.analytics_job = None
+        self.analytics_pending = False
+        self.analytics_timer = QTimer(self)
+        self.analytics_timer.setInterval(50)
+        self.analytics_timer.timeout.connect(self.analytics_step)
+        self.analytics_save_timer = QTimer(self)
+        self.analytics_save_timer.timeout.connect(self.save_analytics)
+        self.analytics_save_timer.start(30 * 60 * 1000)
         
         # Setup system tray
         self.setup_system_tray()
@@ -93,20 +180,20 @@ class WorkspaceManager(QMainWindow):
             QPushButton:pressed {
                 background-color: #1a72ca;
             }
-            QTreeWidget {
+            QTreeView {
                 background-color: #252525;
                 border: 1px solid #404040;
                 border-radius: 4px;
                 padding: 5px;
             }
-            QTreeWidget::item {
+            QTreeView::item {
                 background-color: #353535;
                 border: 1px solid #404040;
                 border-radius: 4px;
                 padding: 8px;
                 margin: 2px;
             }
-            QTreeWidget::item:selected {
+            QTreeView::item:selected {
                 background-color: #2a82da;
                 color: white;
             }
@@ -137,7 +224,12 @@ class WorkspaceManager(QMainWindow):
         
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Search workspaces...")
-        self.search_input.textChanged.connect(self.apply_filter)
+        # Filter once typing pauses instead of on every keystroke
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.search_input.textChanged.connect(self.filter_timer.start)
         
         filter_layout.addWidget(QLabel("Filter:"))
         filter_layout.addWidget(self.filter_combo)
@@ -151,11 +243,15 @@ class WorkspaceManager(QMainWindow):
         left_panel = QWidget()
         left_layout = QVBoxLayout()
         
-        # Workspace Tree Widget instead of List
-        self.workspace_tree = QTreeWidget()
-        self.workspace_tree.setHeaderLabels(["Workspaces"])
+        # Workspace tree backed by a lazily populated model
+        self.workspace_model = WorkspaceTreeModel(self.store, self)
+        self.workspace_tree = QTreeView()
+        self.workspace_tree.setModel(self.workspace_model)
+        self.workspace_tree.setUniformRowHeights(True)
         self.workspace_tree.setExpandsOnDoubleClick(True)
-        self.workspace_tree.itemClicked.connect(self.workspace_selected)
+        # Ctrl+click a second workspace to compare the two
+        self.workspace_tree.setSelectionMode(QTreeView.SelectionMode.ExtendedSelection)
+        self.workspace_tree.clicked.connect(self.workspace_selected)
         left_layout.addWidget(self.workspace_tree)
         
         # Buttons
@@ -166,14 +262,36 @@ class WorkspaceManager(QMainWindow):
         save_button.clicked.connect(self.save_current_workspace)
         button_layout.addWidget(save_button)
         
-        restore_button = QPushButton("Restore")
-        restore_button.clicked.connect(self.restore_workspace)
+        self.restore_button = QPushButton("Restore")
+        self.restore_button.clicked.connect(self.restore_workspace)
         delete_button = QPushButton("Delete")
         delete_button.clicked.connect(self.delete_workspace)
-        button_layout.addWidget(restore_button)
+        compare_button = QPushButton("Compare")
+        compare_button.setToolTip("Compare two selected workspaces, or one with the current desktop")
+        compare_button.clicked.connect(self.compare_workspaces)
+        button_layout.addWidget(self.restore_button)
+        button_layout.addWidget(compare_button)
         button_layout.addWidget(delete_button)
         left_layout.addLayout(button_layout)
         
+        archive_layout = QHBoxLayout()
+        export_button = QPushButton("Export...")
+        export_button.setToolTip("Export the selected workspaces (or all of them) and settings to an archive")
+        export_button.clicked.connect(self.export_workspaces)
+        import_button = QPushButton("Import...")
+        import_button.clicked.connect(self.import_workspaces)
+        timeline_button = QPushButton("Timeline...")
+        timeline_button.setToolTip("Show which windows were open at a given time")
+        timeline_button.clicked.connect(self.show_timeline)
+        archive_layout.addWidget(export_button)
+        archive_layout.addWidget(import_button)
+        analytics_button = QPushButton("Analytics...")
+        analytics_button.setToolTip("Show time spent per application and the most used window layouts")
+        analytics_button.clicked.connect(self.show_analytics)
+        archive_layout.addWidget(timeline_button)
+        archive_layout.addWidget(analytics_button)
+        left_layout.addLayout(archive_layout)
+        
         left_panel.setLayout(left_layout)
         
         # Right panel (settings)
@@ -206,6 +324,20 @@ class WorkspaceManager(QMainWindow):
         interval_layout.addWidget(self.interval_spinbox)
         settings_layout.addLayout(interval_layout)
         
+        # Retention of old auto-saves (manual saves are always kept)
+        self.retention_checkbox = QCheckBox("Thin Old Auto-Saves")
+        self.retention_checkbox.setToolTip("Keep everything from the last hour, hourly saves for a day "
+                                           "and daily saves for a month. Manual saves are never removed.")
+        self.retention_checkbox.setChecked(self.retention_enabled)
+        self.retention_checkbox.stateChanged.connect(self.toggle_retention)
+        settings_layout.addWidget(self.retention_checkbox)
+        oldest_days = self.retention_policy.tiers[-1][0] // DAY
+        self.delete_older_checkbox = QCheckBox(f"Delete Auto-Saves Older Than {oldest_days} Days")
+        self.delete_older_checkbox.setToolTip("Otherwise the daily auto-saves are kept indefinitely")
+        self.delete_older_checkbox.setChecked(not self.retention_policy.keep_older)
+        self.delete_older_checkbox.stateChanged.connect(self.toggle_delete_older)
+        settings_layout.addWidget(self.delete_older_checkbox)
+        
         # Process manager button
         process_manager_button = QPushButton("Process Manager")
         process_manager_button.clicked.connect(self.show_process_manager)
@@ -213,6 +345,27 @@ class WorkspaceManager(QMainWindow):
         
         settings_group.setLayout(settings_layout)
         right_layout.addWidget(settings_group)
+        
+        # Performance stats
+        stats_group = QGroupBox("Performance")
+        stats_layout = QVBoxLayout()
+        self.stats_view = QPlainTextEdit()
+        self.stats_view.setReadOnly(True)
+        self.stats_view.setFont(QFont("Consolas", 8))
+        stats_layout.addWidget(self.stats_view)
+        stats_buttons = QHBoxLayout()
+        export_stats_button = QPushButton("Export Stats")
+        export_stats_button.clicked.connect(self.export_stats)
+        reset_stats_button = QPushButton("Reset")
+        reset_stats_button.clicked.connect(self.reset_stats)
+        stats_buttons.addWidget(export_stats_button)
+        stats_buttons.addWidget(reset_stats_button)
+        stats_layout.addLayout(stats_buttons)
+        stats_group.setLayout(stats_layout)
+        right_layout.addWidget(stats_group)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+        self.stats_timer.start(2000)
         right_panel.setLayout(right_layout)
         
         # Add panels to split layout
@@ -258,62 +411,55 @@ class WorkspaceManager(QMainWindow):
             self.activateWindow()
 
     def quit_application(self):
+        self.timer.stop()
+        self.change_timer.stop()
+        self.stats_timer.stop()
+        self.tracker.stop()
+        self.process_catalog.stop()
+        self.retention_timer.stop()
+        self.compaction_timer.stop()
+        self.archive_timer.stop()
+        if self.archive_job:
+            # Close the generator so an unfinished export removes its temp file
+            self.archive_job[1].close()
+        self.analytics_timer.stop()
+        self.analytics_save_timer.stop()
+        if self.analytics_job:
+            # Everything ingested so far is consistent; the rest is read next time
+            self.analytics_job.close()
+            self.analytics_job = None
+        self.save_analytics()
+        self.analytics_worker.shutdown()
+        self.capturer.shutdown()
+        self.restorer.shutdown()
+        self.store.close()
         QApplication.quit()
 
     def get_window_info(self):
-        windows = []
-        def enum_windows_callback(hwnd, _):
-            if win32gui.IsWindowVisible(hwnd):
-                window_text = win32gui.GetWindowText(hwnd)
-                if window_text and window_text != "Workspace Manager":
-                    try:
-                        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                        process = psutil.Process(pid)
-                        
-                        # Skip excluded processes
-                        if process.name() in self.excluded_processes:
-                            return True
-                        
-                        placement = win32gui.GetWindowPlacement(hwnd)
-                        rect = win32gui.GetWindowRect(hwnd)
-                        
-                        windows.append({
-                            'title': window_text,
-                            'process_name': process.name(),
-                            'exe': process.exe(),
-                            'placement': placement,
-                            'rect': rect,
-                            'pid': pid,
-                            'command_line': process.cmdline(),
-                            'creation_time': process.create_time(),
-                            'status': process.status(),
-                            'window_state': 'Maximized' if placement[1] == win32con.SW_SHOWMAXIMIZED else 'Normal'
-                        })
-                    except (psutil.NoSuchProcess, psutil.AccessDenied, Exception) as e:
-                        print(f"Error processing window {window_text}: {str(e)}")
-            return True
-        
-        win32gui.EnumWindows(enum_windows_callback, None)
-        return windows
-
-    def save_current_workspace(self):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        workspace_name = f"Workspace_{timestamp}"
-        
-        windows = self.get_window_info()
-        workspace_data = {
-            'timestamp': timestamp,
-            'windows': windows,
-            'save_time': datetime.now().strftime("%Y-%m-%d %I:%M:%S %p"),
-            'window_count': len(windows)
-        }
+        return capture_windows(self.backend, self.excluded_processes, self.process_cache)
+
+    def save_current_workspace(self, skip_unchanged=False):
+        # Capture runs in the background; save_captured_workspace gets the result
+        self.capturer.excluded_processes = frozenset(self.excluded_processes)
+        self.capturer.request(skip_unchanged)
+
+    def save_captured_workspace(self, windows, skip_unchanged=False, captured_at=None):
+        # Manual saves are pinned and never thinned by the retention policy
+        workspace_name, workspace_data = build_workspace(windows, captured_at, pinned=not skip_unchanged)
         
-        filepath = os.path.join(self.workspace_dir, f"{workspace_name}.json")
-        with open(filepath, 'w') as f:
-            json.dump(workspace_data, f, indent=4)
+        # Auto-saves skip identical snapshots and store small changes as deltas
+        saved = self.store.save(workspace_name, workspace_data, incremental=skip_unchanged)
+        if skip_unchanged:
+            self.autosave.on_saved(saved)
+            if self.auto_save_enabled and not self.tracker.live:
+                self.timer.start(int(self.autosave.next_delay() * 1000))
+        if not saved:
+            # Unchanged desktop: the last snapshot is still on screen
+            self.record_heartbeat(captured_at or datetime.now())
+            return None
         
-        self.workspaces[workspace_name] = workspace_data
-        self.update_workspace_list()
+        self.add_to_workspace_list(workspace_name)
+        self.record_usage(workspace_name, workspace_data)
         
         # Show notification
         if self.show_notifications:
@@ -327,15 +473,10 @@ class WorkspaceManager(QMainWindow):
         return workspace_name
 
     def show_process_manager(self):
-        dialog = ProcessManagerDialog(self.excluded_processes, self)
+        dialog = ProcessManagerDialog(self.excluded_processes, self.process_catalog, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             self.excluded_processes = dialog.get_excluded_processes()
-            self.update_exclude_list()
-
-    def update_exclude_list(self):
-        self.exclude_list.clear()
-        for process in sorted(self.excluded_processes):
-            self.exclude_list.addItem(process)
+            self.save_settings()
 
     def closeEvent(self, event):
         event.ignore()
@@ -347,15 +488,51 @@ class WorkspaceManager(QMainWindow):
             2000
         )
 
+    def start_auto_save(self):
+        if self.tracker.live:
+            # The first change-driven save also seeds the live window table
+            self.timer.stop()
+            self.on_windows_changed()
+        else:
+            self.schedule_auto_save(self.autosave.next_delay())
+
+    def schedule_auto_save(self, delay):
+        timer = self.change_timer if self.tracker.live else self.timer
+        timer.start(int(delay * 1000))
+
+    def on_windows_changed(self):
+        if not self.auto_save_enabled:
+            return
+        self.autosave.on_change()
+        if self.change_timer.isActive():
+            return
+        delay = CHANGE_SETTLE_SECONDS
+        if self.last_auto_save is not None:
+            delay = self.autosave.next_delay(time.monotonic() - self.last_auto_save, delay)
+        self.change_timer.start(int(delay * 1000))
+
     def auto_save_workspace(self):
-        self.save_current_workspace()
+        defer = self.autosave.defer_for_load(self.backend.cpu_percent())
+        if defer:
+            self.schedule_auto_save(defer)
+            return
+        self.last_auto_save = time.monotonic()
+        if not self.tracker.live:
+            # Rescheduled from the outcome in save_captured_workspace; this covers failed captures
+            self.timer.start(int(self.autosave.next_delay() * 1000))
+        self.save_current_workspace(skip_unchanged=True)
 
     def restore_workspace(self):
-        if not self.workspace_tree.currentItem():
+        # The Restore button doubles as Cancel while a restore is running
+        if self.restorer.busy:
+            self.restorer.cancel()
+            return
+        
+        workspace_name = self.selected_workspace_name()
+        if not workspace_name:
             return
             
-        workspace_name = self.workspace_tree.currentItem().data(0, Qt.ItemDataRole.UserRole)
-        workspace_data = self.workspaces.get(workspace_name)
+        workspace_data = self.store.get(workspace_name)
         
         if not workspace_data:
             return
@@ -368,67 +545,78 @@ class WorkspaceManager(QMainWindow):
                 QSystemTrayIcon.MessageIcon.Information,
                 2000
             )
-            
-        for window in workspace_data['windows']:
-            try:
-                # Start process if it's not running
-                process_name = window['process_name']
-                if not any(p.name() == process_name for p in psutil.process_iter(['name'])):
-                    try:
-                        os.startfile(window['exe'])
-                        print(f"Starting process: {process_name}")
-                        time.sleep(2)  # Give more time for the application to start
-                    except Exception as e:
-                        print(f"Error starting process {process_name}: {str(e)}")
-                        continue
-                
-                # Try multiple times to find and restore the window
-                max_attempts = 5
-                for attempt in range(max_attempts):
-                    found = False
-                    
-                    def find_window_callback(hwnd, _):
-                        if win32gui.IsWindowVisible(hwnd):
-                            if win32gui.GetWindowText(hwnd) == window['title']:
-                                try:
-                                    # Restore window placement
-                                    win32gui.SetWindowPlacement(hwnd, window['placement'])
-                                    print(f"Restored window: {window['title']}")
-                                    return False  # Stop enumeration
-                                except Exception as e:
-                                    print(f"Error setting window placement: {str(e)}")
-                        return True
-                    
-                    win32gui.EnumWindows(find_window_callback, None)
-                    
-                    if found:
-                        break
-                    
-                    time.sleep(1)  # Wait before next attempt
-                
-            except Exception as e:
-                print(f"Error restoring window {window['title']}: {str(e)}")
+        
+        if self.restorer.start(workspace_name, workspace_data['windows']):
+            self.restore_button.setText("Cancel Restore")
+
+    def selected_workspace_names(self):
+        names = {self.workspace_model.workspace_name(index)
+                 for index in self.workspace_tree.selectionModel().selectedIndexes()}
+        names.discard(None)
+        return sorted(names)
+
+    def compare_workspaces(self):
+        names = self.selected_workspace_names()
+        if len(names) == 2:
+            # Names sort by save time, so this shows what changed from old to new
+            diff = diff_workspaces(self.store, names[0], names[1])
+            title = f"{names[0]} -> {names[1]}"
+        elif len(names) == 1:
+            workspace_data = self.store.get(names[0])
+            if not workspace_data:
+                return
+            # Captured on the worker like a save; the dialog opens when it's done
+            self.capturer.excluded_processes = frozenset(self.excluded_processes)
+            self.capturer.request(callback=lambda live: self.compare_with_desktop(names[0], workspace_data, live))
+            self.statusBar().showMessage("Capturing the current desktop...")
+            return
+        else:
+            self.statusBar().showMessage("Select one or two workspaces to compare", 3000)
+            return
+        if diff is None:
+            return
+        WorkspaceDiffDialog(title, diff, self).exec()
+
+    def compare_with_desktop(self, workspace_name, workspace_data, live):
+        self.statusBar().clearMessage()
+        # What a restore would change on the current desktop
+        diff = diff_windows(live, workspace_data['windows'])
+        WorkspaceDiffDialog(f"Current desktop -> {workspace_name}", diff, self).exec()
+
+    def restore_progress(self, done, total, message):
+        self.statusBar().showMessage(f"Restoring {done}/{total}: {message}")
+
+    def restore_finished(self, workspace_name, result):
+        self.restore_button.setText("Restore")
+        self.statusBar().showMessage(f"{result.summary()} in {result.elapsed:.1f}s", 5000)
+        match_stats = result.match_stats.as_dict()
+        print(f"Restored {workspace_name}: {match_stats['exact']} exact, {match_stats['fuzzy']} fuzzy, "
+              f"{len(result.missing)} missing, mean score {match_stats['mean_score']:.2f}, "
+              f"index {match_stats['index_ms']:.1f} ms, match {match_stats['match_ms']:.1f} ms "
+              f"over {match_stats['passes']} passes")
         
         # Show completion notification
         if self.show_notifications:
             self.tray_icon.showMessage(
                 "Workspace Restored",
-                f"Finished restoring workspace: {workspace_name}",
+                f"Finished restoring workspace: {workspace_name}\n{result.summary()}",
                 QSystemTrayIcon.MessageIcon.Information,
                 2000
             )
 
+    def restore_failed(self, workspace_name, error):
+        self.restore_button.setText("Restore")
+        print(f"Error restoring workspace {workspace_name}: {error}")
+        self.show_notification("Error", f"Failed to restore workspace: {workspace_name}",
+                               QSystemTrayIcon.MessageIcon.Critical)
+
     def delete_workspace(self):
-        if not self.workspace_tree.currentItem():
+        workspace_name = self.selected_workspace_name()
+        if not workspace_name:
             return
-            
-        workspace_name = self.workspace_tree.currentItem().data(0, Qt.ItemDataRole.UserRole)
-        filepath = os.path.join(self.workspace_dir, f"{workspace_name}.json")
         
         try:
-            os.remove(filepath)
-            del self.workspaces[workspace_name]
-            self.update_workspace_list()
+            self.remove_workspace(workspace_name)
             
             # Show notification
             if self.show_notifications:
@@ -448,129 +636,217 @@ class WorkspaceManager(QMainWindow):
                     2000
                 )
 
-    def load_workspaces(self):
-        if not os.path.exists(self.workspace_dir):
+    def remove_workspace(self, workspace_name):
+        """Delete a workspace from disk and the UI; returns the bytes reclaimed."""
+        freed = self.store.delete(workspace_name)
+        self.search_index.remove(workspace_name)
+        self.timeline.remove(workspace_name)
+        self.filter_matches.discard(workspace_name)
+        self.workspace_model.remove_workspace(workspace_name)
+        return freed
+
+    def enforce_retention(self):
+        if not self.retention_enabled or self.compactor.pending:
             return
-            
-        for filename in os.listdir(self.workspace_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(self.workspace_dir, filename)
-                try:
-                    with open(filepath, 'r') as f:
-                        workspace_data = json.load(f)
-                        workspace_name = filename[:-5]  # Remove .json
-                        self.workspaces[workspace_name] = workspace_data
-                except Exception as e:
-                    print(f"Error loading workspace {filename}: {str(e)}")
+        expired = expired_workspaces(self.store, self.retention_policy, self.search_index.save_time)
+        if not expired:
+            return
+        self.compactor.schedule(expired)
+        self.compaction_timer.start()
+
+    def compact_step(self):
+        # Low priority: yield to captures and restores
+        if self.capturer.busy or self.restorer.busy:
+            return
+        stats.count('retention.bytes_reclaimed', self.compactor.step())
+        if self.compactor.pending and self.retention_enabled:
+            return
+        self.compaction_timer.stop()
+        self.compactor.queue.clear()
+        reclaimed = self.compactor.reclaimed_bytes
+        print(f"Retention removed {self.compactor.deleted} workspaces, reclaimed {reclaimed / 1024:.1f} KB")
+        self.statusBar().showMessage(f"Removed {self.compactor.deleted} old auto-saves, "
+                                     f"reclaimed {reclaimed / 1024:.1f} KB", 5000)
+        self.compactor.deleted = 0
+        self.compactor.reclaimed_bytes = 0
+
+    def export_workspaces(self):
+        if self.archive_job:
+            return
+        names = self.selected_workspace_names() or None
+        path, _ = QFileDialog.getSaveFileName(self, "Export Workspaces", "workspaces.wsa.gz",
+                                              "Workspace archives (*.wsa.gz)")
+        if not path:
+            return
+        settings = self.store.load_settings()
+        self.start_archive_job('export', export_steps(self.store, path, names, settings), path)
+
+    def import_workspaces(self):
+        if self.archive_job:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Import Workspaces", "", "Workspace archives (*.wsa.gz)")
+        if not path:
+            return
+        result = ImportResult()
+        self.start_archive_job('import', import_steps(self.store, path, result), result)
+
+    def start_archive_job(self, kind, steps, context):
+        self.archive_job = (kind, steps, context)
+        self.archive_timer.start(0)
+
+    def archive_step(self, budget=0.02):
+        kind, steps, context = self.archive_job
+        deadline = time.perf_counter() + budget
+        try:
+            while time.perf_counter() < deadline:
+                step = next(steps)
+                if kind == 'export':
+                    self.statusBar().showMessage(f"Exporting {step[0]}/{step[1]}")
+                elif step[1] == 'imported':
+                    self.add_to_workspace_list(step[0])
+            return
+        except StopIteration:
+            pass
+        except Exception as e:
+            print(f"Error during {kind}: {str(e)}")
+            self.show_notification("Error", f"Failed to {kind} workspaces", QSystemTrayIcon.MessageIcon.Critical)
+        self.archive_timer.stop()
+        self.archive_job = None
+        if kind == 'export':
+            self.statusBar().showMessage(f"Exported workspaces to {context}", 5000)
+            return
+        if context.imported:
+            # Only imported snapshots newer than the analytics are picked up
+            self.start_analytics_catch_up()
+        if context.settings:
+            # Exclusion rules are merged; the other settings stay as they are
+            self.excluded_processes.update(context.settings.get('excluded_processes', []))
+            self.save_settings()
+        self.statusBar().showMessage(context.summary(), 5000)
+        self.show_notification("Workspaces Imported", context.summary())
+
+    def add_to_workspace_list(self, workspace_name):
+        self.search_index.add(workspace_name, self.store.info(workspace_name),
+                              self.store.search_terms(workspace_name))
+        if self.active_filter and self.search_index.matches(workspace_name, *self.active_filter):
+            self.filter_matches.add(workspace_name)
+        self.workspace_model.add_workspace(workspace_name)
+        self.timeline.add(workspace_name)
+
+    def show_timeline(self):
+        TimelineDialog(self.timeline, self).exec()
+
+    def record_usage(self, workspace_name, workspace_data):
+        if self.analytics_job or not self.analytics_ready:
+            # The catch-up will reach it
+            self.analytics_pending = True
+            return
+        self.analytics.ingest(workspace_name, parse_save_time(workspace_data), workspace_data['windows'])
+
+    def record_heartbeat(self, when):
+        # Dropped while catching up: the gap until the next snapshot is counted instead
+        if self.analytics_ready and not self.analytics_job:
+            self.analytics.heartbeat(when)
+
+    def analytics_loaded(self, loaded):
+        self.analytics_ready = True
+        self.start_analytics_catch_up()
+
+    def start_analytics_catch_up(self, rebuild=False):
+        if not self.analytics_ready:
+            return
+        if self.analytics_job:
+            self.analytics_pending = True
+            return
+        if rebuild:
+            self.analytics_job = self.analytics.rebuild_steps(self.store)
+        else:
+            self.analytics_job = self.analytics.catch_up_steps(self.store)
+        self.analytics_timer.start()
+
+    def analytics_step(self, budget=0.02):
+        # Low priority: yield to captures and restores
+        if self.capturer.busy or self.restorer.busy:
+            return
+        deadline = time.perf_counter() + budget
+        try:
+            while time.perf_counter() < deadline:
+                next(self.analytics_job)
+            return
+        except StopIteration:
+            pass
+        except Exception as e:
+            print(f"Error updating analytics: {str(e)}")
+        self.analytics_timer.stop()
+        self.analytics_job = None
+        if self.analytics_pending:
+            # Snapshots were saved while catching up
+            self.analytics_pending = False
+            self.start_analytics_catch_up()
+            return
+        self.save_analytics()
+
+    def save_analytics(self):
+        if not self.analytics.dirty or self.analytics_job or not self.analytics_ready:
+            return
+        self.analytics_worker.save()
+
+    def rebuild_analytics(self):
+        if self.analytics_job:
+            self.analytics_job.close()
+            self.analytics_job = None
+        self.analytics_pending = False
+        # Re-reads every snapshot, then recomputes the rollup in one pass
+        self.start_analytics_catch_up(rebuild=True)
 
+    def show_analytics(self):
+        AnalyticsDialog(self, self).exec()
+
+    @stats.timed('load_workspaces')
+    def load_workspaces(self):
+        self.store.load_all()
+        self.search_index.build(self.store)
+        self.timeline.clear()
+
+    @stats.timed('update_workspace_list')
     def update_workspace_list(self):
-        self.workspace_tree.clear()
-        
-        for workspace_name, workspace_data in self.workspaces.items():
-            try:
-                # Create top-level item
-                item = QTreeWidgetItem(self.workspace_tree)
-                save_time = workspace_data.get('save_time', 
-                    datetime.now().strftime("%Y-%m-%d %I:%M:%S %p"))
-                item.setText(0, save_time)
-                item.setData(0, Qt.ItemDataRole.UserRole, workspace_name)
-                
-                # Add child items with details
-                window_count = QTreeWidgetItem(item)
-                windows = workspace_data.get('windows', [])
-                window_count.setText(0, f"Windows: {len(windows)}")
-                
-                timestamp = QTreeWidgetItem(item)
-                timestamp.setText(0, f"Created: {save_time}")
-                
-                # Add window details
-                if windows:
-                    windows_item = QTreeWidgetItem(item)
-                    windows_item.setText(0, "Windows:")
-                    
-                    for window in windows:
-                        window_item = QTreeWidgetItem(windows_item)
-                        title = window.get('title', 'Unknown Window')
-                        process = window.get('process_name', 'Unknown Process')
-                        window_item.setText(0, f"{title} ({process})")
-            except Exception as e:
-                print(f"Error loading workspace {workspace_name}: {str(e)}")
-                continue
-        
-        self.workspace_tree.sortItems(0, Qt.SortOrder.DescendingOrder)
+        self.workspace_model.reload()
 
     def apply_filter(self):
+        # Connected to signals with arguments, so timed inline rather than decorated
+        with stats.timer('apply_filter'):
+            self._apply_filter()
+
+    def _apply_filter(self):
+        self.filter_timer.stop()
         filter_text = self.search_input.text().lower()
         filter_option = self.filter_combo.currentText()
         
-        for i in range(self.workspace_tree.topLevelItemCount()):
-            item = self.workspace_tree.topLevelItem(i)
-            workspace_name = item.data(0, Qt.ItemDataRole.UserRole)
-            workspace_data = self.workspaces[workspace_name]
-            
-            # Check if workspace matches filter criteria
-            show_item = True
-            
-            # Text filter
-            if filter_text:
-                # Check workspace name
-                if workspace_name and filter_text in workspace_name.lower():
-                    show_item = True
-                # Check window titles
-                elif 'windows' in workspace_data:
-                    show_item = any(
-                        filter_text in window.get('title', '').lower() 
-                        for window in workspace_data['windows']
-                    )
-                else:
-                    show_item = False
-            
-            # Date filter
-            if show_item and filter_option != "All":
-                try:
-                    # Get save_time with fallback to timestamp or current time
-                    save_time_str = workspace_data.get('save_time')
-                    if not save_time_str:
-                        timestamp = workspace_data.get('timestamp')
-                        if timestamp:
-                            # Convert timestamp format to save_time format
-                            temp_dt = datetime.strptime(timestamp, "%Y%m%d_%H%M%S")
-                            save_time_str = temp_dt.strftime("%Y-%m-%d %I:%M:%S %p")
-                        else:
-                            # Use current time as fallback
-                            save_time_str = datetime.now().strftime("%Y-%m-%d %I:%M:%S %p")
-                    
-                    save_time = datetime.strptime(save_time_str, "%Y-%m-%d %I:%M:%S %p")
-                    now = datetime.now()
-                    
-                    if filter_option == "Today":
-                        show_item = save_time.date() == now.date()
-                    elif filter_option == "Last 7 Days":
-                        show_item = (now - save_time).days <= 7
-                    elif filter_option == "Last 30 Days":
-                        show_item = (now - save_time).days <= 30
-                    elif filter_option == "Custom":
-                        # You can implement custom date range dialog here
-                        pass
-                except Exception as e:
-                    print(f"Error filtering workspace {workspace_name}: {str(e)}")
-                    show_item = False
-            
-            item.setHidden(not show_item)
+        # "Custom" has no date range yet, so it behaves like "All"
+        time_range = date_filter_range(filter_option)
+        if not filter_text and time_range is None:
+            self.active_filter = None
+            self.workspace_model.set_filter(None)
+            return
+        
+        self.active_filter = (filter_text, time_range)
+        self.filter_matches = self.search_index.search(filter_text, time_range)
+        self.workspace_model.set_filter(lambda workspace_name: workspace_name in self.filter_matches)
 
     def update_save_interval(self, value):
         """Update the auto-save interval and restart the timer"""
         self.save_interval = value
-        if self.auto_save_enabled:
-            self.timer.setInterval(value * 1000)  # Convert seconds to milliseconds
+        self.autosave.set_interval(value)
+        if self.auto_save_enabled and not self.tracker.live:
+            self.schedule_auto_save(self.autosave.next_delay())
         self.save_settings()
 
-    def workspace_selected(self, item):
-        # Get the top-level item if a child was selected
-        while item.parent():
-            item = item.parent()
-        
-        workspace_name = item.data(0, Qt.ItemDataRole.UserRole)
+    def selected_workspace_name(self):
+        return self.workspace_model.workspace_name(self.workspace_tree.currentIndex())
+
+    def workspace_selected(self, index):
+        # Every row carries the name of the workspace it belongs to
+        workspace_name = self.workspace_model.workspace_name(index)
         if workspace_name:
             self.current_workspace = workspace_name
 
@@ -581,9 +857,41 @@ class WorkspaceManager(QMainWindow):
     def toggle_auto_save(self, state):
         self.auto_save_enabled = bool(state)
         if self.auto_save_enabled:
-            self.timer.start(self.save_interval * 1000)
+            self.start_auto_save()
         else:
             self.timer.stop()
+            self.change_timer.stop()
+        self.save_settings()
+
+    def refresh_stats(self):
+        # Skip the work while the window is hidden in the tray
+        if self.isVisible():
+            self.stats_view.setPlainText("\n".join(stats.summary_lines()))
+
+    def export_stats(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Stats", "workspace_stats.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            stats.export(path)
+        except Exception as e:
+            print(f"Error exporting stats: {str(e)}")
+            self.show_notification("Error", "Failed to export stats", QSystemTrayIcon.MessageIcon.Critical)
+
+    def reset_stats(self):
+        stats.reset()
+        self.refresh_stats()
+
+    def toggle_retention(self, state):
+        self.retention_enabled = bool(state)
+        if self.retention_enabled:
+            self.enforce_retention()
+        self.save_settings()
+
+    def toggle_delete_older(self, state):
+        self.retention_policy.keep_older = not state
+        if state and self.retention_enabled:
+            self.enforce_retention()
         self.save_settings()
 
     def show_notification(self, title, message, icon=QSystemTrayIcon.MessageIcon.Information, duration=2000):
@@ -595,33 +903,40 @@ class WorkspaceManager(QMainWindow):
             'show_notifications': self.show_notifications,
             'auto_save_enabled': self.auto_save_enabled,
             'save_interval': self.save_interval,
-            'excluded_processes': list(self.excluded_processes)
+            'excluded_processes': list(self.excluded_processes),
+            'retention_enabled': self.retention_enabled,
+            'retention': self.retention_policy.to_settings()
         }
         
-        settings_file = os.path.join(self.workspace_dir, 'settings.json')
-        with open(settings_file, 'w') as f:
-            json.dump(settings, f)
+        self.store.save_settings(settings)
 
     def load_settings(self):
-        settings_file = os.path.join(self.workspace_dir, 'settings.json')
-        if os.path.exists(settings_file):
-            try:
-                with open(settings_file, 'r') as f:
-                    settings = json.load(f)
+        try:
+            settings = self.store.load_settings()
+            if settings:
                 self.show_notifications = settings.get('show_notifications', True)
                 self.auto_save_enabled = settings.get('auto_save_enabled', True)
                 self.save_interval = settings.get('save_interval', 30)
                 self.excluded_processes = set(settings.get('excluded_processes', []))
-            except Exception as e:
-                print(f"Error loading settings: {str(e)}")
+                self.retention_enabled = settings.get('retention_enabled', True)
+                self.retention_policy = RetentionPolicy.from_settings(settings.get('retention'))
+        except Exception as e:
+            print(f"Error loading settings: {str(e)}")
 
 class ProcessManagerDialog(QDialog):
-    def __init__(self, excluded_processes, parent=None):
+    def __init__(self, excluded_processes, catalog, parent=None):
         super().__init__(parent)
         self.excluded_processes = excluded_processes.copy()
+        self.catalog = catalog
+        self.catalog_generation = None
         self.setWindowTitle("Process Manager")
         self.setModal(True)
         self.setup_ui()
+        # The catalog refreshes in the background; pick up new processes as they appear
+        self.catalog.request_refresh()
+        self.catalog_timer = QTimer(self)
+        self.catalog_timer.timeout.connect(self.update_process_list)
+        self.catalog_timer.start(500)
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -637,6 +952,18 @@ class ProcessManagerDialog(QDialog):
         add_button.clicked.connect(self.add_process)
         layout.addWidget(add_button)
         
+        # Free-form rules: globs or regexes on process name, exe path or title
+        layout.addWidget(QLabel("Or add a pattern:"))
+        self.pattern_input = QLineEdit()
+        self.pattern_input.setPlaceholderText("chrome*, exe:C:\\Games\\*, title:*Private*, title:re:^Inbox")
+        self.pattern_input.returnPressed.connect(self.add_pattern)
+        layout.addWidget(self.pattern_input)
+        add_pattern_button = QPushButton("Add Pattern")
+        add_pattern_button.clicked.connect(self.add_pattern)
+        layout.addWidget(add_pattern_button)
+        self.pattern_error = QLabel()
+        layout.addWidget(self.pattern_error)
+        
         # Excluded processes list
         layout.addWidget(QLabel("Excluded Processes:"))
         self.excluded_list = QListWidget()
@@ -659,14 +986,14 @@ class ProcessManagerDialog(QDialog):
         layout.addLayout(button_layout)
 
     def update_process_list(self):
+        if self.catalog.generation == self.catalog_generation:
+            return
+        self.catalog_generation = self.catalog.generation
+        current = self.process_combo.currentText()
         self.process_combo.clear()
-        processes = set()
-        for proc in psutil.process_iter(['name']):
-            try:
-                processes.add(proc.info['name'])
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        self.process_combo.addItems(sorted(processes))
+        self.process_combo.addItems(self.catalog.process_names())
+        if current:
+            self.process_combo.setCurrentText(current)
 
     def update_excluded_list(self):
         self.excluded_list.clear()
@@ -678,6 +1005,20 @@ class ProcessManagerDialog(QDialog):
             self.excluded_processes.add(process)
             self.update_excluded_list()
 
+    def add_pattern(self):
+        pattern = self.pattern_input.text().strip()
+        if not pattern:
+            return
+        error = rule_error(pattern)
+        if error:
+            self.pattern_error.setText(f"Invalid pattern: {error}")
+            return
+        self.pattern_error.clear()
+        self.pattern_input.clear()
+        if pattern not in self.excluded_processes:
+            self.excluded_processes.add(pattern)
+            self.update_excluded_list()
+
     def remove_process(self):
         current_item = self.excluded_list.currentItem()
         if current_item:
@@ -687,8 +1028,175 @@ class ProcessManagerDialog(QDialog):
     def get_excluded_processes(self):
         return self.excluded_processes
 
+class WorkspaceDiffDialog(QDialog):
+    def __init__(self, title, diff, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Compare: {title}")
+        self.resize(700, 400)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(diff.summary()))
+        view = QPlainTextEdit()
+        view.setReadOnly(True)
+        view.setFont(QFont("Consolas", 9))
+        view.setPlainText("\n".join(diff.lines()[1:]))
+        layout.addWidget(view)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+
+class TimelineDialog(QDialog):
+    def __init__(self, timeline, parent=None):
+        super().__init__(parent)
+        self.timeline = timeline
+        self.setWindowTitle("Timeline")
+        self.resize(750, 450)
+        layout = QVBoxLayout(self)
+        
+        range_layout = QHBoxLayout()
+        now = QDateTime.currentDateTime()
+        self.start_edit = QDateTimeEdit(now.addSecs(-3600))
+        self.end_edit = QDateTimeEdit(now)
+        for edit in (self.start_edit, self.end_edit):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd hh:mm:ss")
+        self.moment_checkbox = QCheckBox("At a moment")
+        self.moment_checkbox.stateChanged.connect(lambda state: self.end_edit.setEnabled(not state))
+        show_button = QPushButton("Show")
+        show_button.clicked.connect(self.refresh)
+        range_layout.addWidget(QLabel("From:"))
+        range_layout.addWidget(self.start_edit)
+        range_layout.addWidget(QLabel("To:"))
+        range_layout.addWidget(self.end_edit)
+        range_layout.addWidget(self.moment_checkbox)
+        range_layout.addWidget(show_button)
+        layout.addLayout(range_layout)
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.view = QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.view)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+        self.refresh()
+
+    def refresh(self):
+        start = self.start_edit.dateTime().toPyDateTime()
+        if self.moment_checkbox.isChecked():
+            keys = sorted(self.timeline.open_at(start), key=lambda key: (key[0].lower(), key[1].lower()))
+            snapshot = self.timeline.snapshot_at(start)
+            self.summary_label.setText(f"{len(keys)} windows open (as of {snapshot})" if snapshot
+                                       else "No snapshot before this time")
+            self.view.setPlainText("\n".join(f"{title} ({process})" for process, title in keys))
+            return
+        end = self.end_edit.dateTime().toPyDateTime()
+        lifetimes = self.timeline.lifetimes_between(start, end)
+        self.summary_label.setText(f"{len(lifetimes)} windows open between {start:%Y-%m-%d %H:%M} "
+                                   f"and {end:%Y-%m-%d %H:%M}")
+        lines = []
+        # In the order they were first seen
+        for (process, title), runs in sorted(lifetimes.items(), key=lambda item: item[1][0][0]):
+            spans = ", ".join(f"{first:%m-%d %H:%M:%S} - {last:%m-%d %H:%M:%S}" for first, last in runs)
+            lines.append(f"{title} ({process}): {spans}")
+        self.view.setPlainText("\n".join(lines))
+
+class AnalyticsDialog(QDialog):
+    RANGES = [("Last 7 Days", 7), ("Last 30 Days", 30), ("Last 365 Days", 365), ("All", None)]
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.analytics = manager.analytics
+        self.setWindowTitle("Usage Analytics")
+        self.resize(800, 500)
+        layout = QVBoxLayout(self)
+        
+        range_layout = QHBoxLayout()
+        self.range_combo = QComboBox()
+        self.range_combo.addItems([label for label, _ in self.RANGES])
+        self.range_combo.currentIndexChanged.connect(self.refresh)
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        rebuild_button = QPushButton("Rebuild")
+        rebuild_button.setToolTip("Re-read every saved snapshot, e.g. to include imported older ones")
+        rebuild_button.clicked.connect(self.rebuild)
+        range_layout.addWidget(QLabel("Range:"))
+        range_layout.addWidget(self.range_combo)
+        range_layout.addStretch()
+        range_layout.addWidget(refresh_button)
+        range_layout.addWidget(rebuild_button)
+        layout.addLayout(range_layout)
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.view = QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.view)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+        self.refresh()
+
+    def rebuild(self):
+        self.manager.rebuild_analytics()
+        self.refresh()
+
+    def refresh(self):
+        summary = self.analytics.summary()
+        text = (f"{summary['snapshots']} snapshots, {summary['apps']} applications, "
+                f"{summary['hours']:.1f} hours recorded")
+        if not self.manager.analytics_ready:
+            text = "Loading analytics..."
+        elif self.manager.analytics_job:
+            text += " (reading snapshots...)"
+        self.summary_label.setText(text)
+        
+        day_count = self.RANGES[self.range_combo.currentIndex()][1]
+        today = day_number(datetime.now())
+        first_day = today - day_count + 1 if day_count else None
+        days, apps, hours = self.analytics.app_hours(first_day, today)
+        lines = []
+        if day_count == 7:
+            # One column per day
+            columns = [first_day + i for i in range(7)]
+            rows = {day: row for day, row in zip(days.tolist(), hours)}
+            lines.append(f"{'Application':<30}" + "".join(f"{day_date(day):%a %d}".rjust(8) for day in columns)
+                         + f"{'Total':>8}")
+            for i, app in enumerate(apps):
+                cells = "".join(f"{rows[day][i]:8.1f}" if day in rows else f"{'':8}" for day in columns)
+                lines.append(f"{app[:29]:<30}{cells}{hours[:, i].sum():8.1f}")
+        else:
+            active_days = max(len(days), 1)
+            lines.append(f"{'Application':<30}{'Hours':>10}{'Days used':>11}{'Per day':>9}")
+            for i, app in enumerate(apps):
+                column = hours[:, i]
+                lines.append(f"{app[:29]:<30}{column.sum():10.1f}{int((column > 0).sum()):11d}"
+                             f"{column.sum() / active_days:9.1f}")
+        
+        start = datetime.combine(day_date(first_day), datetime.min.time()) if day_count else None
+        layouts = self.analytics.top_layouts(start, None, limit=10)
+        if layouts:
+            lines += ["", "Most used window layouts:"]
+            for app, show_cmd, rect, layout_hours in layouts:
+                state = {2: "minimized", 3: "maximized"}.get(show_cmd, "normal")
+                lines.append(f"  {layout_hours:7.1f} h  {app} {state} at ({rect[0]}, {rect[1]}) "
+                             f"{rect[2] - rect[0]}x{rect[3] - rect[1]}")
+        self.view.setPlainText("\n".join(lines) if apps else "No usage recorded in this range")
+
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    window = WorkspaceManager()
+    parser = argparse.ArgumentParser(description="Workspace Manager")
+    parser.add_argument('--profile', nargs='?', const='profiles', metavar='DIR',
+                        help="write cProfile output for the next capture and restore to DIR")
+    args, qt_args = parser.parse_known_args()
+    if args.profile:
+        stats.enable_profiling(args.profile)
+    app = QApplication(sys.argv[:1] + qt_args)
+    # WORKSPACE_MANAGER_BACKEND=simulated runs against an in-memory desktop
+    # WORKSPACE_MANAGER_STORAGE=sqlite keeps every snapshot in one database
+    window = WorkspaceManager(create_backend(os.environ.get('WORKSPACE_MANAGER_BACKEND', 'win32')),
+                              os.environ.get('WORKSPACE_MANAGER_STORAGE', 'files'))
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,227 @@
+"""Lazily populated tree model over a WorkspaceStore.
+
+Only the rows the view has actually asked for exist as nodes: workspaces are
+materialised in batches as the view scrolls (canFetchMore/fetchMore on the
+root), a workspace's detail rows when it is expanded, and its window rows
+(the only part that needs the full snapshot) when the "Windows:" node is
+expanded. Saves and deletes insert or remove a single row.
+"""
+from PyQt6.QtCore import QAbstractItemModel, QModelIndex, Qt
+
+
+class _Node:
+    __slots__ = ('kind', 'name', 'text', 'parent', 'children')
+
+    def __init__(self, kind, name=None, text=None, parent=None):
+        self.kind = kind          # 'root', 'workspace', 'detail', 'windows' or 'window'
+        self.name = name          # owning workspace name
+        self.text = text
+        self.parent = parent
+        self.children = None      # None until fetched
+
+
+class WorkspaceTreeModel(QAbstractItemModel):
+    BATCH_SIZE = 200
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._root = _Node('root')
+        self._root.children = []
+        self._names = []          # visible workspace names, newest first
+        self._filter = None
+        self._busy = False        # views call back into fetchMore from row signals
+
+    # Structure
+
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self._root
+
+    def _find(self, name):
+        """Binary search for `name` in the newest-first name list."""
+        lo, hi = 0, len(self._names)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._names[mid] > name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _row(self, node):
+        if node.kind == 'workspace':
+            return self._find(node.name)
+        return node.parent.children.index(node)
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if column != 0 or node.children is None or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        parent_node = index.internalPointer().parent
+        if parent_node is None or parent_node is self._root:
+            return QModelIndex()
+        return self.createIndex(self._row(parent_node), 0, parent_node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self._node(parent)
+        return len(node.children) if node.children is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._node(parent)
+        if node.kind == 'root':
+            return bool(self._names)
+        if node.kind == 'workspace':
+            return True
+        if node.kind == 'windows':
+            return node.children is None or bool(node.children)
+        return False
+
+    def canFetchMore(self, parent):
+        if self._busy:
+            return False
+        node = self._node(parent)
+        if node.kind == 'root':
+            return len(node.children) < len(self._names)
+        return node.kind in ('workspace', 'windows') and node.children is None
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        self._busy = True
+        try:
+            self._fetch(parent)
+        finally:
+            self._busy = False
+
+    def _fetch(self, parent):
+        node = self._node(parent)
+        if node.kind == 'root':
+            start = len(node.children)
+            names = self._names[start:start + self.BATCH_SIZE]
+            if not names:
+                return
+            self.beginInsertRows(parent, start, start + len(names) - 1)
+            node.children.extend(_Node('workspace', name, parent=node) for name in names)
+            self.endInsertRows()
+            return
+
+        children = self._build_children(node)
+        if not children:
+            node.children = []
+            return
+        self.beginInsertRows(parent, 0, len(children) - 1)
+        node.children = children
+        self.endInsertRows()
+
+    def _build_children(self, node):
+        name = node.name
+        if node.kind == 'workspace':
+            entry = self.store.info(name) or {}
+            save_time = entry.get('save_time', '')
+            children = [
+                _Node('detail', name, f"Windows: {entry.get('window_count', 0)}", node),
+                _Node('detail', name, f"Created: {save_time}", node),
+            ]
+            if entry.get('window_count'):
+                children.append(_Node('windows', name, "Windows:", node))
+            return children
+
+        workspace_data = self.store.get(name) or {}
+        children = []
+        for window in workspace_data.get('windows', []):
+            title = window.get('title', 'Unknown Window')
+            process = window.get('process_name', 'Unknown Process')
+            children.append(_Node('window', name, f"{title} ({process})", node))
+        return children
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if node.kind == 'workspace':
+                entry = self.store.info(node.name) or {}
+                return entry.get('save_time') or node.name
+            return node.text
+        if role == Qt.ItemDataRole.UserRole:
+            return node.name
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return "Workspaces"
+        return None
+
+    # Updates
+
+    def workspace_name(self, index):
+        return index.data(Qt.ItemDataRole.UserRole) if index.isValid() else None
+
+    def reload(self):
+        """Rebuild from the store; only used at startup and when the filter changes."""
+        names = self.store.names()
+        if self._filter is not None:
+            names = [name for name in names if self._filter(name)]
+        self._busy = True
+        try:
+            self.beginResetModel()
+            self._names = sorted(names, reverse=True)
+            self._root.children = []
+            self.endResetModel()
+        finally:
+            self._busy = False
+
+    def set_filter(self, predicate):
+        """Show only workspaces for which `predicate(name)` is true (None shows all)."""
+        self._filter = predicate
+        self.reload()
+
+    def add_workspace(self, name):
+        if self._filter is not None and not self._filter(name):
+            return
+        row = self._find(name)
+        if row < len(self._names) and self._names[row] == name:
+            # Rewritten in place: drop the cached detail rows
+            self.remove_workspace(name)
+        self._insert_name(row, name)
+
+    def _insert_name(self, row, name):
+        fetched = len(self._root.children)
+        if row > fetched or (row == fetched and fetched < len(self._names)):
+            # Beyond what the view has fetched; it will show up on scroll
+            self._names.insert(row, name)
+            return
+        self._busy = True
+        try:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._names.insert(row, name)
+            self._root.children.insert(row, _Node('workspace', name, parent=self._root))
+            self.endInsertRows()
+        finally:
+            self._busy = False
+
+    def remove_workspace(self, name):
+        row = self._find(name)
+        if row >= len(self._names) or self._names[row] != name:
+            return
+        if row < len(self._root.children):
+            self._busy = True
+            try:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._names[row]
+                del self._root.children[row]
+                self.endRemoveRows()
+            finally:
+                self._busy = False
+        else:
+            del self._names[row]
@@ -0,0 +1,605 @@
+"""On-disk storage for saved workspaces.
+
+Each workspace is a `<name>.json` file in the workspace directory that
+references its window records by digest; the records themselves live once in
+the shared RecordStore. Auto-saves that only differ a little from the
+previous snapshot are written as deltas against the last full snapshot (the
+keyframe). Files written before records were shared still carry inline
+`windows` and load unchanged.
+
+Startup only reads the manifest (`manifest.jsonl`), an append-only journal
+with one entry per workspace (save time, window count, size, mtime,
+fingerprint, search terms and window identities for the timeline) plus the
+record reference counts. Complete
+workspaces are reconstructed on demand through a small LRU cache. The
+manifest is reconciled against the directory on load, so snapshots added,
+changed or removed outside the app are picked up incrementally.
+
+Snapshot and settings files go through snapshot_codec, so their encoding
+(compact JSON by default, optionally msgpack and/or compressed) is
+configurable and detected on read; files keep the `.json` extension.
+
+All writes go through a writer from write_queue: temp file plus rename, so a
+crash never leaves a half-written snapshot, manifest or settings file. With
+a WriteBehindQueue they happen on a background thread; reads check the
+queue first, so the store always sees its own writes. A `read_only` store
+(used to migrate a directory to another engine) never writes the manifest
+or cleans up the directory.
+"""
+import hashlib
+import json
+import os
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+import snapshot_codec
+from perf_stats import stats
+from record_store import RecordStore
+from window_record import json_default
+from write_queue import REMOVED, DirectWriter
+
+SETTINGS_FILE = 'settings.json'
+MANIFEST_FILE = 'manifest.jsonl'
+# Joins a window key's process name and title into one interned term
+KEY_SEPARATOR = '\x1f'
+# Store state that incremental saves build on; see WorkspaceStore.separate_chain
+CHAIN_DEFAULTS = {'_keyframe_name': None, '_keyframe_digests': None, '_since_keyframe': 0,
+                  'last_fingerprint': None}
+
+
+def window_digest(window):
+    """Stable hash of a window record; tuples and lists hash the same."""
+    canonical = json.dumps(window, sort_keys=True, separators=(',', ':'), default=json_default)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def windows_fingerprint(windows, digests=None):
+    """Order-independent fingerprint of a window set."""
+    if digests is None:
+        digests = [window_digest(w) for w in windows]
+    return hashlib.blake2b(''.join(sorted(digests)).encode('ascii'), digest_size=16).hexdigest()
+
+
+def window_search_terms(windows):
+    """Lowercased titles, process names and exe paths of a window set."""
+    terms = set()
+    for window in windows:
+        for key in ('title', 'process_name', 'exe'):
+            value = window.get(key)
+            if value:
+                terms.add(value.lower())
+    return terms
+
+
+def window_keys(windows):
+    """Distinct (process name, title) identities of a window set."""
+    return sorted({(window.get('process_name') or '', window.get('title') or '') for window in windows})
+
+
+class WorkspaceStore:
+    def __init__(self, workspace_dir, keyframe_interval=20, max_delta_ratio=0.5, cache_size=32,
+                 codec='json-compact', compression=None, settings_codec='json-compact', writer=None,
+                 read_only=False):
+        self.workspace_dir = workspace_dir
+        self.read_only = read_only
+        self.writer = writer if writer is not None else DirectWriter()
+        self.codec = codec
+        self.compression = compression
+        self.settings_codec = settings_codec
+        self.keyframe_interval = keyframe_interval
+        self.max_delta_ratio = max_delta_ratio
+        self.cache_size = cache_size
+        self.manifest = {}  # workspace name -> manifest entry
+        self.terms = []     # search term table referenced by manifest entries
+        self._term_ids = {}
+        self._cache = OrderedDict()  # workspace name -> (workspace data, record digests)
+        self.records = RecordStore(workspace_dir, writer=self.writer)
+        self._refcounts_valid = True
+        self._journal_lines = 0
+        self.last_fingerprint = None
+        self._keyframe_name = None
+        self._keyframe_digests = None
+        self._since_keyframe = 0
+
+        if not os.path.exists(self.workspace_dir):
+            os.makedirs(self.workspace_dir)
+
+    def __contains__(self, workspace_name):
+        return workspace_name in self.manifest
+
+    def __len__(self):
+        return len(self.manifest)
+
+    def _path(self, workspace_name):
+        return os.path.join(self.workspace_dir, f"{workspace_name}.json")
+
+    # Manifest
+
+    def names(self):
+        return list(self.manifest)
+
+    def info(self, workspace_name):
+        return self.manifest.get(workspace_name)
+
+    def search_terms(self, workspace_name):
+        entry = self.manifest.get(workspace_name)
+        if entry is None:
+            return []
+        return [self.terms[i] for i in entry['terms']]
+
+    def window_keys(self, workspace_name):
+        """(process name, title) identities of a workspace's windows, from the manifest."""
+        entry = self.manifest.get(workspace_name)
+        if entry is None:
+            return []
+        if 'window_keys' not in entry:
+            self._backfill_window_keys(workspace_name, entry)
+        return [tuple(self.terms[i].split(KEY_SEPARATOR, 1)) for i in entry['window_keys']]
+
+    def _backfill_window_keys(self, workspace_name, entry):
+        # Entries from before window keys were recorded: read the snapshot once
+        data = self.get(workspace_name)
+        new_terms = []
+        entry['window_keys'] = sorted(self._term_id(KEY_SEPARATOR.join(key), new_terms)
+                                      for key in window_keys(data['windows'] if data else []))
+        ops = [{'op': 'terms', 'add': new_terms}] if new_terms else []
+        ops.append({'op': 'put', 'name': workspace_name, 'entry': entry})
+        self._journal(ops)
+
+    def _term_id(self, term, new_terms):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self._term_ids[term] = term_id
+            new_terms.append(term)
+        return term_id
+
+    def _journal(self, ops):
+        if self.read_only:
+            return
+        data = ''.join(json.dumps(op, separators=(',', ':')) + '\n' for op in ops)
+        self.writer.append(os.path.join(self.workspace_dir, MANIFEST_FILE), data.encode('utf-8'))
+        self._journal_lines += len(ops)
+        if self._journal_lines > 2 * len(self.manifest) + 100:
+            self._compact_manifest()
+
+    def _put_entry(self, workspace_name, workspace_data, fingerprint, base=None,
+                   incref=(), decref=(), size=None, mtime=None):
+        if size is None:
+            stat = os.stat(self._path(workspace_name))
+            size, mtime = stat.st_size, stat.st_mtime
+        windows = workspace_data.get('windows', [])
+        new_terms = []
+        entry = {
+            'timestamp': workspace_data.get('timestamp'),
+            'save_time': workspace_data.get('save_time'),
+            'window_count': len(windows),
+            'size': size,
+            'mtime': mtime,
+            'fingerprint': fingerprint,
+            'terms': sorted(self._term_id(t, new_terms) for t in window_search_terms(windows)),
+            'window_keys': sorted(self._term_id(KEY_SEPARATOR.join(key), new_terms)
+                                  for key in window_keys(windows)),
+        }
+        if base:
+            entry['base'] = base
+        if 'pinned' in workspace_data:
+            entry['pinned'] = bool(workspace_data['pinned'])
+        self.manifest[workspace_name] = entry
+        self.records.incref(incref)
+        self.records.decref(decref)
+
+        ops = []
+        if new_terms:
+            ops.append({'op': 'terms', 'add': new_terms})
+        ops.append({'op': 'put', 'name': workspace_name, 'entry': entry,
+                    'incref': list(incref), 'decref': list(decref)})
+        self._journal(ops)
+
+    def _load_manifest(self):
+        # Replaying the journal rebuilds everything, so start from scratch
+        self.manifest = {}
+        self.terms = []
+        self._term_ids = {}
+        self.records.refcounts = Counter()
+        self._refcounts_valid = True
+        self._journal_lines = 0
+        path = os.path.join(self.workspace_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            # No manifest yet: every snapshot gets indexed and counted below
+            return
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash; the directory sync repairs it
+                    continue
+                self._journal_lines += 1
+                kind = op.get('op')
+                if kind == 'terms':
+                    for term in op['add']:
+                        self._term_ids[term] = len(self.terms)
+                        self.terms.append(term)
+                elif kind == 'put':
+                    self.manifest[op['name']] = op['entry']
+                    self.records.incref(op.get('incref', ()))
+                    self.records.decref(op.get('decref', ()))
+                elif kind == 'del':
+                    self.manifest.pop(op['name'], None)
+                    self.records.decref(op.get('decref', ()))
+                elif kind == 'refcounts':
+                    self.records.refcounts = Counter(op['counts'])
+                elif kind == 'dirty':
+                    self._refcounts_valid = False
+
+    def _compact_manifest(self):
+        """Rewrite the journal as one entry per workspace, dropping unused terms."""
+        used = sorted({i for entry in self.manifest.values()
+                       for i in entry['terms'] + entry.get('window_keys', [])})
+        remap = {old: new for new, old in enumerate(used)}
+        self.terms = [self.terms[i] for i in used]
+        self._term_ids = {term: i for i, term in enumerate(self.terms)}
+        for entry in self.manifest.values():
+            entry['terms'] = [remap[i] for i in entry['terms']]
+            if 'window_keys' in entry:
+                entry['window_keys'] = [remap[i] for i in entry['window_keys']]
+
+        ops = [{'op': 'terms', 'add': self.terms}]
+        ops.extend({'op': 'put', 'name': name, 'entry': entry} for name, entry in self.manifest.items())
+        ops.append({'op': 'refcounts', 'counts': {d: n for d, n in self.records.refcounts.items() if n > 0}})
+        if not self._refcounts_valid:
+            ops.append({'op': 'dirty'})
+
+        data = ''.join(json.dumps(op, separators=(',', ':')) + '\n' for op in ops)
+        self.writer.write(os.path.join(self.workspace_dir, MANIFEST_FILE), data.encode('utf-8'))
+        self._journal_lines = len(ops)
+
+    @stats.timed('store.load_all')
+    def load_all(self):
+        """Load the manifest and reconcile it with the workspace directory."""
+        self.writer.flush()
+        self._load_manifest()
+
+        on_disk = {}
+        with os.scandir(self.workspace_dir) as entries:
+            for dir_entry in entries:
+                name = dir_entry.name
+                if name.endswith('.tmp'):
+                    # Left behind by a crash mid-write; the target is intact
+                    if not self.read_only:
+                        os.remove(dir_entry.path)
+                elif name.endswith('.json') and name != SETTINGS_FILE:
+                    on_disk[name[:-5]] = dir_entry.stat()  # Remove .json
+
+        removed = [name for name in self.manifest if name not in on_disk]
+        if removed:
+            # Their record references are unknown now; recount on next collect
+            for name in removed:
+                del self.manifest[name]
+            self._refcounts_valid = False
+            self._journal([{'op': 'del', 'name': name} for name in removed] + [{'op': 'dirty'}])
+
+        for name, stat in on_disk.items():
+            if not self._is_current(name, stat):
+                self._index_file(name)
+
+        if self.manifest:
+            self.last_fingerprint = self.manifest[max(self.manifest)].get('fingerprint')
+        return self.manifest
+
+    def _is_current(self, workspace_name, stat):
+        entry = self.manifest.get(workspace_name)
+        return entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+
+    def _index_file(self, workspace_name):
+        try:
+            raw = self._read(workspace_name)
+        except Exception as e:
+            print(f"Error loading workspace {workspace_name}.json: {str(e)}")
+            return
+        if workspace_name in self.manifest:
+            # Modified outside the app: previous references are unknown
+            self._refcounts_valid = False
+            self._journal([{'op': 'dirty'}])
+            del self.manifest[workspace_name]
+        self._cache.pop(workspace_name, None)
+        loaded = self._reconstruct(workspace_name, raw)
+        if loaded is None:
+            return
+        data, digests = loaded
+        self._put_entry(workspace_name, data, windows_fingerprint(data['windows'], digests),
+                        base=raw.get('base'), incref=self._file_refs(raw))
+
+    # Snapshot files
+
+    def _read_file(self, path):
+        data = self.writer.pending(path)
+        if data is REMOVED:
+            raise FileNotFoundError(path)
+        if data is not None:
+            return snapshot_codec.decode(data)
+        return snapshot_codec.read_file(path)
+
+    def _read(self, workspace_name):
+        return self._read_file(self._path(workspace_name))
+
+    @staticmethod
+    def _file_refs(raw):
+        if 'records' in raw:
+            return list(raw['records'])
+        return [item for item in raw.get('added', []) if isinstance(item, str)]
+
+    def _resolve(self, workspace_name, items):
+        """Turn record digests (or legacy inline dicts) into window dicts."""
+        windows = []
+        for item in items:
+            if isinstance(item, str):
+                window = self.records.get(item)
+                if window is None:
+                    print(f"Error loading workspace {workspace_name}: missing record {item}")
+                    continue
+                windows.append(window)
+            else:
+                windows.append(item)
+        return windows
+
+    def _reconstruct(self, workspace_name, raw):
+        """Return (complete workspace data, record digests or None)."""
+        if 'base' in raw:
+            base = self._get_cached(raw['base'])
+            if base is None:
+                print(f"Error loading workspace {workspace_name}: missing base {raw['base']}")
+                return None
+            base_data, base_digests = base
+            delta = dict(raw, added=self._resolve(workspace_name, raw.get('added', [])))
+            return self._apply_delta(base_data, delta, base_digests), None
+
+        data = {key: value for key, value in raw.items() if key != 'records'}
+        if 'records' in raw:
+            data['windows'] = self._resolve(workspace_name, raw['records'])
+            if len(data['windows']) == len(raw['records']):
+                return data, list(raw['records'])
+        return data, None
+
+    def _get_cached(self, workspace_name):
+        cached = self._cache.get(workspace_name)
+        if cached is not None:
+            self._cache.move_to_end(workspace_name)
+            stats.count('store.cache_hits')
+            return cached
+        stats.count('store.cache_misses')
+        if workspace_name not in self.manifest:
+            # A keyframe that appeared on disk but hasn't been indexed yet
+            path = self._path(workspace_name)
+            if self.writer.pending(path) is REMOVED or not os.path.exists(path):
+                return None
+            self._index_file(workspace_name)
+        try:
+            raw = self._read(workspace_name)
+        except Exception as e:
+            print(f"Error loading workspace {workspace_name}: {str(e)}")
+            return None
+        loaded = self._reconstruct(workspace_name, raw)
+        if loaded is not None:
+            self._cache_put(workspace_name, *loaded)
+        return loaded
+
+    def _cache_put(self, workspace_name, data, digests):
+        self._cache[workspace_name] = (data, digests)
+        self._cache.move_to_end(workspace_name)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, workspace_name):
+        """Return the complete workspace data, loading it if needed."""
+        loaded = self._get_cached(workspace_name)
+        return loaded[0] if loaded is not None else None
+
+    @staticmethod
+    def _apply_delta(base, delta, base_digests=None):
+        removed = Counter(delta.get('removed', []))
+        base_windows = base.get('windows', [])
+        if base_digests is None:
+            base_digests = [window_digest(w) for w in base_windows]
+        windows = []
+        for window, digest in zip(base_windows, base_digests):
+            if removed[digest] > 0:
+                removed[digest] -= 1
+                continue
+            windows.append(window)
+        windows.extend(delta.get('added', []))
+        data = {key: value for key, value in delta.items() if key not in ('base', 'added', 'removed')}
+        data['windows'] = windows
+        data['window_count'] = len(windows)
+        return data
+
+    def _write(self, workspace_name, file_data, refs, workspace_data, digests, fingerprint):
+        decref = []
+        if workspace_name in self.manifest:
+            try:
+                decref = self._file_refs(self._read(workspace_name))
+            except Exception:
+                self._refcounts_valid = False
+        data = snapshot_codec.encode(file_data, self.codec, self.compression)
+        mtime = self.writer.write(self._path(workspace_name), data)
+        self._put_entry(workspace_name, workspace_data, fingerprint, base=file_data.get('base'),
+                        incref=refs, decref=decref, size=len(data), mtime=mtime)
+        # Cache the shared compact records rather than the captured dicts
+        windows = [self.records.get(digest) for digest in digests]
+        self._cache_put(workspace_name, dict(workspace_data, windows=windows), digests)
+
+    def _write_full(self, workspace_name, workspace_data, digests=None, fingerprint=None):
+        windows = workspace_data['windows']
+        if digests is None:
+            digests = [window_digest(w) for w in windows]
+        if fingerprint is None:
+            fingerprint = windows_fingerprint(windows, digests)
+        # Records go to disk before the snapshot that references them
+        self.records.put_many(windows, digests)
+        data = {key: value for key, value in workspace_data.items() if key != 'windows'}
+        data['records'] = digests
+        self._write(workspace_name, data, digests, workspace_data, digests, fingerprint)
+
+    @stats.timed('store.save')
+    def save(self, workspace_name, workspace_data, incremental=False):
+        """Persist a workspace and return True if anything was written.
+
+        Incremental saves are skipped when the window set is identical to the
+        previous snapshot, and stored as a delta against the keyframe when
+        only a few windows changed.
+        """
+        windows = workspace_data['windows']
+        digests = [window_digest(w) for w in windows]
+        fingerprint = windows_fingerprint(windows, digests)
+        if incremental and fingerprint == self.last_fingerprint:
+            return False
+        delta = None
+
+        if (incremental and self._keyframe_name in self.manifest
+                and self._since_keyframe < self.keyframe_interval):
+            remaining = Counter(self._keyframe_digests)
+            added = []
+            for window, digest in zip(windows, digests):
+                if remaining[digest] > 0:
+                    remaining[digest] -= 1
+                else:
+                    added.append(window)
+            removed = list((+remaining).elements())
+            if len(added) + len(removed) <= self.max_delta_ratio * max(len(windows), 1):
+                added_digests = [window_digest(w) for w in added]
+                delta = {key: value for key, value in workspace_data.items() if key != 'windows'}
+                delta.update(base=self._keyframe_name, added=added_digests, removed=removed)
+
+        if delta is not None:
+            self.records.put_many(added, added_digests)
+            self._write(workspace_name, delta, added_digests, workspace_data, digests, fingerprint)
+            self._since_keyframe += 1
+        else:
+            self._write_full(workspace_name, workspace_data, digests, fingerprint)
+            self._keyframe_name = workspace_name
+            self._keyframe_digests = Counter(digests)
+            self._since_keyframe = 0
+
+        self.last_fingerprint = fingerprint
+        return True
+
+    @contextmanager
+    def separate_chain(self, chain):
+        """Run incremental saves against `chain` instead of the live snapshots.
+
+        `chain` is a dict the caller keeps between uses; it starts empty. This
+        lets an import store old snapshots as deltas without the next auto-save
+        building on (or being skipped as identical to) an imported snapshot.
+        """
+        live = {field: getattr(self, field) for field in CHAIN_DEFAULTS}
+        for field, default in CHAIN_DEFAULTS.items():
+            setattr(self, field, chain.get(field, default))
+        try:
+            yield
+        finally:
+            chain.update((field, getattr(self, field)) for field in CHAIN_DEFAULTS)
+            for field, value in live.items():
+                setattr(self, field, value)
+
+    def put_records(self, windows, digests):
+        """Store window records ahead of the snapshots that will reference them."""
+        self.records.put_many(windows, digests)
+
+    def get_records(self, digests):
+        """Stored window records for `digests`, None where a record is missing."""
+        return [self.records.get(digest) for digest in digests]
+
+    @stats.timed('store.delete')
+    def delete(self, workspace_name):
+        """Delete a workspace; returns the bytes reclaimed (snapshot file plus record pack)."""
+        dependents = [name for name, entry in self.manifest.items()
+                      if entry.get('base') == workspace_name]
+        # Deltas can't outlive their keyframe: rewrite them as full snapshots
+        for name in dependents:
+            data = self.get(name)
+            if data is not None:
+                self._write_full(name, data)
+
+        try:
+            decref = self._file_refs(self._read(workspace_name))
+        except Exception:
+            decref = []
+            self._refcounts_valid = False
+        freed = self.manifest[workspace_name].get('size', 0)
+        self.writer.remove(self._path(workspace_name))
+        del self.manifest[workspace_name]
+        self._cache.pop(workspace_name, None)
+        self.records.decref(decref)
+        self._journal([{'op': 'del', 'name': workspace_name, 'decref': decref}])
+        if workspace_name == self._keyframe_name:
+            self._keyframe_name = None
+            self._keyframe_digests = None
+        return freed + self.collect()
+
+    def collect(self, force=False):
+        """Sweep unreferenced records; returns bytes reclaimed.
+
+        When references were lost (files removed or edited outside the app)
+        they are recounted from every snapshot first, which only happens on
+        a forced collection.
+        """
+        if not self._refcounts_valid:
+            if not force:
+                return 0
+            counts = Counter()
+            for name in self.manifest:
+                try:
+                    counts.update(self._file_refs(self._read(name)))
+                except Exception as e:
+                    print(f"Error loading workspace {name}: {str(e)}")
+                    return 0
+            self.records.refcounts = counts
+            self._refcounts_valid = True
+            self._compact_manifest()
+        return self.records.collect(force)
+
+    def flush(self):
+        """Wait until every queued write is on disk."""
+        self.writer.flush()
+
+    def close(self):
+        self.writer.flush()
+        self.writer.close()
+
+    # Settings
+
+    def save_settings(self, settings):
+        # Queued writes of the same file coalesce, so frequent saves are cheap
+        self.writer.write(os.path.join(self.workspace_dir, SETTINGS_FILE),
+                          snapshot_codec.encode(settings, self.settings_codec), ordered=False)
+
+    def load_settings(self):
+        settings_file = os.path.join(self.workspace_dir, SETTINGS_FILE)
+        if self.writer.pending(settings_file) is None and not os.path.exists(settings_file):
+            return None
+        return self._read_file(settings_file)
+
+
+def open_store(workspace_dir, engine="files", write_behind=False, **kwargs):
+    """Open a workspace store by engine name ("files" or "sqlite").
+
+    With `write_behind`, the file store writes on a background thread (see
+    write_queue); SQLite commits are already cheap and stay synchronous.
+    The first time the SQLite engine is opened on a directory of snapshot
+    files, the files are migrated into the database (and left in place).
+    """
+    if engine == "files":
+        if write_behind:
+            from write_queue import WriteBehindQueue
+            kwargs['writer'] = WriteBehindQueue()
+        return WorkspaceStore(workspace_dir, **kwargs)
+    if engine == "sqlite":
+        from sqlite_store import SqliteWorkspaceStore
+        store = SqliteWorkspaceStore(workspace_dir, **kwargs)
+        store.migrate_from(WorkspaceStore(workspace_dir, read_only=True))
+        return store
+    raise ValueError(f"Unknown storage engine: {engine}")
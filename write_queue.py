@@ -0,0 +1,226 @@
+"""Crash-safe file writes, either immediate or write-behind.
+
+Every whole-file write goes to `<path>.tmp`, is fsynced, gets its final mtime
+and is then renamed over the target, so a crash leaves either the old file
+or the new one, never a half-written one. Appends (the manifest journal and
+the record pack) are fsynced as well; their readers already tolerate a torn
+final line.
+
+DirectWriter does this on the calling thread. WriteBehindQueue does it on a
+background thread, in submission order, so the GUI never waits on disk:
+
+- a write to a file that already has a queued write replaces it (settings
+  saved on every spinbox tick become one write), and consecutive appends to
+  one file are merged. A replaced write normally moves to the back of the
+  queue, behind the writes it may depend on (a snapshot behind its
+  records); files that depend on nothing, like settings, are written with
+  ordered=False and keep their place, so a steady stream of snapshots can't
+  hold them back. A write followed by appends to the same file is never
+  replaced, since the appends only make sense on top of it (a compacted
+  manifest and the journal entries after it);
+- pending(path) returns the queued contents of a file, so reads see their
+  own writes before they reach the disk;
+- flush() waits until everything is on disk; close() flushes and stops.
+
+The mtime is chosen when the write is submitted, so the store can record a
+snapshot's size and mtime in the manifest without waiting for the write.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from perf_stats import stats
+
+# pending() result for a file whose queued operation is a delete
+REMOVED = object()
+
+
+def mtime_from_ns(mtime_ns):
+    """The st_mtime float os.stat reports for a file with this mtime."""
+    seconds, nanoseconds = divmod(mtime_ns, 1_000_000_000)
+    return seconds + nanoseconds * 1e-9
+
+
+def _new_mtime_ns():
+    # Microseconds survive every filesystem that matters (NTFS keeps 100 ns)
+    return time.time_ns() // 1000 * 1000
+
+
+def atomic_write(path, data, mtime_ns=None, sync=True):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    if mtime_ns is not None:
+        # Set before the rename, which keeps it
+        os.utime(temp_path, ns=(mtime_ns, mtime_ns))
+    os.replace(temp_path, path)
+
+
+def append_file(path, data, sync=True):
+    with open(path, 'ab') as f:
+        f.write(data)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class DirectWriter:
+    """Performs every operation immediately on the calling thread."""
+
+    def __init__(self, sync=True):
+        self.sync = sync
+
+    def _perform(self, op, path, data=None, mtime_ns=None):
+        with stats.timer('store.write'):
+            if op == 'write':
+                atomic_write(path, data, mtime_ns, self.sync)
+            elif op == 'append':
+                append_file(path, data, self.sync)
+            else:
+                remove_file(path)
+        if data:
+            stats.count('store.bytes_written', len(data))
+
+    def write(self, path, data, ordered=True):
+        """Replace `path` with `data` (bytes); returns the file's st_mtime."""
+        mtime_ns = _new_mtime_ns()
+        self._perform('write', path, data, mtime_ns)
+        return mtime_from_ns(mtime_ns)
+
+    def append(self, path, data):
+        self._perform('append', path, data)
+
+    def remove(self, path):
+        self._perform('remove', path)
+
+    def pending(self, path):
+        """Queued contents of `path`, REMOVED, or None when the disk is current."""
+        return None
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Item:
+    __slots__ = ('op', 'path', 'data', 'mtime_ns')
+
+    def __init__(self, op, path, data=None, mtime_ns=None):
+        self.op = op  # 'write', 'append', 'remove', or None once superseded
+        self.path = path
+        self.data = data
+        self.mtime_ns = mtime_ns
+
+
+class WriteBehindQueue(DirectWriter):
+    """Performs operations in order on a background thread."""
+
+    def __init__(self, sync=True):
+        super().__init__(sync)
+        self._queue = deque()
+        self._latest = {}  # path -> last queued or running write/remove of that path
+        self._current = None
+        self._cond = threading.Condition()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._queue) + (self._current is not None)
+
+    def _submit(self, item, ordered=True):
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("write queue is closed")
+            if item.op != 'append':
+                previous = self._latest.get(item.path)
+                if (previous is not None and previous is not self._current
+                        and not self._appended_after(previous)):
+                    stats.count('store.writes_coalesced')
+                    if not ordered and previous.op == item.op == 'write':
+                        previous.data, previous.mtime_ns = item.data, item.mtime_ns
+                        return
+                    # Not started yet: the new contents make it redundant
+                    previous.op = None
+                self._latest[item.path] = item
+            elif self._queue and self._queue[-1].op == 'append' and self._queue[-1].path == item.path:
+                self._queue[-1].data += item.data
+                return
+            self._queue.append(item)
+            stats.observe('store.write_queue', len(self._queue))
+            self._cond.notify_all()
+
+    def _appended_after(self, item):
+        """True if an append to item's file is queued behind it."""
+        behind = False
+        for queued in self._queue:
+            if queued is item:
+                behind = True
+            elif behind and queued.op == 'append' and queued.path == item.path:
+                return True
+        return False
+
+    def write(self, path, data, ordered=True):
+        mtime_ns = _new_mtime_ns()
+        self._submit(_Item('write', path, data, mtime_ns), ordered)
+        return mtime_from_ns(mtime_ns)
+
+    def append(self, path, data):
+        self._submit(_Item('append', path, data))
+
+    def remove(self, path):
+        self._submit(_Item('remove', path))
+
+    def pending(self, path):
+        with self._cond:
+            item = self._latest.get(path)
+        if item is None:
+            return None
+        return REMOVED if item.op == 'remove' else item.data
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                item = self._current = self._queue.popleft()
+            try:
+                if item.op is not None:
+                    self._perform(item.op, item.path, item.data, item.mtime_ns)
+            except Exception as e:
+                stats.count('errors.write')
+                print(f"Error writing {item.path}: {str(e)}")
+            finally:
+                with self._cond:
+                    if self._latest.get(item.path) is item:
+                        del self._latest[item.path]
+                    self._current = None
+                    self._cond.notify_all()
+
+    def flush(self):
+        """Block until every queued operation is on disk."""
+        with self._cond:
+            while self._queue or self._current is not None:
+                self._cond.wait()
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()